@@ -0,0 +1,162 @@
+"""Time the main stages of a backtest on synthetic quotes and compare them with a baseline
+
+Run from the root of the repository:
+    python -m benchmarks.bench --symbols 50 --bars 1000 --output results.json
+    python -m benchmarks.bench --symbols 50 --bars 1000 --baseline results.json --tolerance 0.2
+The command exits with status 1 if a benchmark is slower than its baseline by more than the tolerance
+"""
+from dataclasses import replace
+from typing import Callable, Dict, List
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import numpy as np
+from retrotester.costs import CostModel
+from retrotester.dataobj import Data, Frequency
+from retrotester.indicators import (
+    SimpleMovingAverage,
+    WeightedMovingAverage,
+    RelativeStrenghtIndex,
+    AccumulationDistributionOscillator,
+    AverageTrueRange,
+)
+from retrotester.mathfunc import compute_statistics_backtest
+from retrotester.retrotester import Config, Retrotester
+from retrotester.strategies import EquiWeightedStrategy
+from .synthetic import generate_quotes
+
+
+class BenchStrategy(EquiWeightedStrategy):
+    def construct(self):
+        self.add_indicators(
+            [
+                SimpleMovingAverage(self._config, "sma", 20),
+                WeightedMovingAverage(self._config, "wma", 20),
+                RelativeStrenghtIndex(self._config, "rsi", 14),
+                AccumulationDistributionOscillator(self._config, "ado"),
+                AverageTrueRange(self._config, "atr", 14),
+            ]
+        )
+
+    def compute_signals(self, quotes):
+        for quote in quotes:
+            quote.signal = 0.0 if quote.sma is None else float(np.sign(quote.close - quote.sma))
+
+
+def timeit(func: Callable, setup: Callable = None, repeat: int = 3) -> float:
+    """Return the best time of repeat calls of func(setup())"""
+    best = float("inf")
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg) if setup else func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmarks(n_symbols: int, n_bars: int, frequency: Frequency, seed: int = 0, repeat: int = 3) -> Dict[str, float]:
+    """Return the best time, in seconds, of each benchmark"""
+    quotes = generate_quotes(n_symbols, n_bars, frequency, seed=seed)
+    dates = sorted({quote.ts for quote in quotes})
+    universe = sorted({quote.symbol for quote in quotes})
+    config = Config(universe, dates[0], dates[-1], "bench", frequency, model_parameters={"quote_period": "close"})
+    fresh = lambda columnar=False: Data(quotes, columnar=columnar)
+    results = dict()
+
+    results["load"] = timeit(lambda: Data(quotes), repeat=repeat)
+    results["load columnar"] = timeit(lambda: Data(quotes, columnar=True), repeat=repeat)
+    for index in ("quotes_by_pk", "quotes_by_symbol", "quotes_by_ts"):
+        results[f"index {index}"] = timeit(lambda data: getattr(data, index), fresh, repeat)
+
+    results["resample monthly"] = timeit(lambda data: data.resample(Frequency.MONTHLY), lambda: fresh(True), repeat)
+
+    data = fresh()
+    rnd = random.Random(seed)
+    keys = [(quote.symbol, quote.ts) for quote in rnd.sample(quotes, min(10_000, len(quotes)))]
+    results["get_prev_key x10000"] = timeit(lambda: [data.quotes_by_pk.get_prev_key(key) for key in keys], repeat=repeat)
+    results["get_next_key x10000"] = timeit(lambda: [data.quotes_by_pk.get_next_key(key) for key in keys], repeat=repeat)
+
+    strategy = BenchStrategy(config, data)
+    strategy.construct()
+    for name, ind in strategy.indicators.items():
+        results[f"indicator {name}"] = timeit(lambda: ind.compute_batch(data, universe), repeat=repeat)
+
+    for columnar in (False, True):
+        signals = fresh(columnar)
+        for ind in strategy.indicators.values():
+            ind.compute_batch(signals, universe)
+        name = "signals columnar" if columnar else "signals"
+        results[name] = timeit(lambda: [strategy.compute_signals(signals.quotes_by_symbol[symbol]) for symbol in universe], repeat=repeat)
+
+    for engine in ("loop", "vectorized"):
+        results[f"run {engine}"] = timeit(lambda r: r.run(engine=engine), lambda: Retrotester(fresh(), BenchStrategy, config), repeat)
+    results["run loop columnar"] = timeit(lambda r: r.run(), lambda: Retrotester(fresh(True), BenchStrategy, config), repeat)
+    costs = replace(config, costs=CostModel(proportional=0.001, fixed=1.0, spread=0.0005, impact=0.1))
+    for engine in ("loop", "vectorized"):
+        results[f"run {engine} costs"] = timeit(lambda r: r.run(engine=engine), lambda: Retrotester(fresh(), BenchStrategy, costs), repeat)
+
+    retrotester = Retrotester(fresh(), BenchStrategy, config)
+    retrotester.run()
+    results["stats"] = timeit(lambda: compute_statistics_backtest(retrotester, 0.0), repeat=repeat)
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[dict]:
+    """Return the benchmarks slower than their baseline by more than tolerance (0.2 for 20%)"""
+    regressions = []
+    for name, seconds in results.items():
+        reference = baseline.get(name)
+        if reference and seconds > reference * (1 + tolerance):
+            regressions.append({"benchmark": name, "baseline": reference, "time": seconds, "ratio": seconds / reference})
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--bars", type=int, default=1000)
+    parser.add_argument("--frequency", choices=[f.name for f in Frequency], default=Frequency.DAILY.name)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--baseline", help="JSON file of results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative slowdown flagged as a regression")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.symbols, args.bars, Frequency[args.frequency], args.seed, args.repeat)
+    report = {
+        "meta": {
+            "symbols": args.symbols,
+            "bars": args.bars,
+            "frequency": args.frequency,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    width = max(map(len, results))
+    for name, seconds in results.items():
+        print(f"{name:<{width}}  {seconds * 1e3:10.2f} ms")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"] != report["meta"]:
+            print(f"Warning: baseline ran with {baseline['meta']}", file=sys.stderr)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['benchmark']}: {r['baseline'] * 1e3:.2f} ms -> {r['time'] * 1e3:.2f} ms (x{r['ratio']:.2f})")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
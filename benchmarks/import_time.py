@@ -0,0 +1,66 @@
+"""Time the import of the retrotester package in fresh interpreters and check it against a budget
+
+Run from the root of the repository:
+    python -m benchmarks.import_time --budget 300
+The command exits with status 1 if the import takes longer than the budget, in milliseconds,
+or if it loads one of the optional dependencies imported on first use.
+The test suite checks the budget only if RETROTESTER_IMPORT_BUDGET_MS is set
+"""
+from typing import Dict, List, Tuple
+import argparse
+import subprocess
+import sys
+
+# dependencies which must not be imported by `import retrotester`
+LAZY = ("plotly", "tqdm", "schema", "pandas", "sklearn", "yfinance", "asyncio")
+
+
+def import_times(module: str) -> Tuple[float, Dict[str, float]]:
+    """Return the total time of importing module in a fresh interpreter and the cumulative time of each
+    module it imports, in milliseconds (from `python -X importtime`)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True)
+    total, cumulative = 0.0, dict()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        total += int(self_us) / 1e3
+        cumulative[name.strip()] = int(cumulative_us) / 1e3
+    return total, cumulative
+
+
+def loaded(module: str, names: Tuple[str, ...]) -> List[str]:
+    """Return the modules of names loaded by importing module in a fresh interpreter"""
+    code = f"import sys, {module}; print(' '.join(m for m in {names!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="retrotester")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=300, help="maximum import time in milliseconds")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest modules to print")
+    args = parser.parse_args(argv)
+
+    runs = [import_times(args.module) for _ in range(args.repeat)]
+    total, cumulative = min(runs, key=lambda run: run[0])
+    numpy = min(run[1].get("numpy", 0.0) for run in runs)
+    print(f"import {args.module}: {total:.1f} ms (best of {args.repeat}), numpy: {numpy:.1f} ms, budget: {args.budget:.1f} ms")
+    for name, ms in sorted(cumulative.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {name:<40} {ms:8.1f} ms")
+
+    status = 0
+    eager = loaded(args.module, LAZY)
+    if eager:
+        print(f"FAILED {args.module} imports {', '.join(eager)}, which should be imported on first use")
+        status = 1
+    if total > args.budget:
+        print(f"FAILED import takes {total:.1f} ms, over the budget of {args.budget:.1f} ms")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
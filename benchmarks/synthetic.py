@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from typing import List
+import numpy as np
+from retrotester.dataobj import Frequency, Quote
+
+
+def timestamps(n_bars: int, frequency: Frequency = Frequency.DAILY, start: datetime = datetime(2000, 1, 3)) -> List[datetime]:
+    """Return n_bars consecutive timestamps at frequency"""
+    if frequency == Frequency.MONTHLY:
+        return [datetime(start.year + (start.month - 1 + i) // 12, (start.month - 1 + i) % 12 + 1, 1) for i in range(n_bars)]
+    step = timedelta(hours=1) if frequency == Frequency.HOURLY else timedelta(days=1)
+    return [start + i * step for i in range(n_bars)]
+
+
+def generate_quotes(
+    n_symbols: int = 50,
+    n_bars: int = 1000,
+    frequency: Frequency = Frequency.DAILY,
+    missing_rate: float = 0.01,
+    gap_rate: float = 0.002,
+    gap_length: int = 10,
+    seed: int = 0,
+) -> List[Quote]:
+    """Generate random OHLCV quotes, following a geometric brownian motion
+
+    Parameters
+    ----------
+    n_symbols : int, optional
+        number of symbols, named S0, S1..., by default 50
+    n_bars : int, optional
+        number of timestamps, by default 1000
+    frequency : Frequency, optional
+        frequency of the timestamps, by default Frequency.DAILY
+    missing_rate : float, optional
+        probability that a bar is missing, by default 0.01
+    gap_rate : float, optional
+        probability that a gap of gap_length bars starts at a bar, by default 0.002
+    gap_length : int, optional
+        number of bars of the gaps, by default 10
+    seed : int, optional
+        seed of the generator, by default 0
+
+    Returns
+    -------
+    List[Quote]
+        quotes sorted by symbol and ts. The first and last bars of each symbol are never missing
+    """
+    rng = np.random.default_rng(seed)
+    ts = timestamps(n_bars, frequency)
+    shape = (n_bars, n_symbols)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.015, shape), axis=0))
+    open_ = close * (1 + rng.normal(0, 0.003, shape))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.003, shape)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.003, shape)))
+    volume = rng.integers(1_000, 1_000_000, shape).astype(float)
+
+    present = rng.random(shape) >= missing_rate
+    starts = np.argwhere(rng.random(shape) < gap_rate)
+    for i, j in starts:
+        present[i : i + gap_length, j] = False
+    present[[0, -1]] = True
+
+    quotes = []
+    for j in range(n_symbols):
+        symbol = f"S{j}"
+        for i in np.flatnonzero(present[:, j]).tolist():
+            c = float(close[i, j])
+            quotes.append(
+                Quote(
+                    symbol=symbol,
+                    ts=ts[i],
+                    open=float(open_[i, j]),
+                    high=float(high[i, j]),
+                    low=float(low[i, j]),
+                    close=c,
+                    adj_close=c,
+                    volume=float(volume[i, j]),
+                )
+            )
+    return quotes
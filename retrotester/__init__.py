@@ -0,0 +1,57 @@
+from .dataobj import Data, Frequency, Quote, TradeLedger, Weight
+from .frame import QuoteFrame
+from .retrotester import BatchRetrotester, Config, Retrotester
+from .strategies import BaseStrategy, EquiWeightedStrategy, SVRStrategy, TradeStrategy, WeightStrategy
+from .indicators import (
+    Indicator,
+    SimpleMovingAverage,
+    WeightedMovingAverage,
+    AccumulationDistributionOscillator,
+    RelativeStrenghtIndex,
+    TrueRange,
+    AverageTrueRange,
+)
+from .cache import IndicatorCache
+from .costs import CostModel
+from .models import ModelStore
+from .profiling import Profiler
+from .loader import FileFetcher, YahooFetcher, load_universe
+from .mathfunc import compute_statistics, compute_statistics_backtest, compute_trade_statistics
+
+# plotting (plotly), progress bars (tqdm), validation (schema), CSV reading (pandas) and regressions (scikit-learn)
+# are imported on first use, and retrotester.fetch (asyncio) and retrotester.plotting are imported explicitly,
+# so importing the package only loads numpy
+
+__all__ = [
+    "Data",
+    "Frequency",
+    "Quote",
+    "TradeLedger",
+    "Weight",
+    "QuoteFrame",
+    "BatchRetrotester",
+    "Config",
+    "Retrotester",
+    "BaseStrategy",
+    "EquiWeightedStrategy",
+    "SVRStrategy",
+    "TradeStrategy",
+    "WeightStrategy",
+    "Indicator",
+    "SimpleMovingAverage",
+    "WeightedMovingAverage",
+    "AccumulationDistributionOscillator",
+    "RelativeStrenghtIndex",
+    "TrueRange",
+    "AverageTrueRange",
+    "IndicatorCache",
+    "CostModel",
+    "ModelStore",
+    "Profiler",
+    "FileFetcher",
+    "YahooFetcher",
+    "load_universe",
+    "compute_statistics",
+    "compute_statistics_backtest",
+    "compute_trade_statistics",
+]
@@ -0,0 +1,146 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, Tuple
+from collections import OrderedDict
+import hashlib
+import os
+import numpy as np
+
+if TYPE_CHECKING:
+    from .indicators import Indicator
+
+# indicator values of a symbol: outputs and intermediate arrays, as returned by Indicator._compute
+_Entry = Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]
+
+
+def fingerprint(arrays: Dict[str, np.ndarray]) -> str:
+    """Return a hash of the content of arrays"""
+    h = hashlib.blake2b(digest_size=16)
+    for name in sorted(arrays):
+        h.update(name.encode())
+        h.update(np.ascontiguousarray(arrays[name], dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+class IndicatorCache:
+    """
+    This object memoizes indicators' values by symbol, keyed by the indicator settings
+    (class, input attributes such as Config.quote_period, window size...), the symbol and a hash of its input series.
+    Values are kept in an in-memory LRU bounded to max_bytes and, if directory is passed,
+    persisted in .npy files which are memory-mapped when read back
+    """
+
+    def __init__(self, max_bytes: int = 512 * 2**20, directory: str = None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(indicator: Indicator, symbol: str, inputs: Dict[str, np.ndarray]) -> str:
+        """Return the key of the indicator values of a symbol"""
+        return hashlib.blake2b(repr((indicator.settings, symbol, fingerprint(inputs))).encode(), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _size(entry: _Entry) -> int:
+        return sum(array.nbytes for arrays in entry for array in arrays.values())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _read(self, key: str) -> _Entry:
+        path = self._path(key)
+        if not os.path.isdir(path):
+            return None
+        entry = (dict(), dict())
+        for file in os.listdir(path):
+            kind, name = file[:-4].split("_", 1)
+            entry[kind == "e"][name] = np.load(os.path.join(path, file), mmap_mode="r")
+        return entry
+
+    def _write(self, key: str, entry: _Entry):
+        path = self._path(key)
+        os.makedirs(path, exist_ok=True)
+        for kind, arrays in zip("oe", entry):
+            for name, array in arrays.items():
+                np.save(os.path.join(path, f"{kind}_{name}.npy"), array)
+
+    def get(self, key: str) -> _Entry:
+        """Return the entry of key, None if it is not cached"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        elif self.directory:
+            entry = self._read(key)
+            if entry is not None:
+                self._store(key, entry)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def _store(self, key: str, entry: _Entry):
+        self._entries[key] = entry
+        self.nbytes += self._size(entry)
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= self._size(evicted)
+            self.evictions += 1
+
+    def set(self, key: str, entry: _Entry):
+        """Cache the entry of key"""
+        if key in self._entries:
+            self.nbytes -= self._size(self._entries.pop(key))
+        self._store(key, entry)
+        if self.directory:
+            self._write(key, entry)
+
+    def compute(self, indicator: Indicator, symbols: List[str], lengths: List[int], inputs: Dict[str, np.ndarray]):
+        """Compute indicator values as `Indicator._compute`, for the symbols which are not cached only
+
+        Parameters
+        ----------
+        indicator : Indicator
+            indicator to compute
+        symbols : List[str]
+            symbols, one column each
+        lengths : List[int]
+            length of the series of each symbol
+        inputs : Dict[str, np.ndarray]
+            input arrays of shape (time x symbol)
+
+        Returns
+        -------
+        tuple
+            outputs and intermediate arrays of shape (time x symbol)
+        """
+        column = lambda arrays, j, n: {name: array[:n, j] for name, array in arrays.items()}
+        keys = [self.key(indicator, symbol, column(inputs, j, n)) for j, (symbol, n) in enumerate(zip(symbols, lengths))]
+        entries = [self.get(key) for key in keys]
+        missing = [j for j, entry in enumerate(entries) if entry is None]
+        if missing:
+            outputs, extras = indicator._compute({name: array[:, missing] for name, array in inputs.items()})
+            for i, j in enumerate(missing):
+                entries[j] = tuple({name: array.copy() for name, array in column(arrays, i, lengths[j]).items()} for arrays in (outputs, extras))
+                self.set(keys[j], entries[j])
+        shape = next(iter(inputs.values())).shape
+        result = (dict(), dict())
+        for j, (entry, n) in enumerate(zip(entries, lengths)):
+            for arrays, cached in zip(result, entry):
+                for name, values in cached.items():
+                    arrays.setdefault(name, np.full(shape, np.nan))[:n, j] = values
+        return result
+
+    def info(self) -> dict:
+        """Return the counters of the cache"""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self._entries), "nbytes": self.nbytes}
+
+    def clear(self):
+        """Empty the in-memory cache and reset the counters"""
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = self.nbytes = 0
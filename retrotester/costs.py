@@ -0,0 +1,68 @@
+from __future__ import annotations
+import numpy as np
+
+
+class CostModel:
+    """
+    Transaction costs of a portfolio, as fractions of its value, charged on the weights traded
+    (the absolute change of the weight of each symbol from one weight to the next):
+        - proportional fees, such as 0.001 for 10 bps of the traded value
+        - fixed fees per trade, in the currency of capital
+        - half the bid-ask spread, relative to the price
+        - market impact, impact * sqrt(participation) of the traded value, participation being
+          the traded value over the value of the volume of the bar
+    capital is the value of the portfolio used to size the trades for the fixed fees and the market impact
+    """
+
+    def __init__(self, proportional: float = 0.0, fixed: float = 0.0, spread: float = 0.0, impact: float = 0.0, capital: float = 1e6):
+        self.proportional = proportional
+        self.fixed = fixed
+        self.spread = spread
+        self.impact = impact
+        self.capital = capital
+
+    def costs(self, traded: np.ndarray, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+        """Return the costs of the trades, summed over the last axis
+
+        Parameters
+        ----------
+        traded : np.ndarray
+            weights traded, of shape (symbols,) or (dates x symbols)
+        close, volume : np.ndarray
+            price and volume of the quotes the trades are made at, same shape as traded
+
+        Returns
+        -------
+        np.ndarray
+            costs as fractions of the portfolio, of shape () or (dates,)
+        """
+        costs = traded * (self.proportional + self.spread / 2)
+        if self.fixed:
+            costs = costs + np.where(traded > 0, self.fixed / self.capital, 0.0)
+        if self.impact:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                participation = traded * self.capital / (close * volume)
+            costs = costs + np.where(participation > 0, self.impact * traded * np.sqrt(participation), 0.0)
+        return costs.sum(axis=-1)
+
+
+def traded_weights(weights: np.ndarray) -> np.ndarray:
+    """Return the weights traded from the previous weight of each symbol (0 before the first one)
+
+    Parameters
+    ----------
+    weights : np.ndarray
+        weights of shape (dates x symbols), NaN without weight
+
+    Returns
+    -------
+    np.ndarray
+        absolute change of the weights, 0 without weight
+    """
+    present = ~np.isnan(weights)
+    dates, cols = np.arange(len(weights))[:, None], np.arange(weights.shape[1])
+    # position of the previous weight of each symbol, -1 if there is none
+    prev = np.full(weights.shape, -1)
+    prev[1:] = np.maximum.accumulate(np.where(present, dates, -1), axis=0)[:-1]
+    held = np.where(prev >= 0, weights[np.maximum(prev, 0), cols], 0.0)
+    return np.where(present, np.abs(weights - held), 0.0)
@@ -1,13 +1,14 @@
-from schema import Schema
 from enum import Enum
 from datetime import datetime
-from dataclasses import dataclass
 from typing import List, Dict, Tuple
 from itertools import groupby
 import operator
 from functools import cached_property
 from collections import OrderedDict
-import bisect
+from copy import copy
+from collections.abc import MutableMapping
+import numpy as np
+from .frame import QuoteFrame, _FrameQuotes, _FrameQuotesByPk, _FrameQuotesBySymbol, _FrameQuotesByTs
 
 
 class Frequency(Enum):
@@ -16,6 +17,12 @@ class Frequency(Enum):
     DAILY = "Daily"
 
 
+# numpy datetime unit of the periods of each frequency
+PERIOD_UNITS = {Frequency.HOURLY: "h", Frequency.DAILY: "D", Frequency.MONTHLY: "M"}
+# number of periods per year of each frequency, 7 hourly bars per trading day as the bars of US stocks
+PERIODS_PER_YEAR = {Frequency.HOURLY: 252 * 7, Frequency.DAILY: 252, Frequency.MONTHLY: 12}
+
+
 class _QuotesByPk(OrderedDict):
     """
     This object represents quotes arranged in dict,
@@ -26,102 +33,483 @@ class _QuotesByPk(OrderedDict):
     def dict_keys(self) -> list:
         return list(self.keys())
 
+    @cached_property
+    def _index(self) -> Tuple[Dict[str, List[datetime]], Dict[Tuple[str, datetime], int]]:
+        """Return the sorted ts of each symbol and the position of each key in the ts of its symbol"""
+        ts_by_symbol, positions = dict(), dict()
+        for symbol, ts in self.keys():
+            series = ts_by_symbol.setdefault(symbol, [])
+            positions[(symbol, ts)] = len(series)
+            series.append(ts)
+        return ts_by_symbol, positions
+
+    def extend(self, items: List[Tuple[Tuple[str, datetime], "Quote"]]):
+        """Add quotes after the last quote of their symbol, sorted by key, and update the indexes already built.
+        Keys are sorted when the object is built, added keys come after them
+
+        Parameters
+        ----------
+        items : List[Tuple[Tuple[str, datetime], Quote]]
+            keys and quotes to add
+        """
+        self.update(items)
+        if "dict_keys" in self.__dict__:
+            self.dict_keys.extend(key for key, _ in items)
+        if "_index" in self.__dict__:
+            ts_by_symbol, positions = self._index
+            for symbol, ts in (key for key, _ in items):
+                series = ts_by_symbol.setdefault(symbol, [])
+                positions[(symbol, ts)] = len(series)
+                series.append(ts)
+
     def get_next_key(self, k: Tuple[str, datetime]):
         """Get the next key after k"""
-        i = bisect.bisect_right(self.dict_keys, k)
-        if self.dict_keys[i][1] > k[1]:
-            # check if next key date is after
-            if self.dict_keys[i - 1] != k:
-                raise KeyError(k)
-            return self.dict_keys[i]
-        else:
-            # if k is last key
-            return None
+        ts_by_symbol, positions = self._index
+        i, series = positions[k], ts_by_symbol[k[0]]
+        # if k is last key
+        return (k[0], series[i + 1]) if i + 1 < len(series) else None
 
     def get_prev_key(self, k: Tuple[str, datetime]):
         """Get the previous key before k"""
-        i = bisect.bisect_left(self.dict_keys, k)
-        if self.dict_keys[i - 1][1] < k[1]:
-            # check if prev key date is before
-            if self.dict_keys[i] != k:
-                raise KeyError(k)
-            return self.dict_keys[i - 1]
-        else:
-            # if k is first key
-            return None
+        ts_by_symbol, positions = self._index
+        i, series = positions[k], ts_by_symbol[k[0]]
+        # if k is first key
+        return (k[0], series[i - 1]) if i > 0 else None
+
+    def gaps(self, dates: List[datetime]) -> Dict[str, List[datetime]]:
+        """Return the dates without quote between the first and the last quote of each symbol
+
+        Parameters
+        ----------
+        dates : List[datetime]
+            sorted dates of all the quotes
+
+        Returns
+        -------
+        Dict[str, List[datetime]]
+            symbols with missing quotes as keys and missing dates as values
+        """
+        ts_by_symbol, _ = self._index
+        date_index = {d: i for i, d in enumerate(dates)}
+        gaps = dict()
+        for symbol, series in ts_by_symbol.items():
+            first, last = date_index[series[0]], date_index[series[-1]]
+            if last - first + 1 > len(series):
+                gaps[symbol] = sorted(set(dates[first : last + 1]).difference(series))
+        return gaps
 
 
-@dataclass
-class Quote:
+class _Record:
     """
-    This object represents a market quote
+    Base class of the records whose fields are stored in __slots__,
+    compared as dataclasses (on their fields, by class)
     """
 
-    symbol: str = None
-    ts: datetime = None
-    open: float = None
-    high: float = None
-    low: float = None
-    close: float = None
-    adj_close: float = None
-    volume: float = None
-    signal: float = None
+    __slots__ = ()
+    _fields = ()
+    __hash__ = None
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, field) for field in self._fields)
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is self.__class__:
+            return self._values() == other._values()
+        return NotImplemented
+
+
+class Quote(_Record):
+    """
+    This object represents a market quote.
+    Its fields are stored in slots, other attributes (such as indicators' values) in a dict created on first write
+    """
+
+    _fields = ("symbol", "ts", "open", "high", "low", "close", "adj_close", "volume", "signal")
+    __slots__ = _fields + ("__dict__",)
+
+    def __init__(
+        self,
+        symbol: str = None,
+        ts: datetime = None,
+        open: float = None,
+        high: float = None,
+        low: float = None,
+        close: float = None,
+        adj_close: float = None,
+        volume: float = None,
+        signal: float = None,
+    ):
+        self.symbol = symbol
+        self.ts = ts
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.adj_close = adj_close
+        self.volume = volume
+        self.signal = signal
 
     def __str__(self) -> str:
-        return f"Quote({', '.join([f'{k}={v}' for k, v in self.__dict__.items()])}"
+        items = [*zip(self._fields, self._values()), *self.__dict__.items()]
+        return f"Quote({', '.join([f'{k}={v}' for k, v in items])}"
 
     def __repr__(self) -> str:
-        return f"Quote({', '.join([f'{k}={v}' for k, v in self.__dict__.items()])}"
+        return str(self)
 
 
-@dataclass
-class Weight:
+class Weight(_Record):
     """
     This object represents a portfolio weight
     """
 
-    product_code: str = None
-    underlying_code: str = None
-    ts: datetime = None
-    value: float = None
+    _fields = ("product_code", "underlying_code", "ts", "value")
+    __slots__ = _fields
+
+    def __init__(self, product_code: str = None, underlying_code: str = None, ts: datetime = None, value: float = None):
+        self.product_code = product_code
+        self.underlying_code = underlying_code
+        self.ts = ts
+        self.value = value
+
+    def __repr__(self) -> str:
+        return f"Weight({', '.join([f'{k}={v!r}' for k, v in zip(self._fields, self._values())])})"
+
+
+class _WeightsByPk(MutableMapping):
+    """
+    This object represents the weights of a strategy arranged in dict, with a tuple
+    (weight.product_code, weight.underlying_code, weight.ts) as key and a weight as value.
+    Values are stored in a dense array of shape (ts x underlying_code), NaN without weight,
+    and weights are created on access. Rows of the ts whose weights are all deleted are reused
+    """
+
+    def __init__(self, product_code: str, underlying_codes: List[str] = ()):
+        self.product_code = product_code
+        self.columns = {code: j for j, code in enumerate(underlying_codes)}
+        self.rows = dict()
+        self.array = np.full((0, len(self.columns)), np.nan)
+        # number of weights of each row, rows free to reuse and number of rows used
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._free = []
+        self._n_rows = 0
+        self._len = 0
+
+    def _position(self, key: Tuple[str, str, datetime]) -> Tuple[int, int]:
+        """Return the row and the column of key, None if key has no weight"""
+        product_code, underlying_code, ts = key
+        i, j = self.rows.get(ts), self.columns.get(underlying_code)
+        if product_code != self.product_code or i is None or j is None or self.array[i, j] != self.array[i, j]:
+            return None
+        return i, j
+
+    def _allocate(self, underlying_code: str, ts: datetime) -> Tuple[int, int]:
+        """Return the row and the column of underlying_code and ts, adding them if needed"""
+        if underlying_code not in self.columns:
+            self.columns[underlying_code] = len(self.columns)
+            if len(self.columns) > self.array.shape[1]:
+                self.array = np.hstack([self.array, np.full((len(self.array), max(len(self.columns), 8)), np.nan)])
+        if ts not in self.rows:
+            if self._free:
+                self.rows[ts] = self._free.pop()
+            else:
+                self.rows[ts] = self._n_rows
+                self._n_rows += 1
+                if self._n_rows > len(self.array):
+                    grow = max(len(self.array), 64)
+                    self.array = np.vstack([self.array, np.full((grow, self.array.shape[1]), np.nan)])
+                    self._counts = np.concatenate([self._counts, np.zeros(grow, dtype=np.int64)])
+        return self.rows[ts], self.columns[underlying_code]
+
+    def get_value(self, key: Tuple[str, str, datetime]) -> float:
+        """Return the value of the weight of key, None if there is none"""
+        position = self._position(key)
+        return None if position is None else float(self.array[position])
+
+    def __getitem__(self, key: Tuple[str, str, datetime]) -> Weight:
+        position = self._position(key)
+        if position is None:
+            raise KeyError(key)
+        return Weight(*key, value=float(self.array[position]))
+
+    def __setitem__(self, key: Tuple[str, str, datetime], weight: Weight):
+        product_code, underlying_code, ts = key
+        if product_code != self.product_code:
+            raise KeyError(f"Weights of {self.product_code} only, not {product_code}")
+        i, j = self._allocate(underlying_code, ts)
+        if self.array[i, j] != self.array[i, j]:
+            self._counts[i] += 1
+            self._len += 1
+        self.array[i, j] = weight.value
+
+    def __delitem__(self, key: Tuple[str, str, datetime]):
+        position = self._position(key)
+        if position is None:
+            raise KeyError(key)
+        i, j = position
+        self.array[i, j] = np.nan
+        self._counts[i] -= 1
+        self._len -= 1
+        if self._counts[i] == 0:
+            del self.rows[key[2]]
+            self._free.append(i)
+
+    def __iter__(self):
+        codes = list(self.columns)
+        for ts, i in list(self.rows.items()):
+            for j in np.flatnonzero(~np.isnan(self.array[i, : len(codes)])).tolist():
+                yield self.product_code, codes[j], ts
+
+    def __len__(self) -> int:
+        return self._len
+
+    def row(self, ts: datetime) -> np.ndarray:
+        """Return the values of the weights at ts by underlying_code, NaN without weight, None if there is none"""
+        i = self.rows.get(ts)
+        return None if i is None else self.array[i, : len(self.columns)]
+
+    def weight_values(self) -> np.ndarray:
+        """Return the values of the weights"""
+        values = self.array[: self._n_rows]
+        return values[~np.isnan(values)]
+
+
+class TradeLedger:
+    """
+    This object stores the trades of a strategy in columns, preallocated and doubled when full:
+    symbol (position in symbols), entry and exit ts and price, size (quantity, negative for a short trade),
+    last price marked and PnL. A trade is open until its exit is set, and a symbol has one open trade at most
+    """
+
+    # dtype and fill value of each column
+    _COLUMNS = {
+        "symbol": (np.int64, 0),
+        "entry_ts": ("datetime64[us]", np.datetime64("NaT")),
+        "exit_ts": ("datetime64[us]", np.datetime64("NaT")),
+        "entry_price": (np.float64, np.nan),
+        "exit_price": (np.float64, np.nan),
+        "size": (np.float64, 0.0),
+        "last_price": (np.float64, np.nan),
+        "pnl": (np.float64, 0.0),
+    }
+
+    def __init__(self, symbols: List[str], capacity: int = 64):
+        self.symbols = list(symbols)
+        for name, (dtype, fill) in self._COLUMNS.items():
+            setattr(self, name, np.full(capacity, fill, dtype=dtype))
+        self._n = 0
+        # rows of the open trades, and row of the open trade of each symbol
+        self.active = np.zeros(0, dtype=np.int64)
+        self.open_by_symbol = dict()
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _grow(self):
+        capacity = 2 * len(self.symbol)
+        for name, (dtype, fill) in self._COLUMNS.items():
+            column = np.full(capacity, fill, dtype=dtype)
+            column[: self._n] = getattr(self, name)[: self._n]
+            setattr(self, name, column)
+
+    def open(self, symbol: int, ts: datetime, price: float, size: float) -> int:
+        """Open a trade of size on the symbol of position symbol at price and return its row"""
+        if self._n == len(self.symbol):
+            self._grow()
+        i = self._n
+        self.symbol[i], self.entry_ts[i], self.entry_price[i] = symbol, ts, price
+        self.size[i], self.last_price[i], self.pnl[i] = size, price, 0.0
+        self._n += 1
+        self.active = np.append(self.active, i)
+        self.open_by_symbol[symbol] = i
+        return i
+
+    def close(self, row: int, ts: datetime, price: float):
+        """Close the open trade of row at price"""
+        self.exit_ts[row], self.exit_price[row], self.last_price[row] = ts, price, price
+        self.pnl[row] = self.size[row] * (price - self.entry_price[row])
+        self.active = self.active[self.active != row]
+        del self.open_by_symbol[int(self.symbol[row])]
+
+    def mark(self, prices: np.ndarray) -> float:
+        """Mark the open trades to prices, array of the price of each symbol (NaN to keep the last price),
+        and return the PnL since the last prices"""
+        rows = self.active
+        new = prices[self.symbol[rows]]
+        new = np.where(np.isnan(new), self.last_price[rows], new)
+        pnl = float((self.size[rows] * (new - self.last_price[rows])).sum())
+        self.last_price[rows] = new
+        self.pnl[rows] = self.size[rows] * (new - self.entry_price[rows])
+        return pnl
+
+    def marked(self, ts: datetime) -> Dict[str, np.ndarray]:
+        """Return the columns of the trades, the open ones being closed at their last price at ts"""
+        n = self._n
+        is_open = np.isnat(self.exit_ts[:n])
+        columns = {name: getattr(self, name)[:n].copy() for name in self._COLUMNS}
+        columns["exit_ts"][is_open] = np.datetime64(ts, "us")
+        columns["exit_price"][is_open] = columns["last_price"][is_open]
+        return columns
 
 
 class Data:
     """
-    Object representing the data fed to the backtest
+    Object representing the data fed to the backtest.
+    With `columnar=True`, quotes are stored in a retrotester.frame.QuoteFrame
+    and exposed as views created on access. Columnar mode is faster for the indicators
+    and strategies working on arrays (`compute_array`, `stack`), while reading and writing
+    quote attributes one at a time through views stays several times slower than on Quote objects
     """
 
-    def __init__(self, data: List[Quote] = None):
+    def __init__(self, data: List[Quote] = None, columnar: bool = False):
+        self.columnar = columnar
+        self.frame = None
+        # number of symbols whose series are stacked at once by the indicators, None for all
+        self.chunk_size = None
         self.quotes = []
+        # indicator name as keys, indicator whose values are stored and its symbols as values
+        self._computed_indicators = dict()
+        # data resampled to each frequency
+        self._resampled = dict()
         if data:
             self.load(data)
 
+    @classmethod
+    def open(cls, directory: str, chunk_size: int = 64) -> "Data":
+        """Open quotes saved with `retrotester.frame.QuoteFrame.save`, in columnar mode, with memory-mapped columns.
+        Groupings by symbol and ts are row ranges and indexes into the columns, and indicators are computed
+        by chunks of symbols, so only the pages of the rows being used are read
+
+        Parameters
+        ----------
+        directory : str
+            directory of the frame
+        chunk_size : int, optional
+            number of symbols whose series are stacked at once by the indicators, by default 64
+
+        Returns
+        -------
+        Data
+            data backed by the files of directory
+        """
+        data = cls(columnar=True)
+        data.chunk_size = chunk_size
+        data.load(QuoteFrame.open(directory))
+        return data
+
+    def detach(self):
+        """Make the columns of the data private to the current process (see `retrotester.frame.QuoteFrame.detach`),
+        called in the worker processes of the Retrotester"""
+        for frame in [self.frame, *(data.frame for data in self._resampled.values())]:
+            if frame is not None:
+                frame.detach()
+
+    def copy(self) -> "Data":
+        """Return a copy of the data whose indicators' values and signals are written without changing the data
+        (see `retrotester.frame.QuoteFrame.copy` in columnar mode)"""
+        data = Data(columnar=self.columnar)
+        data.chunk_size = self.chunk_size
+        if self.columnar:
+            data.load(self.frame.copy())
+        else:
+            # quotes already checked
+            data.quotes = [copy(quote) for quote in self.quotes]
+        return data
+
+    def symbol_chunks(self, symbols: List[str]) -> List[List[str]]:
+        """Split symbols in chunks of chunk_size symbols"""
+        size = self.chunk_size or max(len(symbols), 1)
+        return [symbols[i : i + size] for i in range(0, len(symbols), size)]
+
     def load(self, data: List[Quote]):
         """load quotes to the data
 
         Parameters
         ----------
         data : List[Quote]
-            list of quotes
+            list of quotes, or a QuoteFrame in columnar mode
+        """
+        if self.columnar:
+            frame = data if isinstance(data, QuoteFrame) else QuoteFrame.from_quotes(self._check_data(data))
+            self.frame = frame if self.frame is None else self.frame.append(frame)
+            self.quotes = _FrameQuotes(self.frame)
+        else:
+            data = self._check_data(data)
+            self.quotes += data
+        self._computed_indicators = dict()
+        self._resampled = dict()
+        self.__dict__.pop("gaps", None)
+        if self.columnar or not self._extend_indexes(data):
+            # indexes are rebuilt on next access
+            for attr in ("dates", "_date_index", "quotes_by_pk", "quotes_by_symbol", "quotes_by_ts"):
+                self.__dict__.pop(attr, None)
+
+    def _extend_indexes(self, quotes: List[Quote]) -> bool:
+        """Add quotes after the last date to the indexes already built, in O(len(quotes))
+
+        Parameters
+        ----------
+        quotes : List[Quote]
+            quotes loaded, already added to self.quotes
+
+        Returns
+        -------
+        bool
+            False if the indexes must be rebuilt: quotes are not all after the last date or have duplicated keys
         """
-        self.quotes += self._check_data(data)
+        indexes = [attr for attr in ("dates", "_date_index", "quotes_by_pk", "quotes_by_symbol", "quotes_by_ts") if attr in self.__dict__]
+        if not indexes or not quotes:
+            return True
+        dates = self.__dict__.get("dates")
+        keys = [(quote.symbol, quote.ts) for quote in quotes]
+        if dates is None or (dates and min(ts for _, ts in keys) <= dates[-1]) or len(set(keys)) != len(keys):
+            return False
+
+        new_dates = sorted({ts for _, ts in keys})
+        if "_date_index" in self.__dict__:
+            self._date_index.update((ts, i) for i, ts in enumerate(new_dates, len(dates)))
+        dates.extend(new_dates)
+        if "quotes_by_pk" in self.__dict__:
+            self.quotes_by_pk.extend(sorted(zip(keys, quotes), key=operator.itemgetter(0)))
+        if "quotes_by_symbol" in self.__dict__:
+            quotes_by_symbol = self.quotes_by_symbol
+            new_symbol = False
+            for quote in sorted(quotes, key=operator.attrgetter("symbol")):
+                new_symbol |= quote.symbol not in quotes_by_symbol
+                quotes_by_symbol.setdefault(quote.symbol, []).append(quote)
+            if new_symbol:
+                self.__dict__["quotes_by_symbol"] = dict(sorted(quotes_by_symbol.items()))
+        if "quotes_by_ts" in self.__dict__:
+            for quote in sorted(quotes, key=operator.attrgetter("ts")):
+                self.quotes_by_ts.setdefault(quote.ts, []).append(quote)
+        return True
 
     def _check_data(self, data: List[Quote]) -> List[Quote]:
         """Check if the data uploaded is a list of Quote objects"""
+        from schema import Schema
+
         schema = Schema([Quote])
         return schema.validate(data)
 
     @cached_property
     def dates(self) -> List[datetime]:
         """Return the dates of all the quotes passed"""
+        if self.columnar:
+            return self.frame.dates
         return list(sorted(set([quote.ts for quote in self.quotes])))
 
     @cached_property
     def quotes_by_pk(self) -> Dict[str, List[Quote]]:
+        if self.columnar:
+            return _FrameQuotesByPk(self.frame)
         iter_ = groupby(self.quotes, lambda quote: (quote.symbol, quote.ts))
         group = {key: list(group)[0] for key, group in iter_}
         return _QuotesByPk(sorted(group.items()))
 
+    @cached_property
+    def gaps(self) -> Dict[str, List[datetime]]:
+        """Return the dates without quote between the first and the last quote of each symbol"""
+        return self.quotes_by_pk.gaps(self.dates)
+
     def _group_by_attr(self, attr: List[str]):
         """Group data.quotes by attributes of retrotester.dataobj.Quote
 
@@ -140,12 +528,130 @@ class Data:
 
     @cached_property
     def quotes_by_symbol(self) -> Dict[str, List[Quote]]:
+        if self.columnar:
+            return _FrameQuotesBySymbol(self.frame)
         return self._group_by_attr(["symbol"])
 
     @cached_property
     def quotes_by_ts(self) -> Dict[str, List[Quote]]:
+        if self.columnar:
+            return _FrameQuotesByTs(self.frame)
         return self._group_by_attr(["ts"])
 
+    def stack(self, attr: str, symbols: List[str]) -> np.ndarray:
+        """Return the series of an attribute for several symbols
+
+        Parameters
+        ----------
+        attr : str
+            attribute of retrotester.dataobj.Quote
+        symbols : List[str]
+            symbols, one column each
+
+        Returns
+        -------
+        np.ndarray
+            array of shape (time x symbol), each series is padded with NaN at the end
+        """
+        if self.columnar:
+            return self.frame.stack(attr, symbols)
+        series = [self.quotes_by_symbol[symbol] for symbol in symbols]
+        out = np.full((max(map(len, series), default=0), len(symbols)), np.nan)
+        for j, quotes in enumerate(series):
+            out[: len(quotes), j] = np.array([getattr(q, attr) for q in quotes], dtype=np.float64)
+        return out
+
+    def _date_positions(self, symbol: str) -> List[int]:
+        """Return the position in self.dates of each quote of a symbol"""
+        if "_date_index" not in self.__dict__:
+            self._date_index = {d: i for i, d in enumerate(self.dates)}
+        date_index = self._date_index
+        return [date_index[quote.ts] for quote in self.quotes_by_symbol[symbol]]
+
+    def presence(self, symbols: List[str]) -> np.ndarray:
+        """Return an array of shape (dates x symbols), True where there is a quote"""
+        if self.columnar:
+            date_index, rows = self.frame.alignment
+            return rows[[self.frame.symbols.index(symbol) for symbol in symbols]].T >= 0
+        out = np.zeros((len(self.dates), len(symbols)), dtype=bool)
+        for j, symbol in enumerate(symbols):
+            out[self._date_positions(symbol), j] = True
+        return out
+
+    def align(self, attr: str, symbols: List[str]) -> np.ndarray:
+        """Return an attribute of the quotes aligned on the dates
+
+        Parameters
+        ----------
+        attr : str
+            attribute of retrotester.dataobj.Quote
+        symbols : List[str]
+            symbols, one column each
+
+        Returns
+        -------
+        np.ndarray
+            array of shape (dates x symbols), NaN where there is no quote
+        """
+        if self.columnar:
+            date_index, rows = self.frame.alignment
+            rows = rows[[self.frame.symbols.index(symbol) for symbol in symbols]].T
+            return np.where(rows >= 0, self.frame.columns[attr][rows], np.nan)
+        out = np.full((len(self.dates), len(symbols)), np.nan)
+        for j, symbol in enumerate(symbols):
+            out[self._date_positions(symbol), j] = np.array([getattr(q, attr) for q in self.quotes_by_symbol[symbol]], dtype=np.float64)
+        return out
+
+    def series_lengths(self, symbols: List[str]) -> List[int]:
+        """Return the number of quotes of each symbol"""
+        if self.columnar:
+            return [len(self.frame.symbol_rows(symbol)) for symbol in symbols]
+        return [len(self.quotes_by_symbol[symbol]) for symbol in symbols]
+
+    def unstack(self, attr: str, values: np.ndarray, symbols: List[str]):
+        """Set an attribute of the quotes of several symbols from an array returned by `retrotester.dataobj.Data.stack`
+
+        Parameters
+        ----------
+        attr : str
+            attribute of retrotester.dataobj.Quote
+        values : np.ndarray
+            array of shape (time x symbol), NaN are set as None
+        symbols : List[str]
+            symbols, one column each
+        """
+        if self.columnar:
+            return self.frame.unstack(attr, values, symbols)
+        for j, symbol in enumerate(symbols):
+            for quote, value in zip(self.quotes_by_symbol[symbol], values[:, j].tolist()):
+                setattr(quote, attr, None if value != value else value)
+
+    def resample(self, frequency: Frequency) -> "Data":
+        """Return the quotes aggregated into bars of frequency, such as daily or monthly bars from hourly quotes
+        (see `retrotester.frame.QuoteFrame.resample`). Periods are calendar periods labelled by their start
+        (midnight, first day of the month). The resampled data is kept until new quotes are loaded,
+        so its indexes and indicators are computed once for the backtests at frequency
+
+        Parameters
+        ----------
+        frequency : Frequency
+            frequency of the bars
+
+        Returns
+        -------
+        Data
+            resampled data, in the same mode (list or columnar)
+        """
+        if frequency not in self._resampled:
+            frame = self.frame if self.columnar else QuoteFrame.from_quotes(self.quotes)
+            resampled = frame.resample(PERIOD_UNITS[frequency])
+            data = Data(columnar=self.columnar)
+            data.chunk_size = self.chunk_size
+            if len(resampled):
+                data.load(resampled if self.columnar else resampled.to_quotes())
+            self._resampled[frequency] = data
+        return self._resampled[frequency]
+
     @staticmethod
     def filter_quotes_by_signal(data: List[Quote], value: int) -> List[Quote]:
         """Filter quotes by their signal attribute
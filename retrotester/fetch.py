@@ -0,0 +1,227 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+import asyncio
+import http.client
+import io
+import os
+import queue
+import numpy as np
+from .dataobj import Data
+from .frame import QuoteFrame
+from .loader import Fetcher, build_frame, read_bars, read_metadata, read_universe, select_dates, write_metadata
+
+
+class Source:
+    """
+    Asynchronous source of bars. Extend this class and override method `retrotester.fetch.Source.fetch`
+    """
+
+    async def fetch(self, symbol: str, start: datetime, end: datetime) -> Dict[str, np.ndarray]:
+        """
+        Return the bars of symbol between start and end as columns
+        Override this method
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release the resources of the source (connections, threads)"""
+        pass
+
+    @property
+    def description(self) -> str:
+        """Description of the source of the bars, stored with the cached bars (see `retrotester.loader.Fetcher.description`)"""
+        return type(self).__name__
+
+
+class FetcherSource(Source):
+    """
+    Source running a synchronous retrotester.loader.Fetcher (such as YahooFetcher or FileFetcher) in threads
+    """
+
+    def __init__(self, fetcher: Fetcher, max_workers: int = 8):
+        self.fetcher = fetcher
+        self._executor = ThreadPoolExecutor(max_workers)
+
+    async def fetch(self, symbol: str, start: datetime, end: datetime) -> Dict[str, np.ndarray]:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.fetcher.fetch, symbol, start, end)
+
+    def close(self):
+        self._executor.shutdown()
+
+    @property
+    def description(self) -> str:
+        return self.fetcher.description
+
+
+class HTTPSource(Source):
+    """
+    Bars served as CSV files by an HTTP server, at {url}/{symbol}.csv by default.
+    A local server (`python -m http.server` in a directory of CSV files) can stand in for a provider.
+    Connections are kept in a pool and reused from a request to the next
+    """
+
+    def __init__(self, url: str, path: str = "{symbol}.csv", max_connections: int = 8, timeout: float = 30):
+        parts = urlsplit(url)
+        self.url = url.rstrip("/")
+        self._connection = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.host = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.path = path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue()
+        for _ in range(max_connections):
+            self._pool.put(None)
+        self._executor = ThreadPoolExecutor(max_connections)
+
+    def _get(self, path: str) -> bytes:
+        """Return the body of a GET request, with a connection of the pool"""
+        connection = self._pool.get() or self._connection(self.host, timeout=self.timeout)
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            body = response.read()
+        except Exception:
+            connection.close()
+            self._pool.put(None)
+            raise
+        self._pool.put(connection)
+        if response.status != 200:
+            raise OSError(f"GET {path} returned {response.status} {response.reason}")
+        return body
+
+    async def fetch(self, symbol: str, start: datetime, end: datetime) -> Dict[str, np.ndarray]:
+        path = f"{self.prefix}/{self.path.format(symbol=symbol)}"
+        body = await asyncio.get_running_loop().run_in_executor(self._executor, self._get, path)
+        return select_dates(read_bars(io.BytesIO(body)), start, end)
+
+    def close(self):
+        while not self._pool.empty():
+            connection = self._pool.get()
+            if connection is not None:
+                connection.close()
+        self._executor.shutdown()
+
+    @property
+    def description(self) -> str:
+        return f"{self.url}/{self.path}"
+
+
+async def fetch_with_retry(
+    source: Source, symbol: str, start: datetime, end: datetime, semaphore: asyncio.Semaphore, retries: int = 3, backoff: float = 0.5
+) -> Dict[str, np.ndarray]:
+    """Fetch the bars of symbol, retrying failed requests after backoff, 2 * backoff, 4 * backoff... seconds"""
+    async with semaphore:
+        for attempt in range(retries + 1):
+            try:
+                return await source.fetch(symbol, start, end)
+            except Exception as e:
+                if attempt == retries:
+                    raise RuntimeError(f"Problem when fetching {symbol} symbol") from e
+            await asyncio.sleep(backoff * 2**attempt)
+
+
+async def fetch_all(
+    source: Source, ranges: Dict[str, Tuple[datetime, datetime]], concurrency: int = 8, retries: int = 3, backoff: float = 0.5
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """Fetch the bars of several symbols concurrently
+
+    Parameters
+    ----------
+    source : Source
+        source of the bars
+    ranges : Dict[str, Tuple[datetime, datetime]]
+        symbols as keys and start and end of the bars to fetch as values
+    concurrency : int, optional
+        maximum number of requests at once, by default 8
+    retries : int, optional
+        number of retries of a failed request, by default 3
+    backoff : float, optional
+        seconds before the first retry, doubled at each retry, by default 0.5
+
+    Returns
+    -------
+    Dict[str, Dict[str, np.ndarray]]
+        symbols as keys and their bars as columns as values
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [fetch_with_retry(source, symbol, start, end, semaphore, retries, backoff) for symbol, (start, end) in ranges.items()]
+    return dict(zip(ranges, await asyncio.gather(*tasks)))
+
+
+async def aupdate_universe(
+    path: str,
+    source: Source,
+    cache_dir: str,
+    symbols: List[str] = None,
+    concurrency: int = 8,
+    retries: int = 3,
+    backoff: float = 0.5,
+) -> Data:
+    """Fetch the bars of a universe file concurrently and save them to cache_dir (see `retrotester.loader.load_universe`).
+    If cache_dir already holds bars of the same source, only the bars after the last cached bar of each symbol
+    are fetched and appended. Await it from a running event loop, such as a Jupyter notebook's,
+    or call `retrotester.fetch.update_universe` outside of one
+
+    Parameters
+    ----------
+    path : str
+        path of the universe file (see `retrotester.loader.read_universe`)
+    source : Source
+        source of the bars
+    cache_dir : str
+        directory of the binary cache
+    symbols : List[str], optional
+        symbols of the universe to update, by default all
+    concurrency, retries, backoff
+        see `retrotester.fetch.fetch_all`
+
+    Returns
+    -------
+    Data
+        data in columnar mode, backed by the files of cache_dir
+    """
+    universe = read_universe(path)
+    symbols = symbols or list(universe)
+    metadata = read_metadata(cache_dir)
+    cached = os.path.isdir(os.path.join(cache_dir, "columns")) and metadata is not None and metadata["source"] == source.description
+    # read in memory, as the files are rewritten
+    frame = QuoteFrame.open(cache_dir, mmap_mode=None) if cached else None
+    ranges = dict()
+    for symbol in symbols:
+        start, end = universe[symbol]["start"], universe[symbol]["end"]
+        if frame is not None and symbol in frame.symbols and len(frame.symbol_rows(symbol)):
+            last = frame.ts[frame.symbol_rows(symbol)[-1]].item()
+            start = max(start, last + timedelta(microseconds=1))
+        if start <= end:
+            ranges[symbol] = (start, end)
+    new = await fetch_all(source, ranges, concurrency, retries, backoff)
+    # sources may return the last cached bar again
+    new = {symbol: select_dates(columns, ranges[symbol][0], ranges[symbol][1]) for symbol, columns in new.items()}
+    new = {symbol: columns for symbol, columns in new.items() if len(columns["ts"])}
+    if new or not cached:
+        new_frame = build_frame(new)
+        frame = new_frame if frame is None else frame.append(new_frame)
+        frame.save(cache_dir)
+        write_metadata(cache_dir, frame.symbols, source.description)
+    return Data.open(cache_dir)
+
+
+def update_universe(
+    path: str,
+    source: Source,
+    cache_dir: str,
+    symbols: List[str] = None,
+    concurrency: int = 8,
+    retries: int = 3,
+    backoff: float = 0.5,
+) -> Data:
+    """Run `retrotester.fetch.aupdate_universe` in a new event loop, outside of a running one
+    (await `retrotester.fetch.aupdate_universe` in a Jupyter notebook instead)"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(aupdate_universe(path, source, cache_dir, symbols, concurrency, retries, backoff))
+    raise RuntimeError("update_universe cannot run in a running event loop, await aupdate_universe instead")
@@ -0,0 +1,544 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, Iterable, Tuple
+from collections.abc import Mapping, Sequence
+from datetime import datetime
+from operator import attrgetter
+import numpy as np
+import os
+import tempfile
+
+if TYPE_CHECKING:
+    from .dataobj import Quote
+
+FIELDS = ("open", "high", "low", "close", "adj_close", "volume", "signal")
+
+
+def _to_value(value):
+    """Convert a stored float to the value exposed on a quote (NaN is exposed as None)"""
+    value = value.item()
+    return None if value != value else value
+
+
+class QuoteFrame:
+    """
+    This object represents quotes stored in columns,
+    with one contiguous array per field and rows sorted by (symbol, ts)
+    """
+
+    def __init__(self, symbols: Iterable[str], ts: Iterable[datetime], columns: Dict[str, Iterable[float]] = None):
+        columns = columns or dict()
+        ts = np.asarray(ts, dtype="datetime64[us]")
+        symbols, codes = np.unique(np.asarray(symbols, dtype=str), return_inverse=True)
+        order = np.lexsort((ts, codes))
+        sorted_columns = dict()
+        for field in FIELDS:
+            values = columns.get(field)
+            if values is None:
+                sorted_columns[field] = np.full(len(ts), np.nan)
+            else:
+                sorted_columns[field] = np.asarray(values, dtype=np.float64)[order]
+        for field, values in columns.items():
+            if field not in sorted_columns:
+                sorted_columns[field] = np.asarray(values, dtype=np.float64)[order]
+        self._init_sorted(symbols.tolist(), codes[order].astype(np.int32), ts[order], sorted_columns)
+
+    def _init_sorted(self, symbols: List[str], codes: np.ndarray, ts: np.ndarray, columns: Dict[str, np.ndarray]):
+        """Set the frame from arrays already sorted by (symbol, ts)"""
+        self.symbols = symbols
+        self.codes = codes
+        self.ts = ts
+        self.columns = columns
+        self.offsets = np.searchsorted(self.codes, np.arange(len(self.symbols) + 1)).astype(np.int64)
+        self._symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        # number of writes to the columns, the views read the values again after writes by others
+        self._version = 0
+        # directory of the files of a frame opened with `open`, and scratch file of each column added since
+        self.directory = None
+        self._scratch = dict()
+
+    def detach(self):
+        """Make the columns private to the current process, as a process forked from the one computing indicators
+        on the frame: columns of scratch files are mapped copy-on-write, as the column files, and columns added
+        from now on are kept in memory, so the writes of the process are not seen by the others"""
+        for field, file in self._scratch.items():
+            if isinstance(self.columns.get(field), np.memmap):
+                self.columns[field] = np.memmap(file, dtype=np.float64, mode="c", shape=(len(self),))
+        self._scratch = dict()
+        self.directory = None
+
+    def copy(self) -> QuoteFrame:
+        """Return a frame of the same rows whose columns can be written without changing the columns of self:
+        columns of files are mapped again copy-on-write, the others are copied in memory"""
+        frame = QuoteFrame.__new__(QuoteFrame)
+        frame.__dict__.update(self.__dict__)
+        frame.columns = dict()
+        for field, column in self.columns.items():
+            if field in self._scratch:
+                column = np.memmap(self._scratch[field], dtype=np.float64, mode="c", shape=(len(self),))
+            elif isinstance(column, np.memmap) and column.filename is not None:
+                column = np.memmap(column.filename, dtype=column.dtype, mode="c", shape=column.shape, offset=column.offset)
+            else:
+                column = np.array(column)
+            frame.columns[field] = column
+        frame._scratch, frame.directory, frame._version = dict(), None, 0
+        return frame
+
+    def __getstate__(self) -> dict:
+        # columns are sent to other processes as arrays, without the scratch files
+        state = self.__dict__.copy()
+        state["_scratch"], state["directory"] = dict(), None
+        return state
+
+    def _empty_column(self, field: str, length: int) -> np.ndarray:
+        """Return an uninitialized column of length, memory-mapped to a scratch file if the frame is opened from files.
+        Scratch files are temporary files of the frame, in the scratch directory of its directory,
+        removed when they are closed (when the frame is garbage collected or the process exits)"""
+        if self.directory is None or length == 0:
+            return np.empty(length)
+        os.makedirs(os.path.join(self.directory, "scratch"), exist_ok=True)
+        self._scratch[field] = tempfile.TemporaryFile(dir=os.path.join(self.directory, "scratch"), suffix=f"-{field}")
+        return np.memmap(self._scratch[field], dtype=np.float64, mode="w+", shape=(length,))
+
+    def _new_column(self, field: str) -> np.ndarray:
+        """Return a column of NaN, memory-mapped to a scratch file if the frame is opened from files"""
+        column = self._empty_column(field, len(self))
+        column[:] = np.nan
+        return column
+
+    @classmethod
+    def from_quotes(cls, quotes: List[Quote]) -> QuoteFrame:
+        """Build a frame from a list of quotes
+
+        Parameters
+        ----------
+        quotes : List[Quote]
+            list of quotes
+
+        Returns
+        -------
+        QuoteFrame
+            quotes stored in columns
+        """
+        rows = np.array(list(map(attrgetter(*FIELDS), quotes)), dtype=np.float64).reshape(len(quotes), len(FIELDS))
+        # datetimes are converted once per date, quotes of a date sharing the same ts
+        dates = dict()
+        positions = [dates.setdefault(q.ts, len(dates)) for q in quotes]
+        ts = np.array(list(dates), dtype="datetime64[us]")[np.array(positions, dtype=np.int64)]
+        return cls([q.symbol for q in quotes], ts, {field: rows[:, j] for j, field in enumerate(FIELDS)})
+
+    def to_quotes(self) -> List[Quote]:
+        """Return the rows as a list of quotes, without the columns added to the fields (indicators)"""
+        from .dataobj import Quote
+
+        symbols = [self.symbols[code] for code in self.codes.tolist()]
+        values = [[None if v != v else v for v in self.columns[field].tolist()] for field in FIELDS]
+        return [Quote(symbol, ts, *row) for symbol, ts, *row in zip(symbols, self.ts.tolist(), *values)]
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def save(self, directory: str):
+        """Save the frame as .npy files, one per column, in directory"""
+        os.makedirs(os.path.join(directory, "columns"), exist_ok=True)
+        np.save(os.path.join(directory, "symbols.npy"), np.asarray(self.symbols, dtype=str))
+        np.save(os.path.join(directory, "codes.npy"), self.codes)
+        np.save(os.path.join(directory, "ts.npy"), self.ts)
+        for field, values in self.columns.items():
+            np.save(os.path.join(directory, "columns", f"{field}.npy"), values)
+
+    @classmethod
+    def open(cls, directory: str, mmap_mode: str = "c") -> QuoteFrame:
+        """Open a frame saved with `retrotester.frame.QuoteFrame.save`.
+        The rows of each symbol are contiguous in the column files, so reading a symbol
+        only pages in its range. Columns added later (indicators) are memory-mapped to
+        temporary files of the frame, in the scratch directory of directory
+
+        Parameters
+        ----------
+        directory : str
+            directory of the frame
+        mmap_mode : str, optional
+            memory-map mode of the columns (see numpy.load), by default "c" (copy-on-write), None to read them in memory
+
+        Returns
+        -------
+        QuoteFrame
+            frame whose columns are memory-mapped files
+        """
+        frame = cls.__new__(cls)
+        load = lambda *path: np.load(os.path.join(directory, *path), mmap_mode=mmap_mode)
+        columns = {file[:-4]: load("columns", file) for file in sorted(os.listdir(os.path.join(directory, "columns")))}
+        frame._init_sorted(np.load(os.path.join(directory, "symbols.npy")).tolist(), load("codes.npy"), load("ts.npy"), columns)
+        if mmap_mode is not None:
+            frame.directory = directory
+        return frame
+
+    def append(self, other: QuoteFrame) -> QuoteFrame:
+        """Return a new frame containing the rows of self and other.
+        When the rows of other are after the last row of their symbol in self (new quotes), they are inserted
+        after the rows of their symbol without sorting the frame, and the new frame of a frame opened from files
+        keeps its directory, with its columns memory-mapped to scratch files"""
+        merged = self._append_newer(other)
+        if merged is not None:
+            return merged
+        symbols = [self.symbols[c] for c in self.codes] + [other.symbols[c] for c in other.codes]
+        fields = set(self.columns) | set(other.columns)
+        columns = {
+            field: np.concatenate([frame.columns.get(field, np.full(len(frame), np.nan)) for frame in (self, other)])
+            for field in fields
+        }
+        return QuoteFrame(symbols, np.concatenate([self.ts, other.ts]), columns)
+
+    def _append_newer(self, other: QuoteFrame) -> QuoteFrame:
+        """Return the frame of the rows of self followed, for each symbol, by the rows of other,
+        in O(len(self) + len(other)), or None if a row of other is not after the last row of its symbol in self"""
+        symbols = sorted(set(self.symbols) | set(other.symbols))
+        index = {symbol: i for i, symbol in enumerate(symbols)}
+        # codes of the symbols of self and other in the new frame, increasing as the symbols are sorted
+        self_map = np.array([index[symbol] for symbol in self.symbols], dtype=np.int32)
+        other_map = np.array([index[symbol] for symbol in other.symbols], dtype=np.int32)
+        self_counts = np.zeros(len(symbols), dtype=np.int64)
+        other_counts = np.zeros(len(symbols), dtype=np.int64)
+        self_counts[self_map], other_counts[other_map] = np.diff(self.offsets), np.diff(other.offsets)
+        # ts of the last row of each symbol in self and of the first row in other
+        last = np.full(len(symbols), np.datetime64("NaT"), dtype="datetime64[us]")
+        first = np.full(len(symbols), np.datetime64("NaT"), dtype="datetime64[us]")
+        present = np.diff(self.offsets) > 0
+        last[self_map[present]] = self.ts[self.offsets[1:][present] - 1]
+        present = np.diff(other.offsets) > 0
+        first[other_map[present]] = other.ts[other.offsets[:-1][present]]
+        both = (self_counts > 0) & (other_counts > 0)
+        if (first[both] <= last[both]).any():
+            return None
+
+        offsets = np.concatenate([[0], np.cumsum(self_counts + other_counts)])
+        self_codes, other_codes = self_map[self.codes], other_map[other.codes]
+        # position of each row in the new frame: offset of its symbol and position in its symbol,
+        # after the rows of self for the rows of other
+        self_rows = offsets[self_codes] + np.arange(len(self)) - (np.cumsum(self_counts) - self_counts)[self_codes]
+        other_rows = offsets[other_codes] + self_counts[other_codes] + np.arange(len(other)) - (np.cumsum(other_counts) - other_counts)[other_codes]
+        n = len(self) + len(other)
+
+        merged = QuoteFrame.__new__(QuoteFrame)
+        merged.directory, merged._scratch = self.directory, dict()
+        codes = np.empty(n, dtype=np.int32)
+        codes[self_rows], codes[other_rows] = self_codes, other_codes
+        ts = np.empty(n, dtype="datetime64[us]")
+        ts[self_rows], ts[other_rows] = self.ts, other.ts
+        columns = dict()
+        for field in [*self.columns, *(field for field in other.columns if field not in self.columns)]:
+            column = merged._empty_column(field, n)
+            for frame, rows in ((self, self_rows), (other, other_rows)):
+                column[rows] = frame.columns[field] if field in frame.columns else np.nan
+            columns[field] = column
+        scratch = merged._scratch
+        merged._init_sorted(symbols, codes, ts, columns)
+        merged.directory, merged._scratch = self.directory, scratch
+        return merged
+
+    @property
+    def dates(self) -> List[datetime]:
+        """Return the sorted distinct timestamps of the frame"""
+        return np.unique(self.ts).tolist()
+
+    def symbol_rows(self, symbol: str) -> range:
+        """Return the rows of a symbol"""
+        i = self._symbol_index[symbol]
+        return range(self.offsets[i], self.offsets[i + 1])
+
+    @property
+    def alignment(self) -> Tuple[Dict[datetime, int], np.ndarray]:
+        """Return the position of each distinct ts and the row of each (symbol, ts),
+        -1 where there is no quote, as an array of shape (symbol x ts)
+        """
+        if not hasattr(self, "_alignment"):
+            dates = np.unique(self.ts)
+            rows = np.full((len(self.symbols), len(dates)), -1, dtype=np.int32 if len(self) < 2**31 else np.int64)
+            rows[self.codes, np.searchsorted(dates, self.ts)] = np.arange(len(self))
+            self._alignment = {d: i for i, d in enumerate(dates.tolist())}, rows
+        return self._alignment
+
+    def find(self, symbol: str, ts: datetime) -> int:
+        """Return the row of the quote (symbol, ts), -1 if it does not exist"""
+        date_index, rows = self.alignment
+        i, j = self._symbol_index.get(symbol), date_index.get(ts)
+        if i is None or j is None:
+            return -1
+        return int(rows[i, j])
+
+    def gaps(self) -> Dict[str, List[datetime]]:
+        """Return the dates without quote between the first and the last quote of each symbol"""
+        date_index, rows = self.alignment
+        dates = np.array(list(date_index))
+        gaps = dict()
+        for symbol, symbol_rows in zip(self.symbols, rows):
+            present = np.flatnonzero(symbol_rows >= 0)
+            if len(present) and present[-1] - present[0] + 1 > len(present):
+                window = symbol_rows[present[0] : present[-1] + 1]
+                gaps[symbol] = dates[present[0] : present[-1] + 1][window < 0].tolist()
+        return gaps
+
+    def _positions(self, symbols: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        """Return the rows of symbols with their position in the symbol series and their column"""
+        idx = np.array([self._symbol_index[symbol] for symbol in symbols], dtype=np.int64)
+        starts, lengths = self.offsets[idx], self.offsets[idx + 1] - self.offsets[idx]
+        cols = np.repeat(np.arange(len(idx)), lengths)
+        pos = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return np.repeat(starts, lengths) + pos, pos, cols, int(lengths.max(initial=0))
+
+    def stack(self, field: str, symbols: List[str]) -> np.ndarray:
+        """Return the series of field for symbols as an array of shape (time x symbol), padded with NaN at the end"""
+        rows, pos, cols, length = self._positions(symbols)
+        out = np.full((length, len(symbols)), np.nan)
+        out[pos, cols] = self.columns[field][rows]
+        return out
+
+    def unstack(self, field: str, values: np.ndarray, symbols: List[str]):
+        """Write an array of shape (time x symbol), as returned by `stack`, to the column field"""
+        rows, pos, cols, _ = self._positions(symbols)
+        if field not in self.columns:
+            self.columns[field] = self._new_column(field)
+        self.columns[field][rows] = values[pos, cols]
+        self._version += 1
+
+    def resample(self, unit: str) -> QuoteFrame:
+        """Return the bars aggregated by calendar period, labelled by the start of their period:
+        first open, highest high, lowest low, last close and adj_close, and total volume
+
+        Parameters
+        ----------
+        unit : str
+            numpy datetime unit of the periods, such as "h", "D" or "M"
+
+        Returns
+        -------
+        QuoteFrame
+            one row per symbol and period with quotes, without signals and indicators
+        """
+        periods = self.ts.astype(f"datetime64[{unit}]")
+        new = np.ones(len(self), dtype=bool)
+        new[1:] = (self.codes[1:] != self.codes[:-1]) | (periods[1:] != periods[:-1])
+        starts = np.flatnonzero(new)
+        ends = np.append(starts[1:], len(self)) - 1
+        columns = {field: np.full(len(starts), np.nan) for field in FIELDS}
+        if len(starts):
+            volume = self.columns["volume"]
+            traded = np.add.reduceat(~np.isnan(volume), starts) > 0
+            columns["open"] = self.columns["open"][starts]
+            columns["high"] = np.fmax.reduceat(self.columns["high"], starts)
+            columns["low"] = np.fmin.reduceat(self.columns["low"], starts)
+            columns["close"] = self.columns["close"][ends]
+            columns["adj_close"] = self.columns["adj_close"][ends]
+            columns["volume"] = np.where(traded, np.add.reduceat(np.nan_to_num(volume), starts), np.nan)
+        frame = QuoteFrame.__new__(QuoteFrame)
+        frame._init_sorted(self.symbols, np.asarray(self.codes[starts]), periods[starts].astype("datetime64[us]"), columns)
+        return frame
+
+    def get(self, field: str, row: int):
+        if field == "symbol":
+            return self.symbols[self.codes[row]]
+        if field == "ts":
+            return self.ts[row].item()
+        return _to_value(self.columns[field][row])
+
+    def set(self, field: str, row: int, value):
+        if field in ("symbol", "ts"):
+            raise AttributeError(f"{field} of a quote stored in a QuoteFrame is read-only")
+        if field not in self.columns:
+            self.columns[field] = self._new_column(field)
+        self.columns[field][row] = np.nan if value is None else value
+        self._version += 1
+
+    def view(self, row: int) -> QuoteView:
+        return QuoteView((_Rows(self, [row]), 0))
+
+    def views(self, rows: Iterable[int]) -> List[QuoteView]:
+        # the views share the lists of values of rows
+        rows = _Rows(self, rows)
+        return [QuoteView((rows, i)) for i in range(len(rows.rows))]
+
+
+class _Rows:
+    """
+    This object represents rows of a QuoteFrame read through views, e.g. the series of a symbol.
+    The values of a field are read from the column once for all the rows, as a list,
+    at the first access to the field on one of the views. The lists are read again after
+    writes to the frame other than the writes made through the views of the rows
+    """
+
+    __slots__ = ("frame", "rows", "values", "version")
+
+    def __init__(self, frame: QuoteFrame, rows: Iterable[int]):
+        self.frame = frame
+        # ranges of rows, as the series of a symbol, are read as slices of the columns
+        self.rows = rows if isinstance(rows, range) and rows.step == 1 else np.asarray(rows, dtype=np.int64).reshape(-1)
+        self.values = dict()
+        self.version = frame._version
+
+    def _read(self, field: str) -> list:
+        frame = self.frame
+        index = slice(self.rows.start, self.rows.stop) if isinstance(self.rows, range) else self.rows
+        if field == "symbol":
+            return [frame.symbols[code] for code in frame.codes[index].tolist()]
+        if field == "ts":
+            return frame.ts[index].tolist()
+        return [None if v != v else v for v in frame.columns[field][index].tolist()]
+
+    def get(self, field: str, i: int):
+        if self.version != self.frame._version:
+            self.values, self.version = dict(), self.frame._version
+        try:
+            return self.values[field][i]
+        except KeyError:
+            self.values[field] = self._read(field)
+            return self.values[field][i]
+
+    def set(self, field: str, i: int, value):
+        current = self.version == self.frame._version
+        self.frame.set(field, self.rows[i], value)
+        if current:
+            # the write is the only change since the lists were read
+            self.version = self.frame._version
+            if field in self.values:
+                value = None if value is None else float(value)
+                self.values[field][i] = None if value != value else value
+
+
+class QuoteView(tuple):
+    """
+    This object represents a market quote stored in a retrotester.frame.QuoteFrame,
+    it reads and writes its attributes from and to the frame columns.
+    A view is a pair (rows, position) of the rows it is created with, so creating views
+    and reading their attributes costs a tuple and a list lookup
+    """
+
+    __slots__ = ()
+
+    def __getattribute__(self, name: str):
+        try:
+            return self[0].get(name, self[1])
+        except KeyError:
+            # not a field: attributes of the view itself, as its methods
+            return tuple.__getattribute__(self, name)
+
+    def __setattr__(self, name: str, value):
+        self[0].set(name, self[1], value)
+
+    def __str__(self) -> str:
+        fields = ("symbol", "ts", *self[0].frame.columns)
+        return f"Quote({', '.join([f'{k}={getattr(self, k)}' for k in fields])}"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
+class _FrameQuotes(Sequence):
+    """
+    This object represents the quotes of a frame as a list of views created on access
+    """
+
+    def __init__(self, frame: QuoteFrame):
+        self._frame = frame
+
+    def __len__(self) -> int:
+        return len(self._frame)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._frame.views(range(len(self._frame))[i])
+        return self._frame.view(range(len(self._frame))[i])
+
+
+class _FrameQuotesBySymbol(Mapping):
+    """
+    This object represents the quotes of a frame arranged by symbol,
+    the lists of views are created on access
+    """
+
+    def __init__(self, frame: QuoteFrame):
+        self._frame = frame
+
+    def __getitem__(self, symbol: str) -> List[QuoteView]:
+        return self._frame.views(self._frame.symbol_rows(symbol))
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._frame._symbol_index
+
+    def __iter__(self):
+        return iter(self._frame.symbols)
+
+    def __len__(self) -> int:
+        return len(self._frame.symbols)
+
+
+class _FrameQuotesByTs(Mapping):
+    """
+    This object represents the quotes of a frame arranged by ts,
+    the lists of views are created on access
+    """
+
+    def __init__(self, frame: QuoteFrame):
+        self._frame = frame
+        self._index, self._rows = frame.alignment
+
+    def __contains__(self, ts: datetime) -> bool:
+        return ts in self._index
+
+    def __getitem__(self, ts: datetime) -> List[QuoteView]:
+        rows = self._rows[:, self._index[ts]]
+        return self._frame.views(rows[rows >= 0])
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+class _FrameQuotesByPk(Mapping):
+    """
+    This object represents the quotes of a frame arranged in a mapping,
+    with a tuple (quote.symbol, quote.ts) as key and a view as value
+    """
+
+    def __init__(self, frame: QuoteFrame):
+        self._frame = frame
+
+    def _key(self, row: int) -> Tuple[str, datetime]:
+        return self._frame.get("symbol", row), self._frame.get("ts", row)
+
+    def _row(self, k: Tuple[str, datetime]) -> int:
+        row = self._frame.find(*k)
+        if row < 0:
+            raise KeyError(k)
+        return row
+
+    def __getitem__(self, k: Tuple[str, datetime]) -> QuoteView:
+        return self._frame.view(self._row(k))
+
+    def __contains__(self, k: Tuple[str, datetime]) -> bool:
+        return self._frame.find(*k) >= 0
+
+    def __iter__(self):
+        return (self._key(row) for row in range(len(self._frame)))
+
+    def __len__(self) -> int:
+        return len(self._frame)
+
+    def gaps(self, dates: List[datetime]) -> Dict[str, List[datetime]]:
+        """Return the dates without quote between the first and the last quote of each symbol"""
+        return self._frame.gaps()
+
+    def get_next_key(self, k: Tuple[str, datetime]):
+        """Get the next key after k"""
+        row = self._row(k)
+        if row + 1 < self._frame.offsets[self._frame.codes[row] + 1]:
+            return self._key(row + 1)
+        return None
+
+    def get_prev_key(self, k: Tuple[str, datetime]):
+        """Get the previous key before k"""
+        row = self._row(k)
+        if row > self._frame.offsets[self._frame.codes[row]]:
+            return self._key(row - 1)
+        return None
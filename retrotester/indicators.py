@@ -4,30 +4,203 @@ from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from retrotester import Config
-from typing import List, Callable
-from statistics import mean, stdev
+    from .dataobj import Data
+    from .cache import IndicatorCache
+from typing import List, Callable, Dict
 from itertools import islice
-import operator
+from collections import deque
+import numpy as np
 from .mathfunc import division
 
 
+def _rolling_mean(x: np.ndarray, n: int) -> np.ndarray:
+    """Rolling mean of width n along the first axis of x, computed with a cumulative sum"""
+    out = np.full(x.shape, np.nan)
+    if len(x) >= n:
+        csum = np.cumsum(np.concatenate([np.zeros((1, *x.shape[1:])), x]), axis=0)
+        out[n - 1 :] = (csum[n:] - csum[:-n]) / n
+    return out
+
+
+def _wilder_mean(x: np.ndarray, n: int) -> np.ndarray:
+    """Wilder smoothing of width n along the first axis of x, seeded with the mean of the first n values"""
+    out = np.full(x.shape, np.nan)
+    if len(x) >= n:
+        prev = x[:n].mean(axis=0)
+        out[n - 1] = prev
+        for i in range(n, len(x)):
+            prev = (prev * (n - 1) + x[i]) / n
+            out[i] = prev
+    return out
+
+
+def _shift(x: np.ndarray) -> np.ndarray:
+    """Shift x by one row along the first axis, the first row is NaN"""
+    out = np.full(x.shape, np.nan)
+    out[1:] = x[:-1]
+    return out
+
+
+def _to_value(x: float):
+    return None if x != x else float(x)
+
+
+class _RollingWindow:
+    """
+    Last n values of a series with their sum and their weighted sum (weights 1 to n, the latest value weighs n),
+    both updated in O(1) when a value is pushed
+    """
+
+    def __init__(self, n: int, values: List[float] = ()):
+        self.n = n
+        self.values = deque(maxlen=n)
+        self.sum = 0.0
+        self.wsum = 0.0
+        for x in values:
+            self.push(x)
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.n
+
+    def push(self, x: float):
+        if self.full:
+            self.wsum += self.n * x - self.sum
+            self.sum += x - self.values[0]
+        else:
+            self.wsum += (len(self.values) + 1) * x
+            self.sum += x
+        self.values.append(x)
+
+
 class Indicator:
     """
     This is object is a base class for representing an indicator.
-    Extend this class and override method: `retrotester.indicators.Indicator.compute_values`,
-    to define the calculation of the indicator
+    Extend this class and override method: `retrotester.indicators.Indicator.compute_array`,
+    (or `retrotester.indicators.Indicator.compute_values`) to define the calculation of the indicator
     """
 
+    # quote attributes needed by compute_array
+    fields = ()
+
     def __init__(self, config: Config, name: str):
         self._config = config
         self._name = name
+        self._states = dict()
+
+    @property
+    def settings(self) -> tuple:
+        """Return what determines the indicator values: its class, its input attributes and its public attributes"""
+        params = tuple(sorted((k, v) for k, v in self.__dict__.items() if not k.startswith("_")))
+        return type(self).__qualname__, tuple(self._fields()), params
+
+    def _fields(self) -> List[str]:
+        return [self._config.quote_period if field == "quote_period" else field for field in self.fields]
+
+    def compute_array(self, inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Compute the indicator values on arrays of shape (time x symbol),
+        each column holds the series of a symbol, padded with NaN at the end
+
+        Parameters
+        ----------
+        inputs : Dict[str, np.ndarray]
+            arrays of the fields declared in `fields`, `quote_period` is passed as "quote_period"
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            attribute name as keys and indicator values as values (NaN when there is no value)
+        """
+        raise NotImplementedError
+
+    def _compute(self, inputs: Dict[str, np.ndarray]):
+        """Return the indicator values and the intermediate arrays needed to seed the rolling states"""
+        return self.compute_array(inputs), dict()
+
+    def _seed(self, inputs: Dict[str, np.ndarray], outputs: Dict[str, np.ndarray], extras: Dict[str, np.ndarray]):
+        """Return the rolling state of a symbol from its full series (1-D arrays)
+        Override this method, with `retrotester.indicators.Indicator._step`, to support `update`
+        """
+        return None
+
+    def _step(self, state, quote: Quote) -> Dict[str, float]:
+        """Advance the rolling state with quote and return the indicator values of quote"""
+        raise NotImplementedError
+
+    def _seed_states(self, symbols: List[str], lengths: List[int], inputs: dict, outputs: dict, extras: dict):
+        for j, (symbol, length) in enumerate(zip(symbols, lengths)):
+            column = lambda arrays: {k: v[:length, j] for k, v in arrays.items()}
+            self._states[symbol] = self._seed(column(inputs), column(outputs), column(extras))
+
+    def update(self, quote: Quote):
+        """Compute the indicator values of a new quote, in O(1), from the rolling state of its symbol.
+        The state is seeded by `compute_values`/`compute_batch`, or starts empty for a new symbol
+
+        Parameters
+        ----------
+        quote : Quote
+            quote following the last quote seen for its symbol
+        """
+        if quote.symbol not in self._states:
+            inputs = {field: np.empty((0, 1)) for field in self.fields}
+            self._seed_states([quote.symbol], [0], inputs, *self._compute(inputs))
+        for name, value in self._step(self._states[quote.symbol], quote).items():
+            setattr(quote, name, value)
+
+    def outputs(self) -> List[str]:
+        """Return the quote attributes set by the indicator"""
+        if type(self).compute_array is Indicator.compute_array:
+            return [self._name]
+        return list(self._compute({field: np.empty((0, 1)) for field in self.fields})[0])
+
+    def _inputs(self, get: Callable) -> Dict[str, np.ndarray]:
+        return {field: get(name) for field, name in zip(self.fields, self._fields())}
 
     def compute_values(self, data: List[Quote]):
         """
         Compute the indicator values for each quote
-        Override this method
+        Override this method or `retrotester.indicators.Indicator.compute_array`
         """
-        raise NotImplementedError
+        inputs = self._inputs(lambda name: np.array([getattr(q, name) for q in data], dtype=np.float64).reshape(-1, 1))
+        outputs, extras = self._compute(inputs)
+        for name, values in outputs.items():
+            for quote, value in zip(data, values[:, 0].tolist()):
+                setattr(quote, name, None if value != value else value)
+        if data:
+            self._seed_states([data[0].symbol], [len(data)], inputs, outputs, extras)
+
+    def compute_batch(self, data: Data, symbols: List[str], cache: IndicatorCache = None):
+        """Compute the indicator values for all the symbols in one pass
+
+        Parameters
+        ----------
+        data : Data
+            data holding the quotes
+        symbols : List[str]
+            symbols to compute the indicator for
+        cache : IndicatorCache, optional
+            cache of indicator values to read from and write to, by default None
+        """
+        if type(self).compute_array is Indicator.compute_array:
+            # indicator only overrides compute_values
+            for underlying_code in symbols:
+                try:
+                    self.compute_values(data.quotes_by_symbol[underlying_code])
+                except Exception as e:
+                    raise RuntimeError(f"Problem when computing {self._name} with {underlying_code} symbol") from e
+            return
+        for chunk in data.symbol_chunks(symbols):
+            try:
+                inputs, lengths = self._inputs(lambda name: data.stack(name, chunk)), data.series_lengths(chunk)
+                if cache is None:
+                    outputs, extras = self._compute(inputs)
+                else:
+                    outputs, extras = cache.compute(self, chunk, lengths, inputs)
+            except Exception as e:
+                raise RuntimeError(f"Problem when computing {self._name} with {', '.join(chunk)} symbol(s)") from e
+            for name, values in outputs.items():
+                data.unstack(name, values, chunk)
+            self._seed_states(chunk, lengths, inputs, outputs, extras)
 
 
 class MovingIndicator(Indicator):
@@ -80,11 +253,17 @@ class SimpleMovingAverage(MovingIndicator):
     see (https://en.wikipedia.org/wiki/Moving_average#Simple_moving_average)
     """
 
-    def compute_values(self, data: List[Quote]):
-        quotes = list(map(lambda x: getattr(x, self._config.quote_period), data))
-        ma = self.apply(mean, quotes)
-        for quote, a in zip(data, ma):
-            setattr(quote, self._name, a)
+    fields = ("quote_period",)
+
+    def compute_array(self, inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        return {self._name: _rolling_mean(inputs["quote_period"], self.window_size)}
+
+    def _seed(self, inputs, outputs, extras):
+        return _RollingWindow(self.window_size, inputs["quote_period"][-self.window_size :].tolist())
+
+    def _step(self, state: _RollingWindow, quote: Quote) -> Dict[str, float]:
+        state.push(getattr(quote, self._config.quote_period))
+        return {self._name: state.sum / self.window_size if state.full else None}
 
 
 class WeightedMovingAverage(MovingIndicator):
@@ -93,15 +272,28 @@ class WeightedMovingAverage(MovingIndicator):
     see (https://en.wikipedia.org/wiki/Moving_average#Weighted_moving_average)
     """
 
-    def compute_values(self, data: List[Quote]):
-        def weighted_average(quotes: List[float]):
-            weights = list(range(1, self.window_size + 1))
-            return sum([x * y for x, y in zip(quotes, weights)]) / (self.window_size * (self.window_size + 1) / 2)
+    fields = ("quote_period",)
+
+    def compute_array(self, inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        x = inputs["quote_period"]
+        wma = np.full(x.shape, np.nan)
+        if len(x) >= self.window_size:
+            weights = np.arange(1, self.window_size + 1) / (self.window_size * (self.window_size + 1) / 2)
+            # summed position by position rather than with a matrix product, whose rounding depends on
+            # the number of columns: the values of a symbol do not depend on the symbols stacked with it
+            n = len(x) - self.window_size + 1
+            total = np.zeros((n, *x.shape[1:]))
+            for k, weight in enumerate(weights.tolist()):
+                total += weight * x[k : k + n]
+            wma[self.window_size - 1 :] = total
+        return {self._name: wma}
+
+    def _seed(self, inputs, outputs, extras):
+        return _RollingWindow(self.window_size, inputs["quote_period"][-self.window_size :].tolist())
 
-        quotes = list(map(lambda x: getattr(x, self._config.quote_period), data))
-        wma = self.apply(weighted_average, quotes)
-        for quote, a in zip(data, wma):
-            setattr(quote, self._name, a)
+    def _step(self, state: _RollingWindow, quote: Quote) -> Dict[str, float]:
+        state.push(getattr(quote, self._config.quote_period))
+        return {self._name: state.wsum / (self.window_size * (self.window_size + 1) / 2) if state.full else None}
 
 
 class AccumulationDistributionOscillator(Indicator):
@@ -110,37 +302,95 @@ class AccumulationDistributionOscillator(Indicator):
     see (https://www.investopedia.com/terms/a/accumulationdistribution.asp)
     """
 
-    def compute_values(self, data: List[Quote]):
-        setattr(data[0], self._name, None)
-        for curr_quote, prec_quote in zip(data[1:], data[:-1]):
-            ado = division((curr_quote.high - prec_quote.close), (curr_quote.high - curr_quote.low))
-            setattr(curr_quote, self._name, ado)
+    fields = ("high", "low", "close")
+
+    def compute_array(self, inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        high, low = inputs["high"], inputs["low"]
+        num, den = high - _shift(inputs["close"]), high - low
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # 0 instead of ZeroDivisionError, as retrotester.mathfunc.division
+            ado = np.where((num == 0) | (den == 0), 0.0, num / den)
+        ado[:1] = np.nan
+        return {self._name: ado}
+
+    def _seed(self, inputs, outputs, extras):
+        return {"close": _to_value(inputs["close"][-1]) if len(inputs["close"]) else None}
+
+    def _step(self, state: dict, quote: Quote) -> Dict[str, float]:
+        prec_close, state["close"] = state["close"], quote.close
+        if prec_close is None:
+            return {self._name: None}
+        return {self._name: division((quote.high - prec_close), (quote.high - quote.low))}
 
 
 class RelativeStrenghtIndex(MovingIndicator):
     """
-    Relative strengh index with simple moving average
+    Relative strengh index with simple moving average (or Wilder smoothing with `wilder=True`)
     see (https://en.wikipedia.org/wiki/Relative_strength_index)
     """
 
-    def compute_values(self, data: List[Quote]):
-        def difference(quotes: List[float]):
-            return list(map(operator.sub, quotes[1:], quotes[:-1]))
-
-        quotes = list(map(lambda x: getattr(x, self._config.quote_period), data))
-        delta = difference(quotes)
-        ups = list(map(lambda x: max(x, 0), delta))
-        downs = list(map(lambda x: -1 * min(x, 0), delta))
-        ups_avg = self.apply(mean, ups)
-        downs_avg = self.apply(mean, downs)
-        res = list(map(division, ups_avg, downs_avg))
-        setattr(data[0], self._name, None)
-        for quote, rs in zip(data[1:], res):
-            if rs:
-                rsi = 100 - (100 / (1 + rs))
+    fields = ("quote_period",)
+
+    def __init__(self, config: Config, name: str, n: int = 2, wilder: bool = False):
+        super().__init__(config, name, n)
+        self.wilder = wilder
+
+    def compute_array(self, inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        return self._compute(inputs)[0]
+
+    def _compute(self, inputs: Dict[str, np.ndarray]):
+        average = _wilder_mean if self.wilder else _rolling_mean
+        delta = np.diff(inputs["quote_period"], axis=0)
+        ups_avg = average(np.maximum(delta, 0), self.window_size)
+        downs_avg = average(-np.minimum(delta, 0), self.window_size)
+        rsi = np.full(inputs["quote_period"].shape, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = ups_avg / downs_avg
+            # no value when one of the averages is 0, as retrotester.mathfunc.division
+            rsi[1:] = np.where((ups_avg == 0) | (downs_avg == 0), np.nan, 100 - (100 / (1 + rs)))
+        # averages aligned on the quotes, as rsi
+        extras = {"ups_avg": np.full(rsi.shape, np.nan), "downs_avg": np.full(rsi.shape, np.nan)}
+        extras["ups_avg"][1:], extras["downs_avg"][1:] = ups_avg, downs_avg
+        return {self._name: rsi}, extras
+
+    def _seed(self, inputs, outputs, extras):
+        x = inputs["quote_period"]
+        delta = np.diff(x)
+        state = {"prev": _to_value(x[-1]) if len(x) else None, "count": len(delta)}
+        if self.wilder:
+            state["ups"] = _to_value(extras["ups_avg"][-1]) if len(delta) >= self.window_size else np.maximum(delta, 0).sum()
+            state["downs"] = _to_value(extras["downs_avg"][-1]) if len(delta) >= self.window_size else -np.minimum(delta, 0).sum()
+        else:
+            delta = delta[-self.window_size :]
+            state["ups"] = _RollingWindow(self.window_size, np.maximum(delta, 0).tolist())
+            state["downs"] = _RollingWindow(self.window_size, (-np.minimum(delta, 0)).tolist())
+        return state
+
+    def _step(self, state: dict, quote: Quote) -> Dict[str, float]:
+        x = getattr(quote, self._config.quote_period)
+        prev, state["prev"] = state["prev"], x
+        if prev is None:
+            return {self._name: None}
+        delta, n = x - prev, self.window_size
+        up, down = max(delta, 0), -1 * min(delta, 0)
+        state["count"] += 1
+        if not self.wilder:
+            state["ups"].push(up)
+            state["downs"].push(down)
+            if not state["ups"].full:
+                return {self._name: None}
+            rs = division(state["ups"].sum / n, state["downs"].sum / n)
+        elif state["count"] < n:
+            state["ups"] += up
+            state["downs"] += down
+            return {self._name: None}
+        else:
+            if state["count"] == n:
+                state["ups"], state["downs"] = (state["ups"] + up) / n, (state["downs"] + down) / n
             else:
-                rsi = None
-            setattr(quote, self._name, rsi)
+                state["ups"], state["downs"] = (state["ups"] * (n - 1) + up) / n, (state["downs"] * (n - 1) + down) / n
+            rs = division(state["ups"], state["downs"])
+        return {self._name: 100 - (100 / (1 + rs)) if rs else None}
 
 
 class TrueRange(Indicator):
@@ -149,11 +399,23 @@ class TrueRange(Indicator):
     see (https://en.wikipedia.org/wiki/Average_true_range)
     """
 
-    def compute_values(self, data: List[Quote]):
-        setattr(data[0], self._name, None)
-        for curr_quote, prec_quote in zip(data[1:], data[:-1]):
-            tr = max(curr_quote.high - curr_quote.low, abs(curr_quote.high - prec_quote.close), abs(curr_quote.low - prec_quote.close))
-            setattr(curr_quote, self._name, tr)
+    fields = ("high", "low", "close")
+
+    def compute_array(self, inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        high, low, prec_close = inputs["high"], inputs["low"], _shift(inputs["close"])
+        tr = np.maximum(high - low, np.maximum(np.abs(high - prec_close), np.abs(low - prec_close)))
+        return {self._name: tr}
+
+    def _seed(self, inputs, outputs, extras):
+        return {"close": _to_value(inputs["close"][-1]) if len(inputs["close"]) else None}
+
+    @staticmethod
+    def true_range(quote: Quote, prec_close: float) -> float:
+        return max(quote.high - quote.low, abs(quote.high - prec_close), abs(quote.low - prec_close))
+
+    def _step(self, state: dict, quote: Quote) -> Dict[str, float]:
+        prec_close, state["close"] = state["close"], quote.close
+        return {self._name: None if prec_close is None else self.true_range(quote, prec_close)}
 
 
 class AverageTrueRange(MovingIndicator):
@@ -162,22 +424,33 @@ class AverageTrueRange(MovingIndicator):
     see (https://en.wikipedia.org/wiki/Average_true_range)
     """
 
-    def compute_values(self, data: List[Quote]):
-        def truerange_average(data: List[Quote]):
-            list_atr = [None] * (self.window_size - 1)
-            list_tr = [quote.tr for quote in data]
-            first_atr = mean(list_tr[: self.window_size])
-            list_atr.append(first_atr)
-            prev_atr = first_atr
-            for quote in data[self.window_size :]:
-                curr_atr = (prev_atr * (self.window_size - 1) + quote.tr) / self.window_size
-                list_atr.append(curr_atr)
-                prev_atr = curr_atr
-            return list_atr
-
-        true_range = TrueRange(self._config, "tr")
-        true_range.compute_values(data)
-        setattr(data[0], self._name, None)
-        list_atr = truerange_average(data[1:])
-        for quote, atr in zip(data[1:], list_atr):
-            setattr(quote, self._name, atr)
+    fields = ("high", "low", "close")
+
+    def compute_array(self, inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        tr = TrueRange(self._config, "tr").compute_array(inputs)["tr"]
+        atr = np.full(tr.shape, np.nan)
+        atr[1:] = _wilder_mean(tr[1:], self.window_size)
+        return {"tr": tr, self._name: atr}
+
+    def _seed(self, inputs, outputs, extras):
+        close, tr = inputs["close"], outputs["tr"][1:]
+        return {
+            "close": _to_value(close[-1]) if len(close) else None,
+            "count": len(tr),
+            "sum": tr.sum() if len(tr) < self.window_size else None,
+            "atr": _to_value(outputs[self._name][-1]) if len(tr) >= self.window_size else None,
+        }
+
+    def _step(self, state: dict, quote: Quote) -> Dict[str, float]:
+        prec_close, state["close"] = state["close"], quote.close
+        if prec_close is None:
+            return {"tr": None, self._name: None}
+        tr, n = TrueRange.true_range(quote, prec_close), self.window_size
+        state["count"] += 1
+        if state["count"] < n:
+            state["sum"] += tr
+        elif state["count"] == n:
+            state["atr"] = (state["sum"] + tr) / n
+        else:
+            state["atr"] = (state["atr"] * (n - 1) + tr) / n
+        return {"tr": tr, self._name: state["atr"]}
@@ -0,0 +1,249 @@
+from __future__ import annotations
+from typing import Dict, List
+from datetime import datetime
+import json
+import os
+import numpy as np
+from .dataobj import Data, Frequency
+from .frame import QuoteFrame, FIELDS
+
+# column names of the bar files (lower case) and their retrotester.dataobj.Quote attribute
+COLUMNS = {
+    "date": "ts",
+    "datetime": "ts",
+    "ts": "ts",
+    "open": "open",
+    "high": "high",
+    "low": "low",
+    "close": "close",
+    "adj close": "adj_close",
+    "adj_close": "adj_close",
+    "volume": "volume",
+}
+
+
+def read_universe(path: str) -> Dict[str, dict]:
+    """Read a universe file such as univers.json
+
+    Parameters
+    ----------
+    path : str
+        path of a json file with symbols as keys and their name, start and end dates (dd/mm/yyyy) as values
+
+    Returns
+    -------
+    Dict[str, dict]
+        symbols as keys and their name, start and end datetimes as values
+    """
+    with open(path) as f:
+        universe = json.load(f)
+    return {
+        symbol.upper(): {**info, "start": datetime.strptime(info["start"], "%d/%m/%Y"), "end": datetime.strptime(info["end"], "%d/%m/%Y")}
+        for symbol, info in universe.items()
+    }
+
+
+def columns_from_dataframe(df) -> Dict[str, np.ndarray]:
+    """Return the columns of a pandas DataFrame of bars, indexed or not by their date, as arrays"""
+    if "ts" not in map(str.lower, map(str, df.columns)) and "date" not in map(str.lower, map(str, df.columns)):
+        df = df.reset_index()
+    if hasattr(df.columns, "get_level_values") and df.columns.nlevels > 1:
+        df.columns = df.columns.get_level_values(0)
+    columns = dict()
+    for column in df.columns:
+        field = COLUMNS.get(str(column).lower())
+        if field == "ts":
+            ts = df[column]
+            if getattr(ts.dt, "tz", None) is not None:
+                ts = ts.dt.tz_localize(None)
+            columns[field] = ts.to_numpy(dtype="datetime64[us]")
+        elif field is not None:
+            columns[field] = df[column].to_numpy(dtype=np.float64)
+    return columns
+
+
+def read_bars(path) -> Dict[str, np.ndarray]:
+    """Read the bars of a CSV or Parquet file in bulk
+
+    Parameters
+    ----------
+    path : str or file object
+        path of the file (or CSV file object), with a date column and (some of) open, high, low, close, adj close and volume columns
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        retrotester.dataobj.Quote attributes as keys and columns as values
+    """
+    import pandas as pd
+
+    if isinstance(path, str) and path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+        date = next((c for c in df.columns if COLUMNS.get(c.lower()) == "ts"), None)
+        if date is None:
+            where = f" in {path}" if isinstance(path, str) else ""
+            raise ValueError(f"Missing date column (date, datetime or ts){where}")
+        df[date] = pd.to_datetime(df[date])
+    return columns_from_dataframe(df)
+
+
+def select_dates(columns: Dict[str, np.ndarray], start: datetime, end: datetime) -> Dict[str, np.ndarray]:
+    """Return the bars of columns between start and end (included)"""
+    mask = (columns["ts"] >= np.datetime64(start, "us")) & (columns["ts"] <= np.datetime64(end, "us"))
+    return {field: values[mask] for field, values in columns.items()}
+
+
+def validate_columns(columns: Dict[str, np.ndarray], symbol: str = None) -> Dict[str, np.ndarray]:
+    """Check the columns of bars at once, instead of quote by quote
+
+    Parameters
+    ----------
+    columns : Dict[str, np.ndarray]
+        retrotester.dataobj.Quote attributes as keys and columns as values
+    symbol : str, optional
+        symbol of the bars, for error messages, by default None
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        columns, ts as datetime64[us] and others as float64
+    """
+    where = f" for {symbol}" if symbol else ""
+    if "ts" not in columns:
+        raise ValueError(f"Missing ts column{where}")
+    unknown = set(columns) - set(FIELDS) - {"ts"}
+    if unknown:
+        raise ValueError(f"Unknown columns {sorted(unknown)}{where}")
+    lengths = set(map(len, columns.values()))
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths{where}")
+    columns = {field: np.asarray(values, dtype="datetime64[us]" if field == "ts" else np.float64) for field, values in columns.items()}
+    if np.isnat(columns["ts"]).any():
+        raise ValueError(f"Missing ts{where}")
+    if len(np.unique(columns["ts"])) != len(columns["ts"]):
+        raise ValueError(f"Duplicated ts{where}")
+    return columns
+
+
+class Fetcher:
+    """
+    Source of bars. Extend this class and override method `retrotester.loader.Fetcher.fetch`
+    """
+
+    def fetch(self, symbol: str, start: datetime, end: datetime) -> Dict[str, np.ndarray]:
+        """
+        Return the bars of symbol between start and end as columns
+        Override this method
+        """
+        raise NotImplementedError
+
+    @property
+    def description(self) -> str:
+        """Description of the source of the bars, stored with the bars cached by `retrotester.loader.load_universe`"""
+        return type(self).__name__
+
+
+class FileFetcher(Fetcher):
+    """
+    Bars read from local files named {symbol}.csv (or .parquet) in a directory
+    """
+
+    def __init__(self, directory: str, extension: str = "csv"):
+        self.directory = directory
+        self.extension = extension
+
+    def fetch(self, symbol: str, start: datetime, end: datetime) -> Dict[str, np.ndarray]:
+        return select_dates(read_bars(os.path.join(self.directory, f"{symbol}.{self.extension}")), start, end)
+
+    @property
+    def description(self) -> str:
+        return f"file:{os.path.abspath(self.directory)}/{{symbol}}.{self.extension}"
+
+
+class YahooFetcher(Fetcher):
+    """
+    Bars downloaded with yfinance
+    """
+
+    INTERVALS = {Frequency.HOURLY: "1h", Frequency.DAILY: "1d", Frequency.MONTHLY: "1mo"}
+
+    def __init__(self, frequency: Frequency = Frequency.DAILY):
+        self.frequency = frequency
+
+    def fetch(self, symbol: str, start: datetime, end: datetime) -> Dict[str, np.ndarray]:
+        import yfinance as yf
+
+        df = yf.download(symbol, start=start, end=end, interval=self.INTERVALS[self.frequency], auto_adjust=False, progress=False)
+        return columns_from_dataframe(df)
+
+    @property
+    def description(self) -> str:
+        return f"yahoo:{self.INTERVALS[self.frequency]}"
+
+
+def build_frame(columns_by_symbol: Dict[str, Dict[str, np.ndarray]]) -> QuoteFrame:
+    """Build a frame from the validated columns of each symbol"""
+    columns_by_symbol = {symbol: validate_columns(columns, symbol) for symbol, columns in columns_by_symbol.items()}
+    parts = list(columns_by_symbol.values())
+    symbols = np.repeat(np.asarray(list(columns_by_symbol), dtype=str), [len(part["ts"]) for part in parts])
+    columns = {
+        field: np.concatenate([part.get(field, np.full(len(part["ts"]), np.nan)) for part in parts]) if parts else np.empty(0)
+        for field in FIELDS
+        if any(field in part for part in parts)
+    }
+    ts = np.concatenate([part["ts"] for part in parts]) if parts else np.empty(0, dtype="datetime64[us]")
+    return QuoteFrame(symbols, ts, columns)
+
+
+def read_metadata(cache_dir: str) -> dict:
+    """Return the symbols and the source of the bars cached in cache_dir, None if they are not known"""
+    path = os.path.join(cache_dir, "metadata.json")
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_metadata(cache_dir: str, symbols: List[str], source: str):
+    """Write the symbols and the source (see `retrotester.loader.Fetcher.description`) of the bars cached in cache_dir"""
+    with open(os.path.join(cache_dir, "metadata.json"), "w") as f:
+        json.dump({"symbols": sorted(symbols), "source": source}, f)
+
+
+def load_universe(path: str, fetcher: Fetcher, cache_dir: str = None, refresh: bool = False, symbols: List[str] = None) -> Data:
+    """Load the bars of a universe file to a columnar retrotester.dataobj.Data.
+    With cache_dir, the bars are saved as memory-mappable .npy files and reopened from there on next calls
+    loading the same symbols from the same source, and fetched again otherwise
+
+    Parameters
+    ----------
+    path : str
+        path of the universe file (see `retrotester.loader.read_universe`)
+    fetcher : Fetcher
+        source of the bars
+    cache_dir : str, optional
+        directory of the binary cache, by default None
+    refresh : bool, optional
+        fetch the bars even if they are cached, by default False
+    symbols : List[str], optional
+        symbols of the universe to load, by default all
+
+    Returns
+    -------
+    Data
+        data in columnar mode
+    """
+    universe = read_universe(path)
+    symbols = symbols or list(universe)
+    if cache_dir and not refresh and os.path.isdir(os.path.join(cache_dir, "columns")):
+        if read_metadata(cache_dir) == {"symbols": sorted(symbols), "source": fetcher.description}:
+            return Data.open(cache_dir)
+    data = Data(columnar=True)
+    frame = build_frame({symbol: fetcher.fetch(symbol, universe[symbol]["start"], universe[symbol]["end"]) for symbol in symbols})
+    if cache_dir:
+        frame.save(cache_dir)
+        write_metadata(cache_dir, symbols, fetcher.description)
+    data.load(frame)
+    return data
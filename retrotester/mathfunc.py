@@ -1,11 +1,10 @@
 from __future__ import annotations
-from typing import List, TYPE_CHECKING, Union
+from typing import TYPE_CHECKING, Union
 
 if TYPE_CHECKING:
     from retrotester import Retrotester
-from math import log, exp, sqrt
-from statistics import variance, stdev, mean
 import operator
+import numpy as np
 
 
 def division(x: Union[int, float], y: Union[int, float]):
@@ -30,6 +29,102 @@ def division(x: Union[int, float], y: Union[int, float]):
         return operator.truediv(x, y)
 
 
+def compute_statistics(levels: np.ndarray, rf: float = 0.0, periods: int = 252) -> dict:
+    """Compute the statistics of one or several equity curves in one pass over arrays,
+    same definitions as `retrotester.mathfunc.compute_statistics_backtest`
+
+    Parameters
+    ----------
+    levels : np.ndarray
+        levels of shape (time,), or (curve x time) for several curves
+    rf : float, optional
+        risk-free rate, by default 0.0
+    periods : int, optional
+        number of periods per year, by default 252
+
+    Returns
+    -------
+    dict
+        statistics as keys and values as floats, or as arrays of one value per curve for a 2-D input
+    """
+    one_curve = np.ndim(levels) == 1
+    levels = np.atleast_2d(np.asarray(levels, dtype=np.float64))
+    n, T = levels.shape
+    with np.errstate(divide="ignore", invalid="ignore"):
+        strat_ret = levels[:, 1:] / levels[:, :-1] - 1
+        gmean_ret = np.exp(np.log(np.maximum(strat_ret + 1, 0)).mean(axis=1)) - 1
+        ann_ret = (1 + gmean_ret) ** periods - 1
+        volatility = np.sqrt((strat_ret.var(axis=1, ddof=1) + (1 + gmean_ret) ** 2) ** periods - (1 + gmean_ret) ** (2 * periods)) * 100
+
+        # drawdowns
+        dd = 1 - levels / np.maximum.accumulate(levels, axis=1)
+        # periods between two dates without drawdown (or the last date)
+        bounds = dd == 0
+        bounds[:, -1] = True
+        flat = np.flatnonzero(bounds)
+        segment_max = np.maximum.reduceat(dd.ravel(), flat) if len(flat) else np.empty(0)
+        rows, duration = flat[1:] // T, np.diff(flat)
+        valid = (rows == flat[:-1] // T) & (duration > 1)
+        rows, duration = rows[valid], duration[valid]
+        peaks = np.maximum(segment_max[:-1][valid], dd.ravel()[flat[1:][valid]])
+        count = np.bincount(rows, minlength=n)
+        max_duration = np.full(n, np.nan)
+        np.fmax.at(max_duration, rows, duration)
+
+        s = dict()
+        s["Equity Final"] = levels[:, -1]
+        s["Equity Peak"] = levels.max(axis=1)
+        s["Return [%]"] = 100 * (levels[:, -1] / levels[:, 0] - 1)
+        s["Return (Ann.) [%]"] = 100 * ann_ret
+        s["Volatility (Ann.) [%]"] = volatility
+        s["Sharpe Ratio"] = (s["Return (Ann.) [%]"] - rf) / np.where(volatility == 0, np.nan, volatility)
+        s["Sortino Ratio"] = (ann_ret - rf) / (np.sqrt((np.minimum(strat_ret, 0) ** 2).mean(axis=1)) * np.sqrt(periods))
+        max_dd = -dd.max(axis=1)
+        s["Calmar Ratio"] = ann_ret / np.where(max_dd == 0, np.nan, -max_dd)
+        s["Max. Drawdown [%]"] = max_dd * 100
+        s["Avg. Drawdown [%]"] = -np.bincount(rows, weights=peaks, minlength=n) / count * 100
+        s["Max. Drawdown Duration"] = max_duration
+        s["Avg. Drawdown Duration"] = np.bincount(rows, weights=duration, minlength=n) / count
+    if one_curve:
+        s = {k: v[0].item() for k, v in s.items()}
+        # number of periods, as an int
+        if s["Max. Drawdown Duration"] == s["Max. Drawdown Duration"]:
+            s["Max. Drawdown Duration"] = int(s["Max. Drawdown Duration"])
+    return s
+
+
+def compute_trade_statistics(entry_ts: np.ndarray, exit_ts: np.ndarray, entry_price: np.ndarray, exit_price: np.ndarray, size: np.ndarray, **columns) -> dict:
+    """Compute the statistics of trades from the columns of a retrotester.dataobj.TradeLedger
+
+    Parameters
+    ----------
+    entry_ts, exit_ts : np.ndarray
+        entry and exit ts of the trades, as datetime64
+    entry_price, exit_price : np.ndarray
+        entry and exit prices of the trades
+    size : np.ndarray
+        quantity of the trades, negative for short trades
+
+    Returns
+    -------
+    dict
+        number of trades, win rate, best, worst and average trade returns, profit factor and average holding time
+    """
+    s = dict()
+    n = len(size)
+    pnl = size * (exit_price - entry_price)
+    returns = np.sign(size) * (exit_price / entry_price - 1)
+    s["# Trades"] = n
+    s["Win Rate [%]"] = 100 * (pnl > 0).mean() if n else np.nan
+    s["Best Trade [%]"] = 100 * returns.max() if n else np.nan
+    s["Worst Trade [%]"] = 100 * returns.min() if n else np.nan
+    s["Avg. Trade [%]"] = 100 * returns.mean() if n else np.nan
+    losses = -pnl[pnl < 0].sum()
+    s["Profit Factor"] = pnl[pnl > 0].sum() / losses if losses > 0 else np.nan
+    s["Avg. Trade Duration"] = str((exit_ts - entry_ts).mean().item()) if n else None
+    return {k: v.item() if isinstance(v, np.generic) else v for k, v in s.items()}
+
+
 def compute_statistics_backtest(backtest: Retrotester, rf: float = 0.0):
     """Implementation of https://github.com/kernc/backtesting.py/blob/master/backtesting/_stats.py,
     without using pandas
@@ -46,51 +141,22 @@ def compute_statistics_backtest(backtest: Retrotester, rf: float = 0.0):
     dict
         dictionary containing the different stats
     """
-
-    def drawdown_duration_peaks(l: List[float]):
-        """Compute maximum drawdown, duration of drawdowns and the peak drawdown for a list of returns"""
-        max_accum = [m := x if idx == 0 else max(m, x) for idx, x in enumerate(l)]  # https://stackoverflow.com/a/71833205
-        dd = list(map(lambda level, max_: 1 - level / max_, l, max_accum))
-        curr = [i for i, e in enumerate(dd) if e == 0]
-        curr += [len(dd) - 1]
-        prev = [float("nan")] + curr[:-1]
-        index = {c: p for c, p in zip(curr, prev) if c > p + 1}
-        duration = [c - p for c, p in index.items()]
-        peaks = [max(dd[p : c + 1]) for c, p in index.items()]
-        return -max(dd), duration, peaks
-
-    def geometric_mean(returns: List[float]):
-        """Geometric mean of returns"""
-        returns = list(map(lambda x: x + 1, returns))
-        returns = [x if x > 0 else 0 for x in returns]
-        logret = list(map(log, returns))
-        return exp(sum(logret) / len(logret)) - 1
-
-    def compute_returns(levels: List[float]):
-        """Compute returns for a list of float, their geometric mean and annual return"""
-        strat_ret = list(map(lambda x, y: x / y - 1, levels[1:], levels[:-1]))
-        gmean_ret = geometric_mean(strat_ret)
-        ann_ret = (1 + gmean_ret) ** 252 - 1
-        return strat_ret, gmean_ret, ann_ret
-
     s = {}
     s["Start"] = str(backtest._config.start_ts)
     s["End"] = str(backtest._config.end_ts)
     s["Duration"] = str(backtest._config.end_ts - backtest._config.start_ts)
-    s["Exposure [%]"] = 100 * len(list(filter(lambda w: w.value > 0, backtest._strategy._weight_by_pk.values()))) / len(backtest._strategy._weight_by_pk.values())
-    levels = [l.close for l in backtest._level_by_ts.values()]
-    s["Equity Final"] = levels[-1]
-    s["Equity Peak"] = max(levels)
-    s["Return [%]"] = 100 * (levels[-1] / levels[0] - 1)
-    strat_ret, gmean_ret, ann_ret = compute_returns(levels)
-    s["Return (Ann.) [%]"] = 100 * ann_ret
-    s["Volatility (Ann.) [%]"] = sqrt((variance(strat_ret) + (1 + gmean_ret) ** 2) ** 252 - (1 + gmean_ret) ** (2 * 252)) * 100
-    s["Sharpe Ratio"] = (s["Return (Ann.) [%]"] - rf) / (s["Volatility (Ann.) [%]"] or float("nan"))
-    s["Sortino Ratio"] = (ann_ret - rf) / (sqrt(mean(list(map(lambda x: (max(min(x, 0), float("-inf"))) ** 2, strat_ret)))) * sqrt(252))
-    max_dd, dd_dur, dd_peaks = drawdown_duration_peaks(levels)
-    s["Calmar Ratio"] = ann_ret / (-max_dd or float("nan"))
-    s["Max. Drawdown [%]"] = max_dd * 100
-    s["Avg. Drawdown [%]"] = -mean(dd_peaks) * 100
-    s["Max. Drawdown Duration"] = max(dd_dur)
-    s["Avg. Drawdown Duration"] = mean(dd_dur)
+    s["Exposure [%]"] = backtest._strategy.exposure()
+    levels = np.fromiter((l.close for l in backtest._level_by_ts.values()), dtype=np.float64, count=len(backtest._level_by_ts))
+    periods_per_year = backtest._config.periods_per_year
+    s.update(compute_statistics(levels, rf, periods_per_year))
+    # traded weights and costs per year, as fractions of the portfolio
+    periods = len(levels) - 1
+    s["Turnover (Ann.) [%]"] = 100 * division(backtest._strategy.turnover() * periods_per_year, periods)
+    s["Cost Drag (Ann.) [%]"] = 100 * division(backtest._strategy.transaction_costs() * periods_per_year, periods)
+    # quotes missing between the first and the last quote of a symbol
+    s["Missing Quotes"] = sum(map(len, backtest.gaps.values()))
+    trades = getattr(backtest._strategy, "trades", None)
+    if trades is not None:
+        # open trades are closed at their last price
+        s.update(compute_trade_statistics(**trades.marked(next(reversed(backtest._level_by_ts)))))
     return s
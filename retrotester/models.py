@@ -0,0 +1,232 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Tuple
+import hashlib
+import os
+import numpy as np
+from .cache import fingerprint
+
+if TYPE_CHECKING:
+    from datetime import datetime
+
+
+def rbf_kernel(a: np.ndarray, b: np.ndarray, gamma: float) -> np.ndarray:
+    """Return the RBF kernel exp(-gamma * |a_i - b_j|^2) between the rows of a and b"""
+    sq = (a * a).sum(axis=1)[:, None] + (b * b).sum(axis=1)[None, :] - 2 * a @ b.T
+    return np.exp(-gamma * np.maximum(sq, 0.0))
+
+
+@dataclass
+class SVRModel:
+    """
+    Fitted RBF support vector regression, reduced to what is needed to predict:
+    the scaled support vectors, their dual coefficients, the intercept and the scaling of the features
+    """
+
+    support_vectors: np.ndarray
+    dual_coef: np.ndarray
+    intercept: float
+    gamma: float
+    mean: np.ndarray
+    scale: np.ndarray
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Predict the target of features, array of shape (samples x features)"""
+        x = (features - self.mean) / self.scale
+        return rbf_kernel(x, self.support_vectors, self.gamma) @ self.dual_coef + self.intercept
+
+
+def predict_batch(models: List[SVRModel], features: np.ndarray) -> np.ndarray:
+    """Predict the targets of several models at once, with their support vectors padded to the same number
+
+    Parameters
+    ----------
+    models : List[SVRModel]
+        one model by row of features
+    features : np.ndarray
+        array of shape (models x features)
+
+    Returns
+    -------
+    np.ndarray
+        prediction of each model
+    """
+    return _PackedModels(models).predict(features)
+
+
+class _PackedModels:
+    """Models stacked in arrays: support vectors of shape (models x support vectors x features),
+    padded with zero dual coefficients"""
+
+    def __init__(self, models: List[SVRModel]):
+        self.models = models
+        n = max((len(model.dual_coef) for model in models), default=0)
+        n_features = len(models[0].mean) if models else 0
+        self.support_vectors = np.zeros((len(models), n, n_features))
+        self.dual_coef = np.zeros((len(models), n))
+        for i, model in enumerate(models):
+            self.support_vectors[i, : len(model.dual_coef)] = model.support_vectors
+            self.dual_coef[i, : len(model.dual_coef)] = model.dual_coef
+        self.intercept = np.array([model.intercept for model in models])
+        self.gamma = np.array([model.gamma for model in models])
+        self.mean = np.array([model.mean for model in models]).reshape(len(models), n_features)
+        self.scale = np.array([model.scale for model in models]).reshape(len(models), n_features)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        x = (features - self.mean) / self.scale
+        sq = ((self.support_vectors - x[:, None, :]) ** 2).sum(axis=2)
+        return (np.exp(-self.gamma[:, None] * sq) * self.dual_coef).sum(axis=1) + self.intercept
+
+
+class ModelStore:
+    """
+    This object stores fitted models, keyed by symbol, training window, features, hyperparameters and
+    a hash of the training data, so they are not fitted again by the next backtests.
+    If directory is passed, models are saved as .npz files and only loaded when they are requested
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._models = dict()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(symbol: str, window: Tuple[datetime, datetime], features: tuple, params: dict, data: Dict[str, np.ndarray]) -> str:
+        """Return the key of a model
+
+        Parameters
+        ----------
+        symbol : str
+            symbol of the model
+        window : Tuple[datetime, datetime]
+            first and last ts of the training window
+        features : tuple
+            what determines the features, such as the indicators' settings
+        params : dict
+            hyperparameters of the model
+        data : Dict[str, np.ndarray]
+            training data
+        """
+        settings = (symbol, tuple(map(str, window)), features, tuple(sorted(params.items())), fingerprint(data))
+        return hashlib.blake2b(repr(settings).encode(), digest_size=16).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key: str) -> SVRModel:
+        """Return the model of key, None if it is not stored"""
+        model = self._models.get(key)
+        if model is None and self.directory and os.path.exists(self._path(key)):
+            with np.load(self._path(key)) as arrays:
+                model = SVRModel(
+                    arrays["support_vectors"], arrays["dual_coef"], float(arrays["intercept"]), float(arrays["gamma"]), arrays["mean"], arrays["scale"]
+                )
+            self._models[key] = model
+        if model is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return model
+
+    def set(self, key: str, model: SVRModel):
+        """Store the model of key"""
+        self._models[key] = model
+        if self.directory:
+            np.savez(self._path(key), **model.__dict__)
+
+    def info(self) -> dict:
+        """Return the counters of the store"""
+        return {"hits": self.hits, "misses": self.misses, "models": len(self._models)}
+
+
+def scaling(features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the mean and standard deviation of each feature, 1 for constant features"""
+    mean, scale = features.mean(axis=0), features.std(axis=0)
+    return mean, np.where(scale > 0, scale, 1.0)
+
+
+def fit_svr(kernel: np.ndarray, target: np.ndarray, C: float, epsilon: float) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Fit a support vector regression on a precomputed kernel and return its support, dual coefficients and intercept"""
+    from sklearn.svm import SVR
+
+    svr = SVR(kernel="precomputed", C=C, epsilon=epsilon).fit(kernel, target)
+    return svr.support_, svr.dual_coef_[0], float(svr.intercept_[0])
+
+
+def walk_forward(
+    x: np.ndarray,
+    target: np.ndarray,
+    starts: List[int],
+    train_window: int,
+    horizon: int,
+    C: float,
+    epsilon: float,
+    gamma: float,
+    mean: np.ndarray,
+    scale: np.ndarray,
+    target_scaling: Tuple[float, float] = (0.0, 1.0),
+    store: ModelStore = None,
+    keys: List[str] = None,
+) -> List[SVRModel]:
+    """Train a model at each start, on the train_window samples before it whose target is known.
+    The kernel of a training window is built from the kernel of the previous one: only the rows
+    of the samples entering the window are computed
+
+    Parameters
+    ----------
+    x : np.ndarray
+        scaled features of shape (samples x features)
+    target : np.ndarray
+        target of each sample, known horizon samples later
+    starts : List[int]
+        increasing positions from which the models are used
+    train_window : int
+        number of samples of the training windows
+    horizon : int
+        number of samples between a sample and its target
+    C, epsilon, gamma : float
+        hyperparameters of the RBF support vector regression
+    mean, scale : np.ndarray
+        scaling of the features, stored in the models
+    target_scaling : Tuple[float, float], optional
+        mean and standard deviation the target was scaled with, applied back to the predictions, by default (0.0, 1.0)
+    store : ModelStore, optional
+        store of the models to read from and write to, by default None
+    keys : List[str], optional
+        key of the model of each start in store
+
+    Returns
+    -------
+    List[SVRModel]
+        model of each start
+    """
+    models, kernel, first = [], None, None
+    target_mean, target_scale = target_scaling
+    for i, start in enumerate(starts):
+        lo = start - horizon - train_window + 1
+        if store is not None:
+            model = store.get(keys[i])
+            if model is not None:
+                models.append(model)
+                continue
+        window = x[lo : lo + train_window]
+        shift = None if kernel is None else lo - first
+        if shift is None or shift >= train_window:
+            kernel = rbf_kernel(window, window, gamma)
+        elif shift > 0:
+            new = rbf_kernel(window[train_window - shift :], window, gamma)
+            kept = kernel[shift:, shift:]
+            kernel = np.empty((train_window, train_window))
+            kernel[: train_window - shift, : train_window - shift] = kept
+            kernel[train_window - shift :] = new
+            kernel[: train_window - shift, train_window - shift :] = new[:, : train_window - shift].T
+        first = lo
+        support, dual_coef, intercept = fit_svr(kernel, target[lo : lo + train_window], C, epsilon)
+        model = SVRModel(window[support], dual_coef * target_scale, intercept * target_scale + target_mean, gamma, mean, scale)
+        if store is not None:
+            store.set(keys[i], model)
+        models.append(model)
+    return models
@@ -0,0 +1,147 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Tuple
+import numpy as np
+
+if TYPE_CHECKING:
+    import plotly.graph_objs as go
+
+
+def _numeric(x: np.ndarray) -> np.ndarray:
+    """Return x as floats, datetimes as microseconds"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64) or x.dtype == object:
+        x = x.astype("datetime64[us]").astype(np.int64)
+    return x.astype(np.float64)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Return the positions of n_out points keeping the shape of the series (largest triangle three buckets):
+    the first and the last points, and in each bucket the point forming the largest triangle with
+    the point kept in the previous bucket and the average of the next bucket"""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][:n_out], dtype=np.int64)
+    x, y = _numeric(x), np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    positions = np.empty(n_out, dtype=np.int64)
+    positions[0], positions[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        positions[i + 1] = a
+    return positions
+
+
+def minmax(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Return the positions of the first and last points and of the minimum and maximum of (n_out - 2) / 2 buckets"""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 4:
+        return np.array([0, n - 1][:n_out], dtype=np.int64)
+    n_buckets = (n_out - 2) // 2
+    bucket = np.arange(n) * n_buckets // n
+    order = np.lexsort((y, bucket))
+    starts = np.searchsorted(bucket[order], np.arange(n_buckets))
+    ends = np.append(starts[1:], n) - 1
+    return np.unique(np.concatenate([[0, n - 1], order[starts], order[ends]]))
+
+
+def downsample(x: np.ndarray, y: np.ndarray, max_points: int = 2000, method: str = "lttb") -> np.ndarray:
+    """Return the positions of the points to plot
+
+    Parameters
+    ----------
+    x, y : np.ndarray
+        coordinates of the points
+    max_points : int, optional
+        maximum number of points, by default 2000
+    method : str, optional
+        "lttb", "minmax" or None to keep all the points, by default "lttb"
+
+    Returns
+    -------
+    np.ndarray
+        increasing positions of the points kept
+    """
+    if method is None or max_points is None:
+        return np.arange(len(y))
+    if method == "lttb":
+        return lttb(x, y, max_points)
+    if method == "minmax":
+        return minmax(y, max_points)
+    raise ValueError(f"Unknown method {method}")
+
+
+def drawdown(levels: np.ndarray) -> np.ndarray:
+    """Return the drawdown of levels in %, negative below the running peak"""
+    levels = np.asarray(levels, dtype=np.float64)
+    return 100 * (levels / np.maximum.accumulate(levels) - 1)
+
+
+def plot_backtests(
+    levels: Dict[str, Tuple[np.ndarray, np.ndarray]],
+    exposures: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+    with_drawdown: bool = True,
+    max_points: int = 2000,
+    method: str = "lttb",
+    title: str = None,
+) -> go.Figure:
+    """Return a figure of the levels of strategies, with WebGL traces of downsampled series
+
+    Parameters
+    ----------
+    levels : Dict[str, Tuple[np.ndarray, np.ndarray]]
+        strategy code as keys and dates and levels as values
+    exposures : Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]], optional
+        strategy code as keys and dates, gross and net weights as values, plotted in a panel if passed
+    with_drawdown : bool, optional
+        plot the drawdowns in a panel, by default True
+    max_points, method
+        see `retrotester.plotting.downsample`
+    title : str, optional
+        title of the figure
+
+    Returns
+    -------
+    go.Figure
+        figure with a panel of levels, followed by the drawdown and exposure panels
+    """
+    import plotly.graph_objs as go
+    from plotly.subplots import make_subplots
+
+    panels = ["Level"] + (["Drawdown [%]"] if with_drawdown else []) + (["Exposure"] if exposures else [])
+    fig = make_subplots(rows=len(panels), cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[3] + [1] * (len(panels) - 1))
+
+    def add(row: int, x: np.ndarray, y: np.ndarray, name: str, **kwargs):
+        positions = downsample(x, y, max_points, method)
+        fig.add_trace(go.Scattergl(x=x[positions], y=y[positions], name=name, mode="lines", **kwargs), row=row, col=1)
+
+    for code, (dates, values) in levels.items():
+        dates, values = np.asarray(dates, dtype="datetime64[us]"), np.asarray(values, dtype=np.float64)
+        add(1, dates, values, code, legendgroup=code)
+        if with_drawdown:
+            add(2, dates, drawdown(values), f"{code} drawdown", legendgroup=code, showlegend=False, fill="tozeroy")
+    for code, (dates, gross, net) in (exposures or dict()).items():
+        dates = np.asarray(dates, dtype="datetime64[us]")
+        add(len(panels), dates, np.asarray(gross, dtype=np.float64), f"{code} gross", legendgroup=code)
+        add(len(panels), dates, np.asarray(net, dtype=np.float64), f"{code} net", legendgroup=code, line={"dash": "dot"})
+    for row, panel in enumerate(panels, 1):
+        fig.update_yaxes(title_text=panel, row=row, col=1)
+    fig.update_layout(title_text=title, template="simple_white")
+    return fig
+
+
+def save(fig: go.Figure, path: str):
+    """Write the figure to path, as a standalone HTML page for .html files, as an image otherwise
+    (.png, .svg, .pdf, which requires the kaleido package)"""
+    if path.endswith(".html"):
+        fig.write_html(path)
+    else:
+        fig.write_image(path)
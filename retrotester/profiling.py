@@ -0,0 +1,117 @@
+from __future__ import annotations
+from contextlib import nullcontext
+from typing import Dict, List, Tuple
+import json
+import time
+import tracemalloc
+
+# section of a disabled profiler, entered at no cost
+NO_SECTION = nullcontext()
+
+
+class _Section:
+    __slots__ = ("_profiler", "_name", "_record", "_start", "_memory")
+
+    def __init__(self, profiler: Profiler, name: str):
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        stack = self._profiler._stack
+        stack.append(self._name)
+        self._record = self._profiler._records.setdefault(tuple(stack), [0, 0.0, 0])
+        if self._profiler.memory:
+            self._memory = tracemalloc.get_traced_memory()[0]
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._start
+        profiler, record = self._profiler, self._record
+        record[0] += 1
+        record[1] += elapsed
+        if profiler.memory:
+            record[2] += max(tracemalloc.get_traced_memory()[0] - self._memory, 0)
+        profiler._stack.pop()
+        return False
+
+
+class Profiler:
+    """
+    This object records the wall time, the number of calls and, if memory is True, the memory allocated
+    (with tracemalloc, which slows the code down, traced until `stop` is called) of nested sections of code.
+    Pass it to `retrotester.retrotester.Retrotester` to profile the stages of a backtest
+    """
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self._stack = []
+        # calls, time and memory of each path of sections
+        self._records = dict()
+        self.start()
+
+    def section(self, name: str) -> _Section:
+        """Return a context manager recording the code it runs as a section named name, nested in the current section"""
+        return _Section(self, name)
+
+    def start(self):
+        """Start tracing memory allocations, if memory is True"""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self):
+        """Stop tracing memory allocations"""
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _self_times(self) -> Dict[Tuple[str, ...], float]:
+        """Return the time of each path of sections, without the time of its subsections"""
+        self_times = {path: record[1] for path, record in self._records.items()}
+        for path, record in self._records.items():
+            if path[:-1] in self_times:
+                self_times[path[:-1]] -= record[1]
+        return self_times
+
+    def report(self) -> List[dict]:
+        """Return the records of the sections, in the order they were first entered
+
+        Returns
+        -------
+        List[dict]
+            path of the section (names joined with "/"), calls, time and self time in seconds, and memory in bytes
+        """
+        self_times = self._self_times()
+        return [
+            {"section": "/".join(path), "calls": calls, "time": elapsed, "self_time": self_times[path], "memory": memory}
+            for path, (calls, elapsed, memory) in self._records.items()
+        ]
+
+    def to_json(self, path: str = None) -> str:
+        """Return the report as JSON, and write it to path if passed"""
+        report = json.dumps(self.report(), indent=2)
+        if path:
+            with open(path, "w") as f:
+                f.write(report)
+        return report
+
+    def folded(self, path: str = None) -> str:
+        """Return the self times in microseconds as folded stacks ("run;backtest;update 1234" lines),
+        the input of flamegraph tools such as flamegraph.pl or speedscope, and write them to path if passed"""
+        lines = [f"{';'.join(p)} {round(t * 1e6)}" for p, t in self._self_times().items() if t > 0]
+        folded = "\n".join(lines) + "\n"
+        if path:
+            with open(path, "w") as f:
+                f.write(folded)
+        return folded
+
+    def clear(self):
+        """Forget the records"""
+        self._records.clear()
@@ -1,12 +1,23 @@
 from .mathfunc import compute_statistics_backtest
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from copy import copy
 from datetime import datetime, timedelta
-from typing import List
-import plotly.graph_objs as go
+from typing import TYPE_CHECKING, List, Dict, Tuple
+import itertools
+import random
+import math
+import os
 from bisect import bisect_left, bisect
+from .indicators import Indicator
 from .strategies import BaseStrategy
-from .dataobj import Data, Quote, Frequency
-from tqdm import tqdm
+from .dataobj import Data, Quote, Frequency, PERIODS_PER_YEAR
+from .cache import IndicatorCache
+from .costs import CostModel
+from .profiling import NO_SECTION, Profiler
+import numpy as np
+
+if TYPE_CHECKING:
+    import plotly.graph_objs as go
 
 
 @dataclass
@@ -20,6 +31,7 @@ class Config:
     frequency: Frequency
     basis: int = 100
     model_parameters: dict = None
+    costs: CostModel = None
 
     def __post_init__(self):
         if self.model_parameters:
@@ -32,10 +44,90 @@ class Config:
 
     @property
     def timedelta(self):
+        """Return the duration of a period, the average duration of a month for Frequency.MONTHLY"""
         if self.frequency == Frequency.HOURLY:
             return timedelta(hours=1)
         elif self.frequency == Frequency.DAILY:
             return timedelta(days=1)
+        elif self.frequency == Frequency.MONTHLY:
+            return timedelta(days=365.2425 / 12)
+
+    @property
+    def periods_per_year(self) -> int:
+        """Return the number of periods per year, used to annualize the statistics"""
+        return PERIODS_PER_YEAR[self.frequency]
+
+
+def tqdm(iterable, **kwargs):
+    """Return iterable wrapped in a tqdm progress bar, tqdm being imported on first use"""
+    from tqdm import tqdm
+
+    return tqdm(iterable, **kwargs)
+
+
+# data of the optimization workers, inherited on fork or received once per worker otherwise
+_worker_data = None
+
+
+def _init_worker(data: Data):
+    global _worker_data
+    _worker_data = data
+
+
+def _init_process(data: Data):
+    # indicators computed by the worker are not written to the scratch files shared with the parent
+    data.detach()
+    _init_worker(data)
+
+
+def _process_pool(n_jobs: int, data: Data):
+    """Return a pool of n_jobs worker processes holding data, forked where possible so the data is not copied"""
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    return ProcessPoolExecutor(n_jobs, mp_context=context, initializer=_init_process, initargs=(data,))
+
+
+def _run_configs(strategy: BaseStrategy, configs: List[Config], engine: str) -> List[dict]:
+    """Run a backtest for each config on the data of the worker and return their statistics"""
+    results = []
+    for config in configs:
+        retrotester = Retrotester(_worker_data, strategy, config)
+        retrotester.run(engine=engine)
+        results.append(retrotester.stats)
+    return results
+
+
+def _create_chunk(strategy: BaseStrategy, config: Config, names: List[str], symbols: List[str]) -> Tuple[Dict[str, np.ndarray], dict]:
+    """Compute the indicators named names and the signals of symbols on the data of the worker
+
+    Returns
+    -------
+    Tuple[Dict[str, np.ndarray], dict]
+        values of the indicators' outputs and of the signals stacked by attribute (see `retrotester.dataobj.Data.stack`),
+        and rolling states of each indicator by symbol
+    """
+    data = _worker_data
+    # the universe of the instance is the chunk, so strategies creating their whole universe at once
+    # (as SVRStrategy trains all the symbols of its universe) only create the symbols of the chunk
+    instance = strategy(replace(config, universe=symbols), data)
+    instance.construct()
+    values, states = dict(), dict()
+    for name in names:
+        ind = instance.indicators[name]
+        ind.compute_batch(data, symbols)
+        for output in ind.outputs():
+            values[output] = data.stack(output, symbols)
+        states[name] = ind._states
+    for underlying_code in symbols:
+        try:
+            instance.compute_signals(data.quotes_by_symbol[underlying_code])
+        except Exception as e:
+            raise RuntimeError(f"Problem when creating strategy with {underlying_code} symbol") from e
+    values["signal"] = data.stack("signal", symbols)
+    return values, states
 
 
 class Retrotester:
@@ -44,29 +136,133 @@ class Retrotester:
     Upon initialization, call method `backtesting.backtesting.Backtest.run` to run a backtest
     """
 
-    # TODO: implement an optimization method
-
-    def __init__(self, data: Data, strategy: BaseStrategy, config: Config):
+    def __init__(
+        self,
+        data: Data,
+        strategy: BaseStrategy,
+        config: Config,
+        cache: IndicatorCache = None,
+        profiler: Profiler = None,
+        n_jobs: int = 1,
+        chunksize: int = None,
+    ):
+        """
+        Parameters
+        ----------
+        data : Data
+            data holding the quotes
+        strategy : BaseStrategy
+            class of the strategy
+        config : Config
+            configuration of the backtest
+        cache : IndicatorCache, optional
+            cache of indicator values, by default None
+        profiler : Profiler, optional
+            profiler recording the stages of the backtest, by default None
+        n_jobs : int, optional
+            number of worker processes computing the indicators and the signals, None for the number of CPUs,
+            by default 1 to compute them in the current process. Workers send back the values of the indicators'
+            outputs, their rolling states and the signals, so state kept by `compute_signals` in the strategy
+            (as in `retrotester.strategies.SVRStrategy`) stays in the workers and `step` cannot extend it
+        chunksize : int, optional
+            number of symbols computed by a worker at once, by default the universe split in 2 chunks per worker
+        """
         self._data = data
-        self._quotes_by_pk = data.quotes_by_pk
-        self._config = config
-        self._strategy = strategy(config, data)
-        self._universe = config.universe
-        self._timedelta = config.timedelta
+        self._cache = cache
+        self._profiler = profiler
+        self._n_jobs = n_jobs or os.cpu_count()
+        self._chunksize = chunksize
+        with self._section("index"):
+            self._quotes_by_pk = data.quotes_by_pk
+        # copied, as `retrotester.retrotester.Retrotester.step` moves its end_ts
+        self._config = copy(config)
+        self._strategy = strategy(self._config, data)
+        self._universe = self._config.universe
+        self._symbols = set(self._universe)
+        self._timedelta = self._config.timedelta
         self._level_by_ts = dict()
+        # missing quotes of the universe, see `gaps`
+        self._gaps = dict()
+        # statistics of the last run, computed on first access
+        self._stats = None
+
+    def _section(self, name: str):
+        """Return a section of the profiler, or a no-op context manager without profiler"""
+        if self._profiler is None:
+            return NO_SECTION
+        return self._profiler.section(name)
+
+    def _check_engine(self, engine: str):
+        """Check that the strategy can run with engine, before running the backtest"""
+        if engine not in ("loop", "vectorized"):
+            raise ValueError(f"Unknown engine {engine}")
+        if engine == "vectorized" and not hasattr(self._strategy, "compute_performance_array"):
+            name = type(self._strategy).__name__
+            raise ValueError(f'{name} cannot run with the vectorized engine of weight strategies, run it with engine="loop"')
+
+    def _check_universe(self):
+        """Check that every symbol of the universe has quotes, before running the backtest"""
+        missing = [underlying_code for underlying_code in self._universe if underlying_code not in self._data.quotes_by_symbol]
+        if missing:
+            raise ValueError(f"No quote uploaded for {', '.join(missing)} symbol(s)")
+        start_ts, end_ts = self._config.start_ts, self._config.end_ts
+        self._gaps = dict()
+        for underlying_code in self._universe:
+            dates = [ts for ts in self._data.gaps.get(underlying_code, ()) if start_ts <= ts <= end_ts]
+            if dates:
+                self._gaps[underlying_code] = dates
+
+    @property
+    def gaps(self) -> Dict[str, List[datetime]]:
+        """Return the dates of the backtest without quote between the first and the last quote
+        of each symbol of the universe, found before running the backtest and updated by `step`"""
+        return self._gaps
 
     def _create_strategy(self):
         """Create the strategy by computing indicators' values and signals for all symbols in the universe"""
-        self._strategy.construct()
+        with self._section("construct"):
+            self._strategy.construct()
+        remaining = []
+        for ind in self._strategy.indicators.values():
+            computed, symbols = self._data._computed_indicators.get(ind._name, (None, ()))
+            if computed is not None and computed.settings == ind.settings and set(self._universe) <= symbols:
+                # values already stored by an identical indicator
+                ind._states = computed._states
+            elif self._n_jobs > 1 and self._cache is None:
+                remaining.append(ind)
+            else:
+                with self._section(f"indicator {ind._name}"):
+                    ind.compute_batch(self._data, self._universe, cache=self._cache)
+                self._data._computed_indicators[ind._name] = (ind, set(self._universe))
+        if self._n_jobs > 1:
+            return self._create_strategy_parallel(remaining)
         try:
             for underlying_code in tqdm(self._universe, desc="Creating strategy"):
                 data = self._data.quotes_by_symbol[underlying_code]
-                for ind in self._strategy.indicators.values():
-                    ind.compute_values(data)
-                self._strategy.compute_signals(data)
+                with self._section("signals"):
+                    self._strategy.compute_signals(data)
         except Exception as e:
             raise RuntimeError(f"Problem when creating strategy with {underlying_code} symbol") from e
 
+    def _create_strategy_parallel(self, indicators: List[Indicator]):
+        """Compute indicators and signals by chunks of symbols in worker processes, and set their values on the quotes.
+        The data is sent to the workers once, and only arrays of values are sent back"""
+        universe, names = self._universe, [ind._name for ind in indicators]
+        chunksize = self._chunksize or max(1, math.ceil(len(universe) / (2 * self._n_jobs)))
+        chunks = [universe[i : i + chunksize] for i in range(0, len(universe), chunksize)]
+        strategy = type(self._strategy)
+        with self._section("signals"):
+            with _process_pool(min(self._n_jobs, len(chunks)), self._data) as executor:
+                futures = [executor.submit(_create_chunk, strategy, self._config, names, chunk) for chunk in chunks]
+                for chunk, future in zip(chunks, tqdm(futures, desc="Creating strategy")):
+                    values, states = future.result()
+                    for attr, array in values.items():
+                        self._data.unstack(attr, array, chunk)
+                    for ind in indicators:
+                        ind._states.update(states[ind._name])
+        for ind in indicators:
+            self._data._computed_indicators[ind._name] = (ind, set(universe))
+
     @property
     def _calendar(self) -> List[datetime]:
         """Return the dates available between:
@@ -85,39 +281,440 @@ class Retrotester:
         return self._data.dates[bisect_left(self._data.dates, ts) - dt]
 
     def _update_strategy(self, ts: datetime):
-        data = self._data.quotes_by_ts[ts]
+        # quotes of the universe only, the data may hold other symbols
+        data = [quote for quote in self._data.quotes_by_ts[ts] if quote.symbol in self._symbols]
         return self._strategy.update(data)
 
-    def run(self) -> List[Quote]:
+    def run(self, engine: str = "loop") -> List[Quote]:
         """Run the backtest
 
+        Parameters
+        ----------
+        engine : str, optional
+            "loop" to walk the calendar date by date, or "vectorized" to compute the levels with array
+            operations (strategies implementing `retrotester.strategies.WeightStrategy.compute_weights`),
+            by default "loop"
+
         Returns
         -------
         List[Quote]
             levels of the strategy
         """
-        self._create_strategy()
-        self._level_by_ts[self._calendar[0]] = Quote(close=self._config.basis, ts=self._calendar[0])
-        for ts in tqdm(self._calendar[1:], desc="Backtesting"):
-            prev_ts = self._get_ts_before(ts, 1)
-            self._update_strategy(prev_ts)
-            perf = self._strategy.compute_performance(ts)
-            close = self._level_by_ts.get(prev_ts).close * (1 + perf)
-            quote = Quote(close=close, ts=ts)
-            self._level_by_ts[ts] = quote
-        return list(self._level_by_ts.values())
+        self._check_engine(engine)
+        with self._section("run"):
+            with self._section("index"):
+                self._check_universe()
+                calendar = self._calendar
+            self._stats = None
+            with self._section("create strategy"):
+                self._create_strategy()
+            self._level_by_ts[calendar[0]] = Quote(close=self._config.basis, ts=calendar[0])
+            if engine == "vectorized":
+                start = bisect_left(self._data.dates, calendar[0])
+                with self._section("performance"):
+                    perf = self._strategy.compute_performance_array(start, start + len(calendar))
+                # levels[i] = levels[i - 1] * (1 + perf[i]), as the loop
+                levels = np.cumprod(np.concatenate([[self._config.basis], 1 + perf]))
+                for ts, close in zip(calendar[1:], levels[1:].tolist()):
+                    self._level_by_ts[ts] = Quote(close=close, ts=ts)
+                return list(self._level_by_ts.values())
+            with self._section("index"):
+                self._data.quotes_by_ts
+            with self._section("backtest"):
+                for ts in tqdm(calendar[1:], desc="Backtesting"):
+                    prev_ts = self._get_ts_before(ts, 1)
+                    with self._section("update"):
+                        self._update_strategy(prev_ts)
+                    with self._section("performance"):
+                        perf = self._strategy.compute_performance(ts)
+                    close = self._level_by_ts.get(prev_ts).close * (1 + perf)
+                    quote = Quote(close=close, ts=ts)
+                    self._level_by_ts[ts] = quote
+            return list(self._level_by_ts.values())
+
+    def stream(self, chunk_size: int = 256, keep_levels: bool = False):
+        """Run the backtest by chunks of dates, with bounded memory.
+        Indicators' values are computed from their rolling states, so only the states and the current weights
+        are carried from a chunk to the next, and weights are released once their performance is computed
+
+        Parameters
+        ----------
+        chunk_size : int, optional
+            number of dates processed at once, by default 256
+        keep_levels : bool, optional
+            keep the levels in memory (needed for stats and plot), by default False
+
+        Yields
+        ------
+        Quote
+            levels of the strategy
+        """
+        self._check_universe()
+        self._stats = None
+        self._strategy.construct()
+        calendar = self._calendar
+        universe = set(self._universe)
+        # dates before the calendar warm the indicators up
+        dates = self._data.dates[: bisect(self._data.dates, calendar[-1])]
+        level = None
+        for i in range(0, len(dates), chunk_size):
+            chunk = dates[i : i + chunk_size]
+            quotes_by_symbol = dict()
+            for ts in chunk:
+                for quote in self._data.quotes_by_ts[ts]:
+                    if quote.symbol in universe:
+                        quotes_by_symbol.setdefault(quote.symbol, []).append(quote)
+            for underlying_code, quotes in quotes_by_symbol.items():
+                try:
+                    for quote in quotes:
+                        for ind in self._strategy.indicators.values():
+                            ind.update(quote)
+                    self._strategy.compute_signals(quotes)
+                except Exception as e:
+                    raise RuntimeError(f"Problem when creating strategy with {underlying_code} symbol") from e
+            for ts in chunk:
+                if ts < calendar[0]:
+                    continue
+                if level is None:
+                    level = Quote(close=self._config.basis, ts=ts)
+                else:
+                    self._update_strategy(self._get_ts_before(ts, 1))
+                    perf = self._strategy.compute_performance(ts)
+                    self._strategy.release(ts)
+                    level = Quote(close=level.close * (1 + perf), ts=ts)
+                if keep_levels:
+                    self._level_by_ts[ts] = level
+                yield level
+
+    def step(self, new_quotes: List[Quote]) -> Quote:
+        """Advance the backtest by one period, once `retrotester.retrotester.Retrotester.run` has been called.
+        The new quotes are loaded to the data, their indicators' values are computed from the rolling
+        states of the indicators and the end_ts of the backtest is moved to their ts (the Config passed
+        to the Retrotester is not modified).
+        The strategy is updated with the quotes of the previous date, and with the quotes of the earlier dates
+        of the symbols without quote at the previous date, so their weight at the new ts is affected as in `run`.
+        Signals computed from state kept by the strategy need that state in the current process: after a run
+        with n_jobs > 1, stepping `retrotester.strategies.SVRStrategy` raises an error
+
+        Parameters
+        ----------
+        new_quotes : List[Quote]
+            quotes of the universe at a new ts, after the last level
+
+        Returns
+        -------
+        Quote
+            new level of the strategy
+        """
+        if not self._level_by_ts:
+            raise ValueError("Run the backtest before stepping it")
+        ts = {quote.ts for quote in new_quotes}
+        if len(ts) != 1:
+            raise ValueError("new_quotes should all have the same ts")
+        ts = ts.pop()
+        last_ts = next(reversed(self._level_by_ts))
+        if ts <= last_ts:
+            raise ValueError(f"new_quotes should be after {last_ts}")
+        self._data.load(new_quotes)
+        self._quotes_by_pk = self._data.quotes_by_pk
+        quotes = [quote for quote in self._data.quotes_by_ts[ts] if quote.symbol in self._universe]
+        for quote in quotes:
+            try:
+                for ind in self._strategy.indicators.values():
+                    ind.update(quote)
+                self._strategy.compute_signals([quote])
+            except Exception as e:
+                raise RuntimeError(f"Problem when updating strategy with {quote.symbol} symbol") from e
+        self._config.end_ts = ts
+        prev_ts = self._get_ts_before(ts, 1)
+        prev_keys = [self._quotes_by_pk.get_prev_key((quote.symbol, ts)) for quote in quotes]
+        for quote, key in zip(quotes, prev_keys):
+            if key is not None and key[1] < prev_ts:
+                # the dates since the previous quote of the symbol are gaps
+                dates = self._data.dates
+                missing = dates[bisect(dates, key[1]) : bisect_left(dates, ts)]
+                self._gaps[quote.symbol] = self._gaps.get(quote.symbol, []) + [d for d in missing if d >= self._config.start_ts]
+        for earlier_ts in sorted({key[1] for key in prev_keys if key is not None and key[1] < prev_ts}):
+            self._update_strategy(earlier_ts)
+        self._update_strategy(prev_ts)
+        perf = self._strategy.compute_performance(ts)
+        level = Quote(close=self._level_by_ts[last_ts].close * (1 + perf), ts=ts)
+        self._level_by_ts[ts] = level
+        self._stats = None
+        return level
+
+    def optimize(
+        self,
+        param_grid: Dict[str, list],
+        metric: str = "Sharpe Ratio",
+        maximize: bool = True,
+        method: str = "grid",
+        n_iter: int = 10,
+        seed: int = None,
+        n_jobs: int = None,
+        engine: str = "loop",
+    ) -> List[dict]:
+        """Run a backtest for each combination of parameters and rank them by a statistic.
+        Parameters are passed to the strategy through Config.model_parameters. The data is sent to
+        the worker processes once, and combinations sharing the same indicators' settings are run
+        in the same worker, so the indicators' values are computed once
+
+        Parameters
+        ----------
+        param_grid : Dict[str, list]
+            parameter name as keys and values to try as values
+        metric : str, optional
+            statistic to rank the combinations on, by default "Sharpe Ratio"
+        maximize : bool, optional
+            rank the highest values first, by default True
+        method : str, optional
+            "grid" to try all the combinations, "random" to try n_iter of them, by default "grid"
+        n_iter : int, optional
+            number of combinations to try with the random method, by default 10
+        seed : int, optional
+            seed of the random method, by default None
+        n_jobs : int, optional
+            number of worker processes, 1 to run in the current process, by default the number of CPUs
+        engine : str, optional
+            engine of `retrotester.retrotester.Retrotester.run`, by default "loop"
+
+        Returns
+        -------
+        List[dict]
+            parameters and statistics of each combination, ranked by metric
+        """
+        if method not in ("grid", "random"):
+            raise ValueError(f"Unknown method {method}")
+        keys = list(param_grid)
+        combinations = [dict(zip(keys, values)) for values in itertools.product(*param_grid.values())]
+        if method == "random":
+            combinations = random.Random(seed).sample(combinations, min(n_iter, len(combinations)))
+        strategy = type(self._strategy)
+        configs = [replace(self._config, model_parameters={**(self._config.model_parameters or {}), **params}) for params in combinations]
+
+        # group the combinations by indicators' settings
+        groups = dict()
+        for i, config in enumerate(configs):
+            instance = strategy(config, self._data)
+            instance.construct()
+            settings = tuple(sorted((name, ind.settings) for name, ind in instance.indicators.items()))
+            groups.setdefault(settings, []).append(i)
+        n_jobs = n_jobs or os.cpu_count()
+        chunksize = max(1, math.ceil(len(configs) / (2 * n_jobs)))
+        tasks = [group[i : i + chunksize] for group in groups.values() for i in range(0, len(group), chunksize)]
+
+        stats = [None] * len(configs)
+        if n_jobs == 1:
+            # the backtests write their indicators and signals to a copy, as the worker processes
+            _init_worker(self._data.copy())
+            try:
+                for task in tasks:
+                    for i, s in zip(task, _run_configs(strategy, [configs[i] for i in task], engine)):
+                        stats[i] = s
+            finally:
+                _init_worker(None)
+        else:
+            with _process_pool(n_jobs, self._data) as executor:
+                futures = [(task, executor.submit(_run_configs, strategy, [configs[i] for i in task], engine)) for task in tasks]
+                for task, future in futures:
+                    for i, s in zip(task, future.result()):
+                        stats[i] = s
+
+        def rank(row: dict):
+            value = row[metric]
+            return (value != value, -value if maximize else value)
+
+        return sorted([{**params, **s} for params, s in zip(combinations, stats)], key=rank)
 
     @property
     def stats(self, riskfree_rate: float = 0.0):
-        return compute_statistics_backtest(self, riskfree_rate)
+        if self._stats is None:
+            with self._section("stats"):
+                self._stats = compute_statistics_backtest(self, riskfree_rate)
+        return self._stats
+
+    def _curves(self) -> Tuple[Tuple[np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Return the dates and levels of the strategy, and its dates, gross and net weights (None without weights)"""
+        dates = np.array(list(self._level_by_ts), dtype="datetime64[us]")
+        levels = np.fromiter((l.close for l in self._level_by_ts.values()), dtype=np.float64, count=len(self._level_by_ts))
+        if not hasattr(self._strategy, "weight_history"):
+            return (dates, levels), None
+        weights = self._strategy.weight_history(list(self._level_by_ts))
+        return (dates, levels), (dates, np.nansum(np.abs(weights), axis=1), np.nansum(weights, axis=1))
+
+    def plot(
+        self, max_points: int = 2000, method: str = "lttb", drawdown: bool = True, weights: bool = True, path: str = None, show: bool = True
+    ) -> "go.Figure":
+        """
+        Plot the levels of the strategy, downsampled to max_points, with its drawdowns and its gross and net weights
+
+        Parameters
+        ----------
+        max_points : int, optional
+            maximum number of points of each series, None to plot them all, by default 2000
+        method : str, optional
+            downsampling method, "lttb" or "minmax" (see `retrotester.plotting.downsample`), by default "lttb"
+        drawdown : bool, optional
+            plot the drawdowns, by default True
+        weights : bool, optional
+            plot the gross and net weights, by default True
+        path : str, optional
+            file to write the figure to, .html or an image such as .png (see `retrotester.plotting.save`), by default None
+        show : bool, optional
+            open the figure in a viewer, by default True
+
+        Returns
+        -------
+        go.Figure
+            figure of the backtest
+        """
+        from .plotting import plot_backtests, save
 
-    def plot(self):
+        code = self._config.strategy_code
+        levels, exposure = self._curves()
+        exposures = {code: exposure} if weights and exposure is not None else None
+        fig = plot_backtests({code: levels}, exposures, drawdown, max_points, method, title=f"Strategy '{code}' levels")
+        if path:
+            save(fig, path)
+        if show:
+            fig.show()
+        return fig
+
+
+class BatchRetrotester:
+    """
+    Backtest several strategies on the same data in one pass.
+    Data indexes are built once, indicators with the same settings are computed once for all the strategies
+    (whatever their names), and the strategies are updated date by date on the union of their calendars.
+    Each strategy keeps its own signals, so strategies declaring different indicators under the same name
+    do not collide
+    """
+
+    def __init__(self, data: Data, strategies: List[Tuple[BaseStrategy, Config]], cache: IndicatorCache = None):
+        self._data = data
+        self._cache = cache
+        self.retrotesters = [Retrotester(data, strategy, config, cache=cache) for strategy, config in strategies]
+        # signals of each strategy, of shape (time x universe) as returned by `retrotester.dataobj.Data.stack`
+        self._signals = []
+
+    def _compute_indicators(self, retrotester: Retrotester, values: dict, written: dict, symbols: List[str]):
+        """Set the values of the indicators of a strategy on the quotes, computing those whose settings are new
+
+        Parameters
+        ----------
+        retrotester : Retrotester
+            retrotester of the strategy
+        values : dict
+            settings as keys, indicator computed and its values as arrays of shape (time x symbols) as values
+        written : dict
+            quote attribute as keys, settings of the indicator whose values are set as values
+        symbols : List[str]
+            symbols of the universes of all the strategies
+        """
+        for ind in retrotester._strategy.indicators.values():
+            if ind.settings not in values:
+                with retrotester._section(f"indicator {ind._name}"):
+                    ind.compute_batch(self._data, symbols, cache=self._cache)
+                values[ind.settings] = (ind, {name: self._data.stack(name, symbols) for name in ind.outputs()})
+                written.update(dict.fromkeys(ind.outputs(), ind.settings))
+            else:
+                computed, arrays = values[ind.settings]
+                ind._states = computed._states
+                for name, computed_name in zip(ind.outputs(), computed.outputs()):
+                    if written.get(name) != ind.settings:
+                        self._data.unstack(name, arrays[computed_name], symbols)
+                        written[name] = ind.settings
+            self._data._computed_indicators[ind._name] = (ind, set(symbols))
+
+    def _create_strategies(self):
+        symbols = list(dict.fromkeys(symbol for r in self.retrotesters for symbol in r._universe))
+        values, written = dict(), dict()
+        self._signals = []
+        for r in self.retrotesters:
+            r._strategy.construct()
+            self._compute_indicators(r, values, written, symbols)
+            try:
+                for underlying_code in tqdm(r._universe, desc=f"Creating strategy {r._config.strategy_code}"):
+                    r._strategy.compute_signals(self._data.quotes_by_symbol[underlying_code])
+            except Exception as e:
+                raise RuntimeError(f"Problem when creating strategy with {underlying_code} symbol") from e
+            self._signals.append(self._data.stack("signal", r._universe))
+
+    def run(self, engine: str = "loop") -> List[List[Quote]]:
+        """Run the backtests
+
+        Parameters
+        ----------
+        engine : str, optional
+            engine of `retrotester.retrotester.Retrotester.run`, by default "loop"
+
+        Returns
+        -------
+        List[List[Quote]]
+            levels of each strategy
         """
-        Plot the levels of the strategy
+        for r in self.retrotesters:
+            r._check_engine(engine)
+        for r in self.retrotesters:
+            r._check_universe()
+            r._stats = None
+        self._create_strategies()
+        calendars = [r._calendar for r in self.retrotesters]
+        for r, calendar in zip(self.retrotesters, calendars):
+            r._level_by_ts[calendar[0]] = Quote(close=r._config.basis, ts=calendar[0])
+
+        if engine == "vectorized":
+            for r, calendar, signals in zip(self.retrotesters, calendars, self._signals):
+                self._data.unstack("signal", signals, r._universe)
+                start = bisect_left(self._data.dates, calendar[0])
+                perf = r._strategy.compute_performance_array(start, start + len(calendar))
+                levels = np.cumprod(np.concatenate([[r._config.basis], 1 + perf]))
+                for ts, close in zip(calendar[1:], levels[1:].tolist()):
+                    r._level_by_ts[ts] = Quote(close=close, ts=ts)
+            return [list(r._level_by_ts.values()) for r in self.retrotesters]
+
+        # signal of each strategy aligned on the dates, and column of each symbol
+        aligned, columns = [], []
+        for r, signals in zip(self.retrotesters, self._signals):
+            present = self._data.presence(r._universe)
+            rows = np.maximum(np.cumsum(present, axis=0) - 1, 0)
+            aligned.append(np.where(present, signals[rows, np.arange(len(r._universe))], np.nan))
+            columns.append({symbol: j for j, symbol in enumerate(r._universe)})
+        date_index = {ts: i for i, ts in enumerate(self._data.dates)}
+        bounds = [(calendar[0], calendar[-1]) for calendar in calendars]
+        for ts in tqdm(sorted(set().union(*calendars)), desc="Backtesting"):
+            d = date_index[ts]
+            if d == 0:
+                continue
+            prev_ts = self._data.dates[d - 1]
+            quotes = self._data.quotes_by_ts[prev_ts]
+            for r, (first, last), signals, cols in zip(self.retrotesters, bounds, aligned, columns):
+                if not first < ts <= last:
+                    continue
+                # signals of the strategy on the quotes of the update
+                universe_quotes = [quote for quote in quotes if quote.symbol in cols]
+                for quote, value in zip(universe_quotes, signals[d - 1, [cols[quote.symbol] for quote in universe_quotes]].tolist()):
+                    quote.signal = None if value != value else value
+                r._strategy.update(universe_quotes)
+                perf = r._strategy.compute_performance(ts)
+                r._level_by_ts[ts] = Quote(close=r._level_by_ts[prev_ts].close * (1 + perf), ts=ts)
+        return [list(r._level_by_ts.values()) for r in self.retrotesters]
+
+    @property
+    def stats(self) -> List[dict]:
+        """Return the statistics of each strategy"""
+        return [r.stats for r in self.retrotesters]
+
+    def plot(self, max_points: int = 2000, method: str = "lttb", drawdown: bool = True, path: str = None, show: bool = True) -> "go.Figure":
         """
-        x = [quote.ts for quote in self._level_by_ts.values()]
-        y = [quote.close for quote in self._level_by_ts.values()]
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=x, y=y))
-        fig.update_layout(title_text=f"Strategy '{self._config.strategy_code}' levels", template="simple_white")
-        fig.show()
+        Plot the levels of the strategies overlaid, see `retrotester.retrotester.Retrotester.plot`
+        """
+        from .plotting import plot_backtests, save
+
+        levels = {r._config.strategy_code: r._curves()[0] for r in self.retrotesters}
+        fig = plot_backtests(levels, None, drawdown, max_points, method, title="Strategies levels")
+        if path:
+            save(fig, path)
+        if show:
+            fig.show()
+        return fig
@@ -1,11 +1,24 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING, Dict, List, Tuple
 
 if TYPE_CHECKING:
     from retrotester import Config
 from datetime import datetime
-from .indicators import Indicator
-from .dataobj import Data, Quote, Weight
+import math
+import os
+import numpy as np
+from .indicators import (
+    Indicator,
+    SimpleMovingAverage,
+    WeightedMovingAverage,
+    RelativeStrenghtIndex,
+    AccumulationDistributionOscillator,
+    AverageTrueRange,
+)
+from .costs import traded_weights
+from .mathfunc import division
+from .models import ModelStore, SVRModel, _PackedModels, scaling, walk_forward
+from .dataobj import Data, Quote, TradeLedger, Weight, _WeightsByPk
 
 
 class BaseStrategy:
@@ -61,6 +74,13 @@ class BaseStrategy:
         """
         raise NotImplementedError
 
+    def release(self, ts: datetime):
+        """
+        Release the state kept for ts, once the performance at ts is computed
+        Override this method to bound the memory used by `Retrotester.stream`
+        """
+        pass
+
 
 class WeightStrategy(BaseStrategy):
     """
@@ -69,27 +89,147 @@ class WeightStrategy(BaseStrategy):
 
     def __init__(self, config: Config, data: Data):
         super().__init__(config, data)
-        self._weight_by_pk = dict()
+        self._weight_by_pk = _WeightsByPk(self.strategy_code, self._universe)
+        # weights of the vectorized engine, array of shape (data.dates x universe), NaN without weight
+        self._weights = None
+        # number of positive weights and number of weights released
+        self._released = [0, 0]
+        self._cost_model = config.costs
+        # last weight of each symbol of the universe, and total turnover and transaction costs
+        self._held = [0.0] * len(self._universe)
+        self._totals = [0.0, 0.0]
 
     def get_weight(self, underlying_code: str, ts: datetime) -> Weight:
         """Return weight object for a given underlying_code at ts"""
         return self._weight_by_pk.get((self.strategy_code, underlying_code, ts))
 
     def compute_performance(self, ts: datetime) -> float:
-        perf_ = 0.0
+        """Compute strategy's performance at ts, net of the transaction costs of config.costs"""
+        weights = self._weight_by_pk.row(ts)
+        if weights is None:
+            return 0.0
+        quotes_by_pk, held, costs = self._data.quotes_by_pk, self._held, self._cost_model is not None
+        perf_, traded, previous_quotes = 0.0, [], []
+        for j in np.flatnonzero(~np.isnan(weights[: len(self._universe)])).tolist():
+            underlying_code, value = self._universe[j], float(weights[j])
+            current_quote = quotes_by_pk.get((underlying_code, ts))
+            # retrieve last available quote
+            prev_key = quotes_by_pk.get_prev_key((underlying_code, ts))
+            previous_quote = quotes_by_pk.get(prev_key)
+            if current_quote is not None and previous_quote is not None:
+                perf_ += value * (current_quote.close / previous_quote.close - 1)
+            else:
+                raise ValueError(f"Missing Quote for {underlying_code} at {ts}")
+            # the weight is traded at the previous quote
+            traded.append(abs(value - held[j]))
+            held[j] = value
+            if costs:
+                previous_quotes.append(previous_quote)
+        self._totals[0] += sum(traded)
+        if costs and traded:
+            close = np.array([quote.close for quote in previous_quotes], dtype=np.float64)
+            volume = np.array([quote.volume for quote in previous_quotes], dtype=np.float64)
+            cost = float(self._cost_model.costs(np.array(traded), close, volume))
+            self._totals[1] += cost
+            perf_ -= cost
+        return perf_
+
+    def compute_weights(self, signals: np.ndarray) -> np.ndarray:
+        """
+        Compute the weights from the signals, as `retrotester.strategies.BaseStrategy.update` for each date
+        Override this method to run the strategy with `Retrotester.run(engine="vectorized")`
+
+        Parameters
+        ----------
+        signals : np.ndarray
+            signals of shape (data.dates x universe), NaN where there is no quote
+
+        Returns
+        -------
+        np.ndarray
+            weights of shape (data.dates x universe)
+        """
+        raise NotImplementedError
+
+    def compute_performance_array(self, start: int, end: int) -> np.ndarray:
+        """Compute strategy's performance at data.dates[start + 1 : end], as
+        `retrotester.strategies.WeightStrategy.compute_performance` after updating the strategy
+        with the quotes of the previous date, using arrays of shape (data.dates x universe)
+
+        Parameters
+        ----------
+        start : int
+            position in data.dates of the first date of the backtest
+        end : int
+            position in data.dates after the last date of the backtest
+
+        Returns
+        -------
+        np.ndarray
+            performance at each date, after the first one, net of the transaction costs
+        """
+        present = self._data.presence(self._universe)
+        close = self._data.align("close", self._universe)
+        signals = self._data.align("signal", self._universe)
+        dates, cols = np.arange(len(present))[:, None], np.arange(len(self._universe))
+        # position of the previous quote of each symbol, -1 if there is none
+        prev = np.full(present.shape, -1)
+        prev[1:] = np.maximum.accumulate(np.where(present, dates, -1), axis=0)[:-1]
+        # a weight is affected to the next quote of each quote of the dates [start, end - 1)
+        has_weight = present & (prev >= start) & (prev <= end - 2)
+        if np.isnan(signals[start : end - 1][present[start : end - 1]]).any():
+            raise ValueError("Missing signal for a quote of the backtest")
+        prev = np.where(prev >= 0, prev, 0)
+        self._weights = np.where(has_weight, self.compute_weights(signals)[prev, cols], np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = close / close[prev, cols] - 1
+        perf = np.zeros(len(present))
+        for j in cols:
+            # sum in universe order, as compute_performance
+            perf += np.where(has_weight[:, j], self._weights[:, j] * returns[:, j], 0.0)
+        traded = traded_weights(self._weights)
+        costs = np.zeros(len(present))
+        if self._cost_model is not None:
+            volume = self._data.align("volume", self._universe)
+            costs = self._cost_model.costs(traded, close[prev, cols], volume[prev, cols])
+        self._totals = [float(traded[start + 1 : end].sum()), float(costs[start + 1 : end].sum())]
+        return (perf - costs)[start + 1 : end]
+
+    def release(self, ts: datetime):
         for underlying_code in self._universe:
-            weight = self.get_weight(underlying_code, ts)
+            weight = self._weight_by_pk.pop((self.strategy_code, underlying_code, ts), None)
             if weight is not None:
-                value = weight.value
-                current_quote = self._data.quotes_by_pk.get((underlying_code, ts))
-                # retrieve last available quote
-                prev_key = self._data.quotes_by_pk.get_prev_key((underlying_code, ts))
-                previous_quote = self._data.quotes_by_pk.get(prev_key)
-                if current_quote is not None and previous_quote is not None:
-                    perf_ += value * (current_quote.close / previous_quote.close - 1)
-                else:
-                    raise ValueError(f"Missing Quote for {underlying_code} at {ts}")
-        return perf_
+                self._released[0] += weight.value > 0
+                self._released[1] += 1
+
+    def weight_history(self, dates: List[datetime]) -> np.ndarray:
+        """Return the weights at dates, array of shape (dates x universe), NaN without weight
+        (or once released by `Retrotester.stream`)"""
+        if self._weights is not None:
+            index = {ts: i for i, ts in enumerate(self._data.dates)}
+            return self._weights[[index[ts] for ts in dates]]
+        out = np.full((len(dates), len(self._universe)), np.nan)
+        for i, ts in enumerate(dates):
+            row = self._weight_by_pk.row(ts)
+            if row is not None:
+                out[i] = row[: len(self._universe)]
+        return out
+
+    def turnover(self) -> float:
+        """Return the total of the weights traded"""
+        return self._totals[0]
+
+    def transaction_costs(self) -> float:
+        """Return the total of the transaction costs, as a fraction of the portfolio"""
+        return self._totals[1]
+
+    def exposure(self) -> float:
+        """Return the percentage of positive weights"""
+        if self._weights is not None:
+            values = self._weights[~np.isnan(self._weights)]
+        else:
+            values = self._weight_by_pk.weight_values()
+        return 100 * ((values > 0).sum() + self._released[0]) / (len(values) + self._released[1])
 
 
 class EquiWeightedStrategy(WeightStrategy):
@@ -102,3 +242,324 @@ class EquiWeightedStrategy(WeightStrategy):
                 next_key = (self.strategy_code, *next_quote)
                 # affect a weight to the next available quote for the symbol
                 self._weight_by_pk[next_key] = Weight(product_code=self.strategy_code, underlying_code=quote.symbol, ts=next_key[-1], value=value)
+
+    def compute_weights(self, signals: np.ndarray) -> np.ndarray:
+        sum_ = np.zeros(len(signals))
+        for j in range(signals.shape[1]):
+            sum_ += np.where(np.isnan(signals[:, j]), 0.0, np.abs(signals[:, j]))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(sum_[:, None] != 0, signals / sum_[:, None], 0.0)
+
+
+class TradeStrategy(BaseStrategy):
+    """
+    A trading strategy opening and closing trades on the signals of the quotes: 1 (or positive) to be long,
+    -1 (or negative) to be short, 0 or None to be flat. The open trade of a symbol is closed at the close of
+    a quote whose signal changes its direction, and a trade in the new direction is opened at the same price.
+    Trades are sized as a fraction of the strategy's equity at entry, Config.trade_size (passed through
+    Config.model_parameters), by default 1 / number of symbols of the universe.
+    The strategy runs with the "loop" engine of `Retrotester.run`, `Retrotester.stream` and `Retrotester.step`.
+    Override methods `retrotester.strategies.BaseStrategy.construct` and
+    `retrotester.strategies.BaseStrategy.compute_signals` to define the strategy
+    """
+
+    def __init__(self, config: Config, data: Data):
+        super().__init__(config, data)
+        self.trade_size = getattr(config, "trade_size", 1 / len(self._universe))
+        self.trades = TradeLedger(self._universe)
+        self._columns = {code: j for j, code in enumerate(self._universe)}
+        self._cost_model = config.costs
+        self._equity = float(config.basis)
+        # closes of the universe aligned on data.dates and position of each date, built on first use
+        self._close = None
+        self._date_index = dict()
+        # costs of the trades not charged yet, total turnover and transaction costs, dates with open trades and dates
+        self._pending = 0.0
+        self._totals = [0.0, 0.0]
+        self._exposed = [0, 0]
+        # ts of the last quote of each symbol the strategy was updated with
+        self._last_ts = dict()
+
+    def _trade(self, quote: Quote, quantity: float):
+        """Account for the turnover and the transaction costs of trading quantity at the close of quote"""
+        traded = float(abs(quantity) * quote.close / self._equity)
+        self._totals[0] += traded
+        if self._cost_model is not None:
+            cost = float(self._cost_model.costs(np.array([traded]), np.array([quote.close]), np.array([quote.volume], dtype=np.float64)))
+            self._totals[1] += cost
+            self._pending += cost * self._equity
+
+    def update(self, data: List[Quote]):
+        """Open and close the trades on the signals of the quotes, quotes already seen for their symbol
+        (as the earlier dates updated again by `Retrotester.step`) are skipped"""
+        for quote in data:
+            j = self._columns.get(quote.symbol)
+            if j is None or quote.close is None or (j in self._last_ts and quote.ts <= self._last_ts[j]):
+                continue
+            self._last_ts[j] = quote.ts
+            direction = 0 if not quote.signal else (1 if quote.signal > 0 else -1)
+            row = self.trades.open_by_symbol.get(j)
+            current = 0 if row is None else (1 if self.trades.size[row] > 0 else -1)
+            if direction == current:
+                continue
+            if row is not None:
+                self._trade(quote, self.trades.size[row])
+                self.trades.close(row, quote.ts, quote.close)
+            if direction:
+                size = direction * self.trade_size * self._equity / quote.close
+                self._trade(quote, size)
+                self.trades.open(j, quote.ts, quote.close, size)
+
+    def _prices(self, ts: datetime) -> np.ndarray:
+        """Return the close of each symbol of the universe at ts, NaN where there is no quote"""
+        i = self._date_index.get(ts)
+        if i is None:
+            # first call, or dates added to the data since the closes were aligned
+            self._close = self._data.align("close", self._universe)
+            self._date_index = {d: k for k, d in enumerate(self._data.dates)}
+            i = self._date_index[ts]
+        return self._close[i]
+
+    def compute_performance(self, ts: datetime) -> float:
+        """Compute strategy's performance at ts, marking the open trades to the closes at ts, net of the transaction costs"""
+        self._exposed[0] += len(self.trades.active) > 0
+        self._exposed[1] += 1
+        pnl = self.trades.mark(self._prices(ts)) - self._pending
+        self._pending = 0.0
+        perf_ = pnl / self._equity
+        self._equity += pnl
+        return perf_
+
+    def turnover(self) -> float:
+        """Return the total of the value traded, as a fraction of the equity"""
+        return self._totals[0]
+
+    def transaction_costs(self) -> float:
+        """Return the total of the transaction costs, as a fraction of the equity"""
+        return self._totals[1]
+
+    def exposure(self) -> float:
+        """Return the percentage of dates with an open trade"""
+        return 100 * division(self._exposed[0], self._exposed[1])
+
+
+class _WalkForward:
+    """Walk-forward state of a symbol"""
+
+    def __init__(self, symbol: str, n_features: int):
+        self.symbol = symbol
+        # ts of each position in the arrays, and position of each ts
+        self.ts = []
+        self.rows = dict()
+        self.features = np.empty((0, n_features))
+        self.close = np.empty(0)
+        self.predictions = np.empty(0)
+        # first position where all the features are known, scaling of the features and of the target, set on the first training
+        self.first = None
+        self.scaling = None
+        self.target_scaling = None
+        # positions from which each model is used, and models
+        self.starts = []
+        self.models = []
+
+
+class SVRStrategy(EquiWeightedStrategy):
+    """
+    A strategy weighting the symbols by their returns predicted by RBF support vector regressions,
+    trained walk-forward on the indicators' values of each symbol.
+    Parameters are read from the Config (passed through Config.model_parameters):
+        - train_window: number of quotes of the training windows, by default 250
+        - retrain_every: number of quotes between two trainings, by default 20
+        - horizon: number of quotes of the predicted return, by default 1
+        - C, epsilon, gamma: hyperparameters of the regressions, by default 1.0, 0.1 and 1 / number of features
+        - n_jobs: number of threads training the regressions, by default the number of CPUs
+        - model_store: `retrotester.models.ModelStore`, or its directory, to reuse the models fitted by previous backtests, by default None
+    Features and returns are scaled with their mean and standard deviation over the first training window of each symbol.
+    Override methods `retrotester.strategies.SVRStrategy.construct` and
+    `retrotester.strategies.SVRStrategy.compute_features` to change the features
+    """
+
+    def __init__(self, config: Config, data: Data):
+        super().__init__(config, data)
+        self.train_window = getattr(config, "train_window", 250)
+        self.retrain_every = getattr(config, "retrain_every", 20)
+        self.horizon = getattr(config, "horizon", 1)
+        self.C = getattr(config, "C", 1.0)
+        self.epsilon = getattr(config, "epsilon", 0.1)
+        self.gamma = getattr(config, "gamma", None)
+        self.n_jobs = getattr(config, "n_jobs", None) or os.cpu_count()
+        self.model_store = getattr(config, "model_store", None)
+        if isinstance(self.model_store, str):
+            self.model_store = ModelStore(self.model_store)
+        self._history = dict()
+        # latest models of the symbols scored by `retrotester.strategies.SVRStrategy.predict`, stacked
+        self._packed = None
+
+    def construct(self):
+        self.add_indicators(
+            [
+                SimpleMovingAverage(self._config, "sma", 10),
+                WeightedMovingAverage(self._config, "wma", 10),
+                RelativeStrenghtIndex(self._config, "rsi", 14),
+                AccumulationDistributionOscillator(self._config, "ado"),
+                AverageTrueRange(self._config, "atr", 14),
+            ]
+        )
+
+    def compute_features(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Compute the features of the quotes of a symbol
+        Override this method to change the features
+
+        Parameters
+        ----------
+        columns : Dict[str, np.ndarray]
+            close and values of each indicator, by name (NaN when there is no value)
+
+        Returns
+        -------
+        np.ndarray
+            array of shape (quotes x features)
+        """
+        features = []
+        for name, ind in self.indicators.items():
+            values = columns[name]
+            if isinstance(ind, (SimpleMovingAverage, WeightedMovingAverage, AverageTrueRange)):
+                # price levels, relative to the close
+                values = values / columns["close"]
+            features.append(values)
+        return np.column_stack(features)
+
+    def _columns_from_data(self, symbols: List[str]) -> Dict[str, Tuple[list, Dict[str, np.ndarray]]]:
+        """Return the ts and the columns of the quotes of the symbols, stacked at once"""
+        lengths = self._data.series_lengths(symbols)
+        stacked = {name: self._data.stack(name, symbols) for name in ["close", *self.indicators]}
+        return {
+            symbol: ([quote.ts for quote in self._data.quotes_by_symbol[symbol]], {name: values[:n, j] for name, values in stacked.items()})
+            for j, (symbol, n) in enumerate(zip(symbols, lengths))
+        }
+
+    def _columns_from_quotes(self, quotes: List[Quote]) -> Tuple[list, Dict[str, np.ndarray]]:
+        columns = {name: np.array([getattr(quote, name) for quote in quotes], dtype=np.float64) for name in ["close", *self.indicators]}
+        return [quote.ts for quote in quotes], columns
+
+    def _starts(self, history: _WalkForward) -> List[int]:
+        """Return the positions of the models to train, up to the last quote of history"""
+        if history.first is None:
+            valid = np.isfinite(history.features).all(axis=1)
+            if not valid.any():
+                return []
+            history.first = int(valid.argmax())
+        first = history.first + self.train_window + self.horizon - 1
+        if history.starts:
+            first = history.starts[-1] + self.retrain_every
+        return list(range(first, len(history.close), self.retrain_every))
+
+    def _target(self, close: np.ndarray) -> np.ndarray:
+        """Return the return of each quote over the next horizon quotes, NaN when it is unknown"""
+        target = np.full(len(close), np.nan)
+        target[: -self.horizon] = close[self.horizon :] / close[: -self.horizon] - 1
+        return target
+
+    def _train(self, history: _WalkForward, starts: List[int]) -> List[SVRModel]:
+        mean, scale = history.scaling
+        target_mean, target_scale = history.target_scaling
+        x = np.nan_to_num((history.features - mean) / scale)
+        target = (self._target(history.close) - target_mean) / target_scale
+        gamma = self.gamma or 1 / x.shape[1]
+        keys = None
+        if self.model_store is not None:
+            features = (type(self).__qualname__, tuple((name, ind.settings) for name, ind in self.indicators.items()))
+            params = {"horizon": self.horizon, "C": self.C, "epsilon": self.epsilon, "gamma": gamma, "target_scaling": history.target_scaling}
+            keys = []
+            for start in starts:
+                lo = start - self.horizon - self.train_window + 1
+                window = slice(lo, lo + self.train_window)
+                data = {"x": x[window], "target": target[window], "mean": mean, "scale": scale}
+                keys.append(self.model_store.key(history.symbol, (history.ts[lo], history.ts[window.stop - 1]), features, params, data))
+        return walk_forward(
+            x, target, starts, self.train_window, self.horizon, self.C, self.epsilon, gamma, mean, scale, history.target_scaling, self.model_store, keys
+        )
+
+    def _extend(self, new: Dict[str, Tuple[list, Dict[str, np.ndarray]]]):
+        """Add quotes to the history of their symbol, train the models of the new training windows,
+        in parallel across symbols and blocks of consecutive windows, and predict the new quotes"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        tasks, sizes = [], dict()
+        for symbol, (ts, columns) in new.items():
+            features = self.compute_features(columns)
+            history = self._history.setdefault(symbol, _WalkForward(symbol, features.shape[1]))
+            sizes[symbol] = len(history.close)
+            history.rows.update((t, i) for i, t in enumerate(ts, len(history.close)))
+            history.ts.extend(ts)
+            history.features = np.concatenate([history.features, features])
+            history.close = np.concatenate([history.close, columns["close"]])
+            starts = self._starts(history)
+            if starts and history.scaling is None:
+                window = slice(history.first, history.first + self.train_window)
+                history.scaling = scaling(history.features[window])
+                history.target_scaling = tuple(value[0] for value in scaling(self._target(history.close)[window, None]))
+            tasks.append((symbol, starts))
+        chunksize = max(1, math.ceil(sum(len(starts) for _, starts in tasks) / (2 * self.n_jobs)))
+        blocks = [(symbol, starts[i : i + chunksize]) for symbol, starts in tasks for i in range(0, len(starts), chunksize)]
+        with ThreadPoolExecutor(self.n_jobs) as executor:
+            futures = [executor.submit(self._train, self._history[symbol], starts) for symbol, starts in blocks]
+            for (symbol, starts), future in zip(blocks, futures):
+                self._history[symbol].starts.extend(starts)
+                self._history[symbol].models.extend(future.result())
+
+        for symbol, size in sizes.items():
+            history = self._history[symbol]
+            rows = np.arange(size, len(history.close))
+            predictions = np.full(len(rows), np.nan)
+            # model used by each row: the last one trained before it
+            used = np.searchsorted(history.starts, rows, side="right") - 1
+            for k in np.unique(used[used >= 0]):
+                mask = used == k
+                predictions[mask] = history.models[k].predict(history.features[rows[mask]])
+            predictions[~np.isfinite(history.features[rows]).all(axis=1)] = np.nan
+            history.predictions = np.concatenate([history.predictions, predictions])
+
+    def compute_signals(self, quotes: List[Quote]):
+        """Set the predicted returns of the quotes as their signal (0 before the first training).
+        The quotes are added to the history of their symbol, so they can be passed all at once,
+        as in `Retrotester.run`, or by chunks, as in `Retrotester.stream` and `Retrotester.step`"""
+        if not quotes:
+            return
+        symbol = quotes[0].symbol
+        history = self._history.get(symbol)
+        if history is None and len(quotes) == len(self._data.quotes_by_symbol[symbol]):
+            # whole series: train all the symbols of the universe at once
+            self._extend(self._columns_from_data([s for s in self._universe if s not in self._history]))
+        else:
+            if history is None and quotes[0].ts != self._data.quotes_by_symbol[symbol][0].ts:
+                # the history of the earlier quotes was built in worker processes (Retrotester with n_jobs > 1)
+                raise ValueError(f"No history of {symbol} before {quotes[0].ts}, run the backtest with n_jobs=1 to step it")
+            new_quotes = [quote for quote in quotes if history is None or quote.ts not in history.rows]
+            if new_quotes:
+                self._extend({symbol: self._columns_from_quotes(new_quotes)})
+        history = self._history[symbol]
+        for quote in quotes:
+            value = history.predictions[history.rows[quote.ts]]
+            quote.signal = float(value) if value == value else 0.0
+
+    def predict(self, quotes: List[Quote]) -> np.ndarray:
+        """Predict the returns of quotes of different symbols in one call, with the latest model of their symbol,
+        as for scoring the universe at a new ts. Indicators' values of the quotes must be computed
+
+        Parameters
+        ----------
+        quotes : List[Quote]
+            quotes of symbols with a trained model
+
+        Returns
+        -------
+        np.ndarray
+            predicted return of each quote
+        """
+        models = [self._history[quote.symbol].models[-1] for quote in quotes]
+        if self._packed is None or len(self._packed.models) != len(models) or any(a is not b for a, b in zip(self._packed.models, models)):
+            self._packed = _PackedModels(models)
+        features = self.compute_features(self._columns_from_quotes(quotes)[1])
+        return self._packed.predict(features)
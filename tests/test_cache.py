@@ -0,0 +1,49 @@
+from datetime import datetime
+import numpy as np
+from benchmarks.synthetic import generate_quotes
+from retrotester import Config, Data, Frequency, SimpleMovingAverage
+from retrotester.cache import IndicatorCache
+
+N_SYMBOLS = 4
+
+
+def entry(value: float):
+    """Entry of 800 bytes"""
+    return {"sma": np.full(100, value)}, dict()
+
+
+def compute_sma(data: Data, cache: IndicatorCache = None) -> np.ndarray:
+    universe = data.frame.symbols
+    config = Config(universe, datetime(2000, 1, 3), datetime(2001, 1, 1), "test", Frequency.DAILY, model_parameters={"quote_period": "close"})
+    SimpleMovingAverage(config, "sma", 10).compute_batch(data, universe, cache=cache)
+    return data.stack("sma", universe)
+
+
+def test_lru_eviction():
+    cache = IndicatorCache(max_bytes=2000)
+    cache.set("a", entry(1.0))
+    cache.set("b", entry(2.0))
+    # a is used more recently than b
+    assert cache.get("a")[0]["sma"][0] == 1.0
+    cache.set("c", entry(3.0))
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.info() == {"hits": 2, "misses": 1, "evictions": 1, "entries": 2, "nbytes": 1600}
+
+
+def test_persisted_values_are_read_back(tmp_path):
+    quotes = generate_quotes(N_SYMBOLS, 100, seed=3)
+    expected = compute_sma(Data(quotes, columnar=True))
+
+    cache = IndicatorCache(directory=str(tmp_path))
+    np.testing.assert_array_equal(compute_sma(Data(quotes, columnar=True), cache), expected)
+    assert (cache.hits, cache.misses) == (0, N_SYMBOLS)
+
+    # a new cache reads the values of the directory
+    cache = IndicatorCache(directory=str(tmp_path))
+    np.testing.assert_array_equal(compute_sma(Data(quotes, columnar=True), cache), expected)
+    assert (cache.hits, cache.misses) == (N_SYMBOLS, 0)
+    # series of a symbol changed since are computed again
+    changed = [quote for quote in quotes if not (quote.symbol == "S0" and quote.ts == quotes[-1].ts)]
+    compute_sma(Data(changed, columnar=True), cache)
+    assert (cache.hits, cache.misses) == (2 * N_SYMBOLS - 1, 1)
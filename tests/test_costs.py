@@ -0,0 +1,38 @@
+from dataclasses import replace
+import numpy as np
+import pytest
+from retrotester import CostModel, Data, Retrotester
+from retrotester.costs import traded_weights
+from .test_retrotester import SmaStrategy, make_config, make_quotes
+
+NAN = np.nan
+
+
+def test_traded_weights():
+    weights = np.array([[0.5, NAN], [0.5, 0.5], [NAN, -0.5], [0.25, NAN]])
+    expected = np.array([[0.5, 0.0], [0.0, 0.5], [0.0, 1.0], [0.25, 0.0]])
+    np.testing.assert_array_equal(traded_weights(weights), expected)
+    assert traded_weights(weights).sum() == 2.25
+
+
+def test_costs():
+    model = CostModel(proportional=0.001, fixed=10.0, spread=0.002, impact=0.1, capital=1e4)
+    traded, close, volume = np.array([0.5, 0.0]), np.array([10.0, 20.0]), np.array([1000.0, 1000.0])
+    # the first trade is half the volume of its bar, no trade on the second symbol
+    expected = 0.5 * (0.001 + 0.002 / 2) + 10.0 / 1e4 + 0.1 * 0.5 * np.sqrt(0.5)
+    assert model.costs(traded, close, volume) == pytest.approx(expected)
+    np.testing.assert_allclose(model.costs(np.stack([traded, traded]), np.stack([close, close]), np.stack([volume, volume])), [expected] * 2)
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_costs_on_both_engines(columnar):
+    quotes, dates = make_quotes()
+    gross = [level.close for level in Retrotester(Data(quotes, columnar=columnar), SmaStrategy, make_config(dates)).run()]
+    config = replace(make_config(dates), costs=CostModel(proportional=0.001, fixed=1.0, spread=0.0005, impact=0.1))
+    results = []
+    for engine in ("loop", "vectorized"):
+        retrotester = Retrotester(Data(quotes, columnar=columnar), SmaStrategy, config)
+        results.append([level.close for level in retrotester.run(engine=engine)])
+        assert retrotester.stats["Cost Drag (Ann.) [%]"] > 0
+    assert results[0] == results[1]
+    assert all(net < level for net, level in zip(results[0][1:], gross[1:]))
@@ -0,0 +1,177 @@
+from datetime import datetime, timedelta
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import json
+import os
+import threading
+import numpy as np
+import pytest
+from retrotester.fetch import FetcherSource, HTTPSource, Source, aupdate_universe, fetch_all, update_universe
+from retrotester.loader import FileFetcher, load_universe
+
+SYMBOLS = ["AAA", "BBB"]
+START = datetime(2020, 1, 1)
+
+
+def write_bars(directory: str, n_bars: int):
+    """Write n_bars daily bars of each symbol as CSV files"""
+    for k, symbol in enumerate(SYMBOLS):
+        lines = ["Date,Open,High,Low,Close,Adj Close,Volume"]
+        for i in range(n_bars):
+            close = 100 + 10 * k + i
+            lines.append(f"{(START + timedelta(days=i)):%Y-%m-%d},{close},{close + 1},{close - 1},{close},{close},{1000 + i}")
+        with open(os.path.join(directory, f"{symbol}.csv"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+@pytest.fixture
+def universe(tmp_path):
+    os.makedirs(tmp_path / "bars")
+    path = str(tmp_path / "universe.json")
+    with open(path, "w") as f:
+        json.dump({symbol: {"name": symbol, "start": "01/01/2020", "end": "31/12/2020"} for symbol in SYMBOLS}, f)
+    return path
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class RecordingFetcher(FileFetcher):
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        self.calls = []
+
+    def fetch(self, symbol, start, end):
+        self.calls.append((symbol, start))
+        return super().fetch(symbol, start, end)
+
+
+class FlakySource(Source):
+    """Source failing the first failures requests of each symbol"""
+
+    def __init__(self, source: Source, failures: int):
+        self.source = source
+        self.failures = failures
+        self.attempts = dict()
+
+    async def fetch(self, symbol, start, end):
+        self.attempts[symbol] = self.attempts.get(symbol, 0) + 1
+        if self.attempts[symbol] <= self.failures:
+            raise OSError("connection reset")
+        return await self.source.fetch(symbol, start, end)
+
+
+def closes(data, symbol: str) -> list:
+    return [quote.close for quote in data.quotes_by_symbol[symbol]]
+
+
+def test_update_universe_incremental(tmp_path, universe):
+    bars, cache = str(tmp_path / "bars"), str(tmp_path / "cache")
+    fetcher = RecordingFetcher(bars)
+    source = FetcherSource(fetcher)
+    write_bars(bars, 30)
+    data = update_universe(universe, source, cache)
+    assert data.frame.directory == cache
+    assert closes(data, "AAA") == [100.0 + i for i in range(30)]
+
+    # a day later, only the new bars are fetched and appended to the cache
+    write_bars(bars, 31)
+    fetcher.calls.clear()
+    data = update_universe(universe, source, cache)
+    source.close()
+    last = START + timedelta(days=29)
+    assert sorted(fetcher.calls) == [(symbol, last + timedelta(microseconds=1)) for symbol in SYMBOLS]
+    assert closes(data, "AAA") == [100.0 + i for i in range(31)]
+    assert closes(data, "BBB") == [110.0 + i for i in range(31)]
+    assert data.dates[-1] == START + timedelta(days=30)
+
+
+def test_load_universe_cache(tmp_path, universe):
+    bars, cache = str(tmp_path / "bars"), str(tmp_path / "cache")
+    write_bars(bars, 10)
+    fetcher = RecordingFetcher(bars)
+    load_universe(universe, fetcher, cache)
+    assert len(fetcher.calls) == 2
+    # same symbols from the same source: the bars are read from the cache
+    fetcher.calls.clear()
+    assert load_universe(universe, fetcher, cache).frame.directory == cache
+    assert fetcher.calls == []
+
+    # other symbols or another source: the bars are fetched again
+    data = load_universe(universe, fetcher, cache, symbols=["AAA"])
+    assert data.frame.symbols == ["AAA"] and len(fetcher.calls) == 1
+    other = str(tmp_path / "other")
+    os.makedirs(other)
+    write_bars(other, 5)
+    assert len(load_universe(universe, FileFetcher(other), cache, symbols=["AAA"]).quotes) == 5
+    assert len(load_universe(universe, FileFetcher(bars), cache, symbols=["AAA"]).quotes) == 10
+
+    # bars cached by update_universe from the same source
+    source = FetcherSource(fetcher)
+    update_universe(universe, source, cache)
+    source.close()
+    fetcher.calls.clear()
+    assert closes(load_universe(universe, fetcher, cache), "BBB") == [110.0 + i for i in range(10)]
+    assert fetcher.calls == []
+
+
+def test_update_universe_in_running_loop(tmp_path, universe):
+    bars, cache = str(tmp_path / "bars"), str(tmp_path / "cache")
+    write_bars(bars, 10)
+    source = FetcherSource(FileFetcher(bars))
+
+    async def notebook_cell():
+        # as in a Jupyter notebook, whose event loop is running
+        with pytest.raises(RuntimeError, match="await aupdate_universe"):
+            update_universe(universe, source, cache)
+        return await aupdate_universe(universe, source, cache)
+
+    data = asyncio.run(notebook_cell())
+    source.close()
+    assert closes(data, "AAA") == [100.0 + i for i in range(10)]
+
+
+def test_update_universe_retries(tmp_path, universe):
+    bars, cache = str(tmp_path / "bars"), str(tmp_path / "cache")
+    write_bars(bars, 10)
+    source = FlakySource(FetcherSource(FileFetcher(bars)), failures=2)
+    data = update_universe(universe, source, cache, retries=2, backoff=0)
+    source.source.close()
+    assert source.attempts == {symbol: 3 for symbol in SYMBOLS}
+    assert len(data.quotes) == 20
+
+    source = FlakySource(FetcherSource(FileFetcher(bars)), failures=3)
+    with pytest.raises(RuntimeError, match="Problem when fetching"):
+        update_universe(universe, source, str(tmp_path / "other"), retries=2, backoff=0)
+    source.source.close()
+
+
+def test_fetch_all_bad_file(tmp_path):
+    with open(tmp_path / "AAA.csv", "w") as f:
+        f.write("Day,Close\n2020-01-01,1\n")
+    source = FetcherSource(FileFetcher(str(tmp_path)))
+    ranges = {"AAA": (START, START + timedelta(days=10))}
+    with pytest.raises(RuntimeError) as info:
+        asyncio.run(fetch_all(source, ranges, retries=1, backoff=0))
+    source.close()
+    assert isinstance(info.value.__cause__, ValueError)
+
+
+def test_http_source(tmp_path, universe):
+    bars = str(tmp_path / "bars")
+    write_bars(bars, 20)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=bars))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        source = HTTPSource(f"http://127.0.0.1:{server.server_address[1]}", max_connections=2)
+        data = update_universe(universe, source, str(tmp_path / "cache"))
+        source.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert closes(data, "BBB") == [110.0 + i for i in range(20)]
+    np.testing.assert_array_equal(data.stack("volume", ["AAA"])[:, 0], 1000.0 + np.arange(20))
@@ -0,0 +1,95 @@
+from datetime import datetime
+import os
+import numpy as np
+import pytest
+from benchmarks.synthetic import generate_quotes
+from retrotester import Config, Data, Frequency, Quote, QuoteFrame, SimpleMovingAverage
+
+
+def make_config(universe) -> Config:
+    return Config(universe, datetime(2000, 1, 3), datetime(2001, 1, 1), "test", Frequency.DAILY, model_parameters={"quote_period": "close"})
+
+
+@pytest.fixture
+def directory(tmp_path):
+    QuoteFrame.from_quotes(generate_quotes(5, 100, seed=2)).save(str(tmp_path))
+    return str(tmp_path)
+
+
+def test_frames_opened_from_one_directory_keep_their_columns(directory):
+    first, second = Data.open(directory), Data.open(directory)
+    universe = first.frame.symbols
+    SimpleMovingAverage(make_config(universe), "sma", 10).compute_batch(first, universe)
+    expected = np.array(first.frame.columns["sma"])
+    SimpleMovingAverage(make_config(universe), "sma", 40).compute_batch(second, universe)
+    assert isinstance(first.frame.columns["sma"], np.memmap)
+    np.testing.assert_array_equal(first.frame.columns["sma"], expected)
+    assert not np.array_equal(second.frame.columns["sma"], expected, equal_nan=True)
+
+
+def test_scratch_files_are_removed(directory):
+    data = Data.open(directory)
+    SimpleMovingAverage(make_config(data.frame.symbols), "sma", 10).compute_batch(data, data.frame.symbols)
+    del data
+    assert os.listdir(os.path.join(directory, "scratch")) == []
+
+
+def test_append_newer_quotes(directory):
+    old = generate_quotes(5, 100, seed=2)
+    # quotes of a later date, with a new symbol
+    new = [quote for quote in generate_quotes(6, 101, seed=3) if quote.ts > max(quote.ts for quote in old)]
+    data = Data.open(directory)
+    universe = data.frame.symbols
+    SimpleMovingAverage(make_config(universe), "sma", 10).compute_batch(data, universe)
+    sma = data.stack("sma", universe)
+    data.load(new)
+    expected = QuoteFrame.from_quotes(old + new)
+    assert data.frame.symbols == expected.symbols
+    np.testing.assert_array_equal(data.frame.ts, expected.ts)
+    np.testing.assert_array_equal(data.frame.offsets, expected.offsets)
+    for field in expected.columns:
+        np.testing.assert_array_equal(data.frame.columns[field], expected.columns[field])
+    np.testing.assert_array_equal(data.stack("sma", universe)[:100], sma)
+    # the frame stays backed by files
+    assert data.frame.directory == directory
+    assert isinstance(data.frame.columns["close"], np.memmap) and isinstance(data.frame.columns["sma"], np.memmap)
+
+
+def test_views_see_the_writes_to_the_frame():
+    data = Data(generate_quotes(3, 50, seed=5), columnar=True)
+    universe = data.frame.symbols
+    quotes, others = data.quotes_by_symbol["S0"], data.quotes_by_symbol["S0"]
+    assert [quote.close for quote in quotes] == data.stack("close", ["S0"])[:, 0].tolist()
+    quotes[3].signal = 1
+    assert quotes[3].signal == 1.0 and others[3].signal == 1.0
+    quotes[4].signal = float("nan")
+    assert quotes[4].signal is None
+    # values written to the columns after the views were read
+    SimpleMovingAverage(make_config(universe), "sma", 5).compute_batch(data, universe)
+    assert [quote.sma for quote in quotes] == [None if v != v else v for v in data.stack("sma", ["S0"])[:, 0].tolist()]
+    assert quotes[3].signal == 1.0
+    with pytest.raises(AttributeError):
+        quotes[0].unknown
+    with pytest.raises(AttributeError):
+        quotes[0].ts = datetime(2000, 1, 1)
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_resample_hourly_to_daily(columnar):
+    hour = lambda day, h: datetime(2020, 1, day, h)
+    quotes = [
+        Quote("A", hour(2, 10), 10.0, 12.0, 9.0, 11.0, 11.0, 100.0),
+        Quote("A", hour(2, 11), 11.0, 13.0, 10.0, 12.0, 12.0, 200.0),
+        # no volume reported for the last hour
+        Quote("A", hour(2, 12), 12.0, 12.5, 11.0, 11.5, 11.4, None),
+        Quote("A", hour(3, 10), 11.5, 12.0, 11.0, 11.8, 11.8, 50.0),
+        Quote("B", hour(2, 15), 5.0, 5.5, 4.5, 5.2, 5.2, None),
+    ]
+    daily = Data(quotes, columnar=columnar).resample(Frequency.DAILY)
+    bars = [(q.symbol, q.ts, q.open, q.high, q.low, q.close, q.adj_close, q.volume) for q in daily.quotes]
+    assert bars == [
+        ("A", datetime(2020, 1, 2), 10.0, 13.0, 9.0, 11.5, 11.4, 300.0),
+        ("A", datetime(2020, 1, 3), 11.5, 12.0, 11.0, 11.8, 11.8, 50.0),
+        ("B", datetime(2020, 1, 2), 5.0, 5.5, 4.5, 5.2, 5.2, None),
+    ]
+    assert daily.columnar == columnar
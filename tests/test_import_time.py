@@ -0,0 +1,15 @@
+import os
+import pytest
+from benchmarks.import_time import LAZY, loaded, main
+
+BUDGET = os.environ.get("RETROTESTER_IMPORT_BUDGET_MS")
+
+
+def test_optional_dependencies_are_imported_on_first_use():
+    assert loaded("retrotester", LAZY) == []
+
+
+@pytest.mark.skipif(BUDGET is None, reason="timing depends on the machine, set RETROTESTER_IMPORT_BUDGET_MS to run it")
+def test_import_time_budget():
+    # best of 3 fresh interpreters
+    assert main(["--budget", BUDGET, "--repeat", "3", "--top", "0"]) == 0
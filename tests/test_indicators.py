@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta
+from statistics import mean
+from typing import List
+import operator
+import numpy as np
+import pytest
+from retrotester import (
+    AccumulationDistributionOscillator,
+    AverageTrueRange,
+    Config,
+    Data,
+    Frequency,
+    Quote,
+    RelativeStrenghtIndex,
+    SimpleMovingAverage,
+    TrueRange,
+    WeightedMovingAverage,
+)
+from retrotester.mathfunc import division
+
+# number of quotes of each symbol, so the stacked series are padded
+LENGTHS = {"AAA": 60, "BBB": 23, "CCC": 4, "DDD": 41}
+N = 5
+
+
+def make_quotes(seed: int = 0) -> List[Quote]:
+    rng = np.random.default_rng(seed)
+    quotes = []
+    for symbol, length in LENGTHS.items():
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+        high = close * (1 + np.abs(rng.normal(0, 0.01, length)))
+        low = close * (1 - np.abs(rng.normal(0, 0.01, length)))
+        # flat closes give averages of 0
+        close[length // 2 : length // 2 + 3] = close[length // 2]
+        for i in range(length):
+            ts = datetime(2020, 1, 1) + timedelta(days=i)
+            quotes.append(Quote(symbol, ts, close[i], high[i], low[i], close[i], close[i], 1e6))
+    return quotes
+
+
+def make_config() -> Config:
+    return Config(list(LENGTHS), datetime(2020, 1, 1), datetime(2020, 3, 1), "test", Frequency.DAILY, model_parameters={"quote_period": "close"})
+
+
+# implementations computing the indicators quote by quote with statistics.mean, as before the array path
+
+
+def apply(func, seq: list, lag: int) -> list:
+    results = [func(seq[i - lag : i]) for i in range(lag, len(seq) + 1)]
+    return [None] * (len(seq) - len(results)) + results
+
+
+def sma(quotes: List[Quote], n: int) -> list:
+    return apply(mean, [q.close for q in quotes], n)
+
+
+def wma(quotes: List[Quote], n: int) -> list:
+    weighted_average = lambda x: sum([a * w for a, w in zip(x, range(1, n + 1))]) / (n * (n + 1) / 2)
+    return apply(weighted_average, [q.close for q in quotes], n)
+
+
+def ado(quotes: List[Quote], n: int) -> list:
+    return [None] + [division(curr.high - prec.close, curr.high - curr.low) for curr, prec in zip(quotes[1:], quotes[:-1])]
+
+
+def true_range(quotes: List[Quote], n: int) -> list:
+    tr = lambda curr, prec: max(curr.high - curr.low, abs(curr.high - prec.close), abs(curr.low - prec.close))
+    return [None] + [tr(curr, prec) for curr, prec in zip(quotes[1:], quotes[:-1])]
+
+
+def atr(quotes: List[Quote], n: int) -> list:
+    tr = true_range(quotes, n)[1:]
+    out = [None] * min(n, len(quotes))
+    if len(tr) >= n:
+        prev = mean(tr[:n])
+        out.append(prev)
+        for x in tr[n:]:
+            prev = (prev * (n - 1) + x) / n
+            out.append(prev)
+    return out
+
+
+def rsi(quotes: List[Quote], n: int, wilder: bool = False) -> list:
+    x = [q.close for q in quotes]
+    delta = list(map(operator.sub, x[1:], x[:-1]))
+    ups, downs = [max(d, 0) for d in delta], [-min(d, 0) for d in delta]
+    if not wilder:
+        ups_avg, downs_avg = apply(mean, ups, n), apply(mean, downs, n)
+    else:
+        ups_avg, downs_avg = [None] * len(delta), [None] * len(delta)
+        for i in range(n - 1, len(delta)):
+            if i == n - 1:
+                ups_avg[i], downs_avg[i] = mean(ups[:n]), mean(downs[:n])
+            else:
+                ups_avg[i] = (ups_avg[i - 1] * (n - 1) + ups[i]) / n
+                downs_avg[i] = (downs_avg[i - 1] * (n - 1) + downs[i]) / n
+    res = list(map(division, ups_avg, downs_avg))
+    return [None] + [100 - (100 / (1 + rs)) if rs else None for rs in res][: max(len(x) - 1, 0)]
+
+
+CASES = [
+    ("sma", lambda config: SimpleMovingAverage(config, "sma", N), sma),
+    ("wma", lambda config: WeightedMovingAverage(config, "wma", N), wma),
+    ("ado", lambda config: AccumulationDistributionOscillator(config, "ado"), ado),
+    ("tr", lambda config: TrueRange(config, "tr"), true_range),
+    ("atr", lambda config: AverageTrueRange(config, "atr", N), atr),
+    ("rsi", lambda config: RelativeStrenghtIndex(config, "rsi", N), rsi),
+    ("rsi", lambda config: RelativeStrenghtIndex(config, "rsi", N, wilder=True), lambda quotes, n: rsi(quotes, n, wilder=True)),
+]
+
+
+def assert_matches(values: list, expected: list):
+    assert [v is None for v in values] == [e is None for e in expected]
+    assert [v for v in values if v is not None] == pytest.approx([e for e in expected if e is not None], rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize("name, indicator, reference", CASES)
+@pytest.mark.parametrize("columnar", [False, True])
+def test_compute_batch_matches_loop(name, indicator, reference, columnar):
+    expected_quotes = Data(make_quotes())
+    data = Data(make_quotes(), columnar=columnar)
+    indicator(make_config()).compute_batch(data, list(LENGTHS))
+    for symbol in LENGTHS:
+        values = [getattr(q, name) for q in data.quotes_by_symbol[symbol]]
+        assert_matches(values, reference(expected_quotes.quotes_by_symbol[symbol], N))
+
+
+@pytest.mark.parametrize("name, indicator, reference", CASES)
+def test_compute_values_matches_loop(name, indicator, reference):
+    data = Data(make_quotes())
+    ind = indicator(make_config())
+    for symbol, quotes in data.quotes_by_symbol.items():
+        ind.compute_values(quotes)
+        assert_matches([getattr(q, name) for q in quotes], reference(quotes, N))
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 3])
+def test_compute_batch_by_chunks(chunk_size):
+    data = Data(make_quotes(), columnar=True)
+    data.chunk_size = chunk_size
+    RelativeStrenghtIndex(make_config(), "rsi", N, wilder=True).compute_batch(data, list(LENGTHS))
+    for symbol in LENGTHS:
+        quotes = data.quotes_by_symbol[symbol]
+        assert_matches([q.rsi for q in quotes], rsi(quotes, N, wilder=True))
+
+
+def test_compute_batch_error_names_symbols():
+    config = make_config()
+    config.quote_period = "missing"
+    data = Data(make_quotes(), columnar=True)
+    with pytest.raises(RuntimeError, match="sma with AAA, BBB"):
+        SimpleMovingAverage(config, "sma", N).compute_batch(data, ["AAA", "BBB"])
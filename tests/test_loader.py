@@ -0,0 +1,18 @@
+import io
+import numpy as np
+import pytest
+from retrotester.loader import read_bars
+
+CSV = "Date,Open,High,Low,Close,Adj Close,Volume\n2020-01-02,1,2,0.5,1.5,1.5,100\n2020-01-03,1.5,2.5,1,2,2,200\n"
+
+
+def test_read_bars():
+    columns = read_bars(io.StringIO(CSV))
+    assert columns["ts"].tolist() == [np.datetime64("2020-01-02", "us"), np.datetime64("2020-01-03", "us")]
+    assert columns["adj_close"].tolist() == [1.5, 2.0]
+    assert columns["volume"].tolist() == [100.0, 200.0]
+
+
+def test_read_bars_without_date_column():
+    with pytest.raises(ValueError, match="Missing date column"):
+        read_bars(io.StringIO("Day,Close\n2020-01-02,1\n"))
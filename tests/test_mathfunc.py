@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+from retrotester import compute_statistics
+
+LEVELS = [100.0, 90.0, 95.0, 100.0, 110.0, 99.0, 105.0]
+
+
+def test_drawdowns():
+    s = compute_statistics(np.array(LEVELS))
+    assert s["Max. Drawdown [%]"] == pytest.approx(-10.0)
+    assert s["Avg. Drawdown [%]"] == pytest.approx(-10.0)
+    assert s["Max. Drawdown Duration"] == 3
+    assert isinstance(s["Max. Drawdown Duration"], int)
+    assert s["Avg. Drawdown Duration"] == 2.5
+
+
+def test_several_curves():
+    curves = np.array([LEVELS, LEVELS[::-1]])
+    s = compute_statistics(curves)
+    for i, levels in enumerate(curves):
+        one = compute_statistics(levels)
+        assert {k: v[i] for k, v in s.items()} == pytest.approx(one, nan_ok=True)
@@ -0,0 +1,66 @@
+from dataclasses import replace
+import numpy as np
+import pytest
+from benchmarks.synthetic import generate_quotes
+from retrotester import Config, Data, Frequency, Retrotester, SVRStrategy
+from retrotester import models
+from retrotester.models import ModelStore
+
+N_SYMBOLS = 3
+
+
+def make_config(dates, store) -> Config:
+    universe = [f"S{j}" for j in range(N_SYMBOLS)]
+    parameters = {"quote_period": "close", "train_window": 40, "retrain_every": 20, "n_jobs": 1, "model_store": store}
+    return Config(universe, dates[60], dates[-1], "test", Frequency.DAILY, model_parameters=parameters)
+
+
+def count_fits(monkeypatch) -> list:
+    """Return the list of the calls to fit_svr, filled as models are fitted"""
+    calls = []
+
+    def fit_svr(*args):
+        calls.append(args)
+        return fit(*args)
+
+    fit = models.fit_svr
+    monkeypatch.setattr(models, "fit_svr", fit_svr)
+    return calls
+
+
+def test_repeated_backtest_fits_no_model(tmp_path, monkeypatch):
+    quotes = generate_quotes(N_SYMBOLS, 150, seed=6)
+    dates = sorted({quote.ts for quote in quotes})
+    calls = count_fits(monkeypatch)
+    store = ModelStore(str(tmp_path))
+    levels = [level.close for level in Retrotester(Data(quotes), SVRStrategy, make_config(dates, store)).run()]
+    assert len(calls) == store.misses > 0 and store.hits == 0
+
+    # models read from the store of the same process, then from its directory
+    for store in (store, str(tmp_path)):
+        calls.clear()
+        assert [level.close for level in Retrotester(Data(quotes), SVRStrategy, make_config(dates, store)).run()] == levels
+        assert calls == []
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_parallel_construction(columnar):
+    levels = []
+    for n_jobs in (2, 1):
+        # new quotes each time, the quotes of a list Data being those passed
+        quotes = generate_quotes(N_SYMBOLS + 1, 150, seed=6)
+        dates = sorted({quote.ts for quote in quotes})
+        config = replace(make_config(dates, None), universe=[f"S{j}" for j in range(N_SYMBOLS + 1)])
+        levels.append([level.close for level in Retrotester(Data(quotes, columnar=columnar), SVRStrategy, config, n_jobs=n_jobs).run()])
+    # each worker trains the symbols of its chunk, as the current process trains them all
+    assert levels[0] == levels[1]
+
+
+def test_stored_model_predicts_as_the_fitted_model(tmp_path):
+    quotes = generate_quotes(N_SYMBOLS, 150, seed=6)
+    dates = sorted({quote.ts for quote in quotes})
+    store = ModelStore(str(tmp_path))
+    Retrotester(Data(quotes), SVRStrategy, make_config(dates, store)).run()
+    features = np.random.default_rng(0).normal(size=(10, 5))
+    for key, fitted in store._models.items():
+        np.testing.assert_array_equal(ModelStore(str(tmp_path)).get(key).predict(features), fitted.predict(features))
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from retrotester.plotting import downsample, lttb, minmax
+
+
+def random_walk(n: int):
+    x = np.datetime64("2000-01-03", "D") + np.arange(n)
+    return x, 100 + np.cumsum(np.random.default_rng(n).normal(size=n))
+
+
+@pytest.mark.parametrize("n", [1, 2, 10, 1000])
+@pytest.mark.parametrize("n_out", [1, 2, 3, 4, 5, 100, 2000])
+def test_downsampling_bounds(n, n_out):
+    x, y = random_walk(n)
+    for positions in (lttb(x, y, n_out), minmax(y, n_out)):
+        assert len(positions) <= n_out
+        assert (np.diff(positions) > 0).all()
+        # the first and the last points are kept
+        assert positions[0] == 0
+        if n_out >= 2:
+            assert positions[-1] == n - 1
+
+
+def test_minmax_keeps_the_extremes():
+    x, y = random_walk(1000)
+    positions = minmax(y, 50)
+    assert {int(np.argmin(y)), int(np.argmax(y))} <= set(positions.tolist())
+    np.testing.assert_array_equal(downsample(x, y, 50, "minmax"), positions)
+    np.testing.assert_array_equal(downsample(x, y, 50, None), np.arange(1000))
+    with pytest.raises(ValueError, match="Unknown method"):
+        downsample(x, y, 50, "other")
@@ -0,0 +1,37 @@
+import re
+import time
+import pytest
+from retrotester import Data, Retrotester
+from retrotester.profiling import Profiler
+from .test_retrotester import SmaStrategy, make_config, make_quotes
+
+
+def test_nested_sections():
+    profiler = Profiler()
+    with profiler.section("run"):
+        for _ in range(2):
+            with profiler.section("update"):
+                time.sleep(0.01)
+        with profiler.section("stats"):
+            pass
+    report = {row["section"]: row for row in profiler.report()}
+    assert list(report) == ["run", "run/update", "run/stats"]
+    assert report["run/update"]["calls"] == 2 and report["run/update"]["time"] >= 0.02
+    for row in report.values():
+        assert row["time"] >= row["self_time"] >= 0
+    assert report["run"]["self_time"] == pytest.approx(report["run"]["time"] - report["run/update"]["time"] - report["run/stats"]["time"])
+
+
+def test_folded_stacks():
+    profiler = Profiler()
+    quotes, dates = make_quotes()
+    Retrotester(Data(quotes), SmaStrategy, make_config(dates), profiler=profiler).run()
+    lines = profiler.folded().splitlines()
+    assert all(re.fullmatch(r"[^;]+(;[^;]+)* \d+", line) for line in lines)
+    stacks = [line.rsplit(" ", 1)[0] for line in lines]
+    assert len(set(stacks)) == len(stacks)
+    assert {"run;create strategy;indicator sma", "run;backtest;update"} <= set(stacks)
+    # self times add up to the time of the root sections
+    total = sum(int(line.rsplit(" ", 1)[1]) for line in lines)
+    roots = sum(row["time"] for row in profiler.report() if "/" not in row["section"])
+    assert total == pytest.approx(roots * 1e6, abs=len(lines))
@@ -0,0 +1,159 @@
+from dataclasses import replace
+import numpy as np
+import pytest
+from benchmarks.synthetic import generate_quotes
+from retrotester import BatchRetrotester, Config, CostModel, Data, EquiWeightedStrategy, Frequency, QuoteFrame, Retrotester, SimpleMovingAverage, TradeStrategy
+
+N_SYMBOLS = 10
+
+
+class SmaStrategy(EquiWeightedStrategy):
+    def construct(self):
+        self.add_indicators(SimpleMovingAverage(self._config, "sma", 10))
+
+    def compute_signals(self, quotes):
+        for quote in quotes:
+            quote.signal = 0.0 if quote.sma is None else float(np.sign(quote.close - quote.sma))
+
+
+class SmaTradeStrategy(TradeStrategy):
+    construct = SmaStrategy.construct
+    compute_signals = SmaStrategy.compute_signals
+
+
+def make_quotes(n_bars: int = 120):
+    quotes = generate_quotes(N_SYMBOLS, n_bars, missing_rate=0.0, gap_rate=0.0, seed=1)
+    dates = sorted({quote.ts for quote in quotes})
+    # S9 has no quote at the date before the last one
+    return [quote for quote in quotes if not (quote.symbol == "S9" and quote.ts == dates[-2])], dates
+
+
+def make_config(dates, end_ts=None) -> Config:
+    universe = [f"S{j}" for j in range(N_SYMBOLS)]
+    return Config(universe, dates[20], end_ts or dates[-1], "test", Frequency.DAILY, model_parameters={"quote_period": "close"})
+
+
+@pytest.mark.parametrize("strategy", [SmaStrategy, SmaTradeStrategy])
+@pytest.mark.parametrize("columnar", [False, True])
+def test_step_matches_run(strategy, columnar):
+    quotes, dates = make_quotes()
+    full = Retrotester(Data(quotes, columnar=columnar), strategy, make_config(dates))
+    expected = full.run()
+
+    last = [quote for quote in quotes if quote.ts == dates[-1]]
+    config = make_config(dates, dates[-2])
+    retrotester = Retrotester(Data([quote for quote in quotes if quote.ts < dates[-1]], columnar=columnar), strategy, config)
+    retrotester.run()
+    assert retrotester.gaps == {}
+    level = retrotester.step(last)
+    assert level.ts == dates[-1]
+    assert level.close == pytest.approx(expected[-1].close, rel=1e-12)
+    assert retrotester.stats["End"] == str(dates[-1])
+    # the quote of S9 missing before the last date is a gap once S9 is quoted again
+    assert retrotester.gaps == full.gaps == {"S9": [dates[-2]]}
+    assert retrotester.stats["Missing Quotes"] == full.stats["Missing Quotes"] == 1
+    # the config passed is not modified
+    assert config.end_ts == dates[-2]
+
+
+@pytest.mark.parametrize("strategy", [SmaStrategy, SmaTradeStrategy])
+@pytest.mark.parametrize("chunk_size", [1, 7, 50, 1000])
+def test_stream_matches_run(strategy, chunk_size):
+    quotes, dates = make_quotes()
+    # the backtest starts after the first date, and chunk sizes do not divide the number of dates
+    expected = Retrotester(Data(quotes), strategy, make_config(dates))
+    levels = [(level.ts, level.close) for level in expected.run()]
+    retrotester = Retrotester(Data(quotes), strategy, make_config(dates))
+    assert [(level.ts, level.close) for level in retrotester.stream(chunk_size=chunk_size, keep_levels=True)] == pytest.approx(levels, rel=1e-12)
+    assert retrotester.stats == pytest.approx(expected.stats, rel=1e-12, nan_ok=True)
+
+
+class WindowStrategy(SmaStrategy):
+    def construct(self):
+        self.add_indicators(SimpleMovingAverage(self._config, "sma", getattr(self._config, "window", 10)))
+
+
+class WindowTradeStrategy(TradeStrategy):
+    construct = WindowStrategy.construct
+    compute_signals = SmaStrategy.compute_signals
+
+
+@pytest.mark.parametrize("n_jobs", [2, 3])
+def test_parallel_construction_on_files(tmp_path, n_jobs):
+    quotes = generate_quotes(N_SYMBOLS, 200, seed=4)
+    dates = sorted({quote.ts for quote in quotes})
+    QuoteFrame.from_quotes(quotes).save(str(tmp_path))
+    expected = [level.close for level in Retrotester(Data(quotes), SmaStrategy, make_config(dates)).run()]
+    levels = [level.close for level in Retrotester(Data.open(str(tmp_path)), SmaStrategy, make_config(dates), n_jobs=n_jobs).run()]
+    assert levels == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_optimize_in_process_keeps_the_data(columnar):
+    quotes, dates = make_quotes()
+    expected = Retrotester(Data(quotes, columnar=columnar), WindowStrategy, make_config(dates)).run()
+
+    last = [quote for quote in quotes if quote.ts == dates[-1]]
+    retrotester = Retrotester(Data([quote for quote in quotes if quote.ts < dates[-1]], columnar=columnar), WindowStrategy, make_config(dates, dates[-2]))
+    retrotester.run()
+    retrotester.optimize({"window": [5, 20]}, n_jobs=1)
+    # the indicators and signals of the run are still those of the strategy
+    assert retrotester.step(last).close == pytest.approx(expected[-1].close, rel=1e-12)
+
+
+def test_optimize_workers_on_files(tmp_path):
+    quotes = generate_quotes(N_SYMBOLS, 200, seed=4)
+    dates = sorted({quote.ts for quote in quotes})
+    QuoteFrame.from_quotes(quotes).save(str(tmp_path))
+    results = []
+    for n_jobs in (1, 3):
+        data = Data.open(str(tmp_path))
+        retrotester = Retrotester(data, WindowStrategy, make_config(dates))
+        retrotester.run()
+        sma = np.array(data.frame.columns["sma"])
+        ranking = retrotester.optimize({"window": [5, 10, 20, 40]}, n_jobs=n_jobs)
+        results.append(sorted((row["window"], row["Return [%]"]) for row in ranking))
+    # the workers do not write to the columns of the parent
+    np.testing.assert_array_equal(data.frame.columns["sma"], sma)
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_vectorized_matches_loop(columnar):
+    # symbols with missing bars and gaps, traded with costs
+    quotes = generate_quotes(N_SYMBOLS, 150, missing_rate=0.05, gap_rate=0.02, gap_length=5, seed=7)
+    dates = sorted({quote.ts for quote in quotes})
+    config = replace(make_config(dates), costs=CostModel(proportional=0.001, fixed=1.0, spread=0.0005, impact=0.1))
+    results = []
+    for engine in ("loop", "vectorized"):
+        retrotester = Retrotester(Data(quotes, columnar=columnar), SmaStrategy, config)
+        levels = [(level.ts, level.close) for level in retrotester.run(engine=engine)]
+        results.append((levels, retrotester.stats["Exposure [%]"]))
+    assert retrotester.gaps
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize("engine", ["loop", "vectorized"])
+def test_batch_matches_separate_runs(engine):
+    quotes, dates = make_quotes()
+    # strategies sharing the sma name with different windows, on different universes
+    window = lambda n, **changes: replace(make_config(dates), model_parameters={"quote_period": "close", "window": n}, **changes)
+    configs = [make_config(dates), window(5, universe=["S1", "S3", "S9"]), window(20)]
+    strategies = [SmaStrategy, WindowStrategy, WindowTradeStrategy if engine == "loop" else WindowStrategy]
+    batch = BatchRetrotester(Data(quotes), list(zip(strategies, configs)))
+    results = batch.run(engine=engine)
+    for strategy, config, levels, stats in zip(strategies, configs, results, batch.stats):
+        retrotester = Retrotester(Data(quotes), strategy, config)
+        expected = retrotester.run(engine=engine)
+        assert [level.ts for level in levels] == [level.ts for level in expected]
+        assert [level.close for level in levels] == pytest.approx([level.close for level in expected], rel=1e-12)
+        assert stats == pytest.approx(retrotester.stats, rel=1e-12, nan_ok=True)
+
+
+def test_vectorized_engine_needs_a_weight_strategy():
+    quotes, dates = make_quotes()
+    retrotester = Retrotester(Data(quotes), SmaTradeStrategy, make_config(dates))
+    with pytest.raises(ValueError, match='engine="loop"'):
+        retrotester.run(engine="vectorized")
+    with pytest.raises(ValueError, match="Unknown engine"):
+        retrotester.run(engine="other")